@@ -0,0 +1,106 @@
+"""Maintenance commands for the Air Quality API.
+
+Run from the rolling_exercise directory, e.g.:
+    python -m app.cli rebuild-city-stats
+"""
+import argparse
+import asyncio
+
+from app.constants.config import settings
+from app.core.logger import setup_logging
+from app.db.migrations import init_db
+from app.db.partitions import ensure_future_partitions, ensure_partitioned_measurements
+from app.db.session import SessionLocal, engine
+from app.exceptions import AqiStandardConflictError, UnknownAqiStandardError
+from app.services.alerts_service import reflag_alerts
+from app.services.aqi_recompute_service import recompute_aqi
+from app.services.city_stats_service import rebuild_city_stats
+from app.services.retention_service import apply_retention
+from app.services.rollup_service import rebuild_rollups
+
+
+async def _rebuild_city_stats(args: argparse.Namespace) -> None:
+    async with SessionLocal() as db:
+        await rebuild_city_stats(db)
+
+
+async def _rebuild_rollups(args: argparse.Namespace) -> None:
+    async with SessionLocal() as db:
+        await rebuild_rollups(db)
+
+
+async def _reflag_alerts(args: argparse.Namespace) -> None:
+    async with SessionLocal() as db:
+        await reflag_alerts(session=db, threshold=settings.alert_aqi_threshold)
+
+
+async def _recompute_aqi(args: argparse.Namespace) -> None:
+    async with SessionLocal() as db:
+        try:
+            await recompute_aqi(db, standard=args.standard, cities=args.cities, batch_rows=args.batch_rows)
+        except (UnknownAqiStandardError, AqiStandardConflictError) as exc:
+            raise SystemExit(str(exc)) from exc
+
+
+async def _apply_retention(args: argparse.Namespace) -> None:
+    if settings.retention_months is None:
+        raise SystemExit("RETENTION_MONTHS is not set; nothing to remove")
+
+    async with SessionLocal() as db:
+        await apply_retention(db, keep_months=settings.retention_months)
+
+
+async def _partition_measurements(args: argparse.Namespace) -> None:
+    if not settings.partition_measurements:
+        raise SystemExit("PARTITION_MEASUREMENTS is not set; enable it before converting the table")
+
+    async with engine.begin() as conn:
+        await ensure_partitioned_measurements(conn)
+        await ensure_future_partitions(conn)
+
+
+COMMANDS = {
+    "rebuild-city-stats": (_rebuild_city_stats, "Backfill city_aqi_stats from air_quality_measurements"),
+    "rebuild-rollups": (_rebuild_rollups, "Backfill the daily/monthly AQI rollups from air_quality_measurements"),
+    "reflag-alerts": (_reflag_alerts, "Recompute is_alert for all measurements with the current ALERT_AQI_THRESHOLD"),
+    "apply-retention": (_apply_retention, "Drop measurements (whole partitions when partitioned) older than RETENTION_MONTHS"),
+    "recompute-aqi": (_recompute_aqi, "Rewrite stored aqi/aqi_level/is_alert under each city's AQI standard, then the aggregates"),
+    "partition-measurements": (_partition_measurements, "Convert a plain air_quality_measurements table to monthly partitions (copies every row once)"),
+}
+
+# Options of the commands that take any: (flags, add_argument keyword arguments).
+COMMAND_ARGUMENTS = {
+    "recompute-aqi": [
+        (("--standard",), {"help": "Only the cities configured with this AQI standard (default: every city)"}),
+        (("--city",), {"dest": "cities", "action": "append", "help": "Only this city; repeat for several (default: all)"}),
+        (("--batch-rows",), {"type": int, "help": "Rows rewritten per transaction (default: AQI_RECOMPUTE_BATCH_ROWS)"}),
+    ],
+}
+
+
+async def _run(args: argparse.Namespace) -> None:
+    async with engine.begin() as conn:
+        await init_db(conn)
+
+    try:
+        handler, _ = COMMANDS[args.command]
+        await handler(args)
+    finally:
+        await engine.dispose()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, (_, help_text) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=help_text)
+        for flags, options in COMMAND_ARGUMENTS.get(name, []):
+            subparser.add_argument(*flags, **options)
+
+    args = parser.parse_args(argv)
+    setup_logging()
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
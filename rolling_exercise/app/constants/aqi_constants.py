@@ -0,0 +1,6 @@
+from calculate_aqi import AQI_STANDARD_EPA
+
+DEFAULT_AQI_STANDARD = AQI_STANDARD_EPA
+
+UNKNOWN_AQI_STANDARD_ERROR = "Unknown AQI standard"
+AQI_STANDARD_CONFLICT_ERROR = "AQI standard differs from the one configured for"
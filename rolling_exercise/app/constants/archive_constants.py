@@ -0,0 +1,23 @@
+COMPRESSION_GZIP = "gzip"
+COMPRESSION_ZIP = "zip"
+COMPRESSION_ZSTD = "zstd"
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZIP_MAGIC = b"PK\x03\x04"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+COMPRESSED_SUFFIXES = {
+    COMPRESSION_GZIP: ".gz",
+    COMPRESSION_ZSTD: ".zst",
+}
+
+# Folders some archivers add next to the real files.
+IGNORED_ZIP_PREFIXES = ("__MACOSX/",)
+
+# Decompressed archive members are spooled to disk in blocks of this size.
+SPOOL_BLOCK_BYTES = 1 << 20
+
+INVALID_ARCHIVE_ERROR = "Invalid or corrupted archive"
+MEMBER_TOO_LARGE_ERROR = "File is too large once decompressed"
+ZSTD_UNSUPPORTED_ERROR = "zstd-compressed uploads are not supported by this server"
+EMPTY_ARCHIVE_ERROR = "Archive contains no files"
@@ -1,8 +1,61 @@
+from typing import Literal
+
+from pydantic import NonNegativeInt, PositiveFloat, PositiveInt
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from app.constants.aqi_constants import DEFAULT_AQI_STANDARD
+from app.constants.cache_constants import CACHE_BACKEND_MEMORY
+from app.constants.ingest_constants import INGEST_MODE_UPSERT, UPLOAD_TRANSACTION_SINGLE
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env",extra="ignore")
     database_url:str
+    # Optional replica for the read-only query routes; falls back to database_url.
+    read_database_url: str | None = None
     alert_aqi_threshold: int
+    db_pool_size: PositiveInt = 5
+    db_max_overflow: NonNegativeInt = 10
+    db_pool_timeout: PositiveFloat = 30.0
+    # Seconds before a connection is replaced; -1 keeps connections forever.
+    db_pool_recycle: int = 1800
+    # Pre-ping costs a round trip per checkout; pool_recycle alone covers servers that drop idle connections.
+    db_pool_pre_ping: bool = True
+    # Prepared statements cached per connection. 0 disables caching in both SQLAlchemy and asyncpg and names
+    # statements uniquely, as pgbouncer transaction pooling requires.
+    db_statement_cache_size: NonNegativeInt = 100
+    ingest_mode: Literal["orm", "bulk", "upsert"] = INGEST_MODE_UPSERT
+    ingest_batch_size: PositiveInt = 5000
+    csv_chunk_rows: PositiveInt = 50_000
+    ingest_job_workers: PositiveInt = 2
+    ingest_job_queue_size: PositiveInt = 16
+    upload_transaction: Literal["single", "per_file"] = UPLOAD_TRANSACTION_SINGLE
+    cpu_executor: Literal["thread", "process"] = "thread"
+    cpu_executor_workers: PositiveInt = 4
+    # Largest file accepted out of a zip archive once decompressed, so a compression bomb stops at this size.
+    max_member_bytes: PositiveInt = 512 * 1024 * 1024
+    # AQI standard (see calculate_aqi.AQI_STANDARDS) used for every city not configured with another one;
+    # AQI_CITY_STANDARDS is a JSON object such as {"Paris": "eu_caqi"}.
+    aqi_standard: str = DEFAULT_AQI_STANDARD
+    aqi_city_standards: dict[str, str] = {}
+    # JSON file of extra or replacement standards ({"name": {"pm25": [...], "no2": [...], "co2": [...], "levels": [...]}}).
+    aqi_standards_path: str | None = None
+    # JSON file with AQI breakpoint tables ({"pm25": [...], "no2": [...], "co2": [...], "levels": [...]}) for
+    # AQI_STANDARD; None uses the built-in ones. Memoized scalar results per process: aqi_cache_size.
+    aqi_breakpoints_path: str | None = None
+    aqi_cache_size: NonNegativeInt = 4096
+    # Rows rewritten (and committed) per statement by the recompute-aqi command.
+    aqi_recompute_batch_rows: PositiveInt = 50_000
+    page_default_limit: PositiveInt = 100
+    page_max_limit: PositiveInt = 1000
+    export_batch_rows: PositiveInt = 10_000
+    partition_measurements: bool = False
+    partition_months_ahead: NonNegativeInt = 3
+    # Months of measurements to keep (the current month included); None keeps everything.
+    retention_months: PositiveInt | None = None
+    cache_enabled: bool = True
+    cache_ttl_seconds: PositiveFloat = 30.0
+    cache_max_entries: PositiveInt = 1024
+    cache_backend: Literal["memory", "sqlite"] = CACHE_BACKEND_MEMORY
+    cache_sqlite_path: str = "read_cache.sqlite3"
 
 settings = Settings()   
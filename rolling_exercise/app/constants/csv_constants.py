@@ -13,6 +13,9 @@ REQUIRED_CSV_COLUMNS = {
     CSV_CO2_COL,
 }
 
+CITY_MIN_LENGTH = 1
+CITY_MAX_LENGTH = 100
+
 CSV_TO_INTERNAL_FIELDS = {
     CSV_PM25_COL: "pm25",
     CSV_NO2_COL: "no2",
@@ -23,3 +26,4 @@ CSV_MISSING_COLUMNS_ERROR = "CSV file is missing required columns"
 INVALID_CSV_FILE_ERROR = "Invalid CSV file"
 INVALID_VALUES_ERROR = "Invalid values in CSV"
 EMPTY_CITY_ERROR = "City cannot be empty"
+CITY_TOO_LONG_ERROR = "City cannot be longer than 100 characters"
@@ -0,0 +1,9 @@
+from app.constants.csv_constants import CSV_CITY_COL, CSV_CO2_COL, CSV_DATE_COL, CSV_NO2_COL, CSV_PM25_COL
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CSV_MEDIA_TYPE = "text/csv"
+
+EXPORT_FIELDS = ("date", "city", "pm25", "no2", "co2", "aqi", "aqi_level")
+
+# Exported CSVs use the upload column names, so an export can be re-uploaded as is.
+EXPORT_CSV_HEADER = (CSV_DATE_COL, CSV_CITY_COL, CSV_PM25_COL, CSV_NO2_COL, CSV_CO2_COL, "aqi", "aqi_level")
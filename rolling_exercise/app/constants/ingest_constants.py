@@ -0,0 +1,30 @@
+INGEST_MODE_ORM = "orm"
+INGEST_MODE_BULK = "bulk"
+INGEST_MODE_UPSERT = "upsert"
+
+MEASUREMENT_FIELDS = ("date", "city", "pm25", "no2", "co2", "aqi", "aqi_level", "is_alert")
+# A city has at most one measurement per date; upsert mode replaces the stored row.
+MEASUREMENT_KEY_FIELDS = ("city", "date")
+
+DUPLICATE_MEASUREMENTS_ERROR = "Measurements already exist for some (city, date) pairs"
+
+# app_state key holding the threshold the stored is_alert flags were computed with.
+ALERT_THRESHOLD_STATE_KEY = "alert_aqi_threshold"
+
+JOB_STATUS_QUEUED = "queued"
+JOB_STATUS_RUNNING = "running"
+JOB_STATUS_SUCCEEDED = "succeeded"
+JOB_STATUS_FAILED = "failed"
+
+MAX_TRACKED_JOBS = 1000
+
+# Multi-file uploads: all files in one transaction, or each file committed (or rolled back) on its own.
+UPLOAD_TRANSACTION_SINGLE = "single"
+UPLOAD_TRANSACTION_PER_FILE = "per_file"
+
+ASYNC_MULTIPLE_FILES_ERROR = "Async uploads take a single file or archive"
+
+INGEST_STAGE_READ = "read"
+INGEST_STAGE_PARSE = "parse"
+INGEST_STAGE_AQI = "aqi"
+INGEST_STAGE_WRITE = "write"
@@ -0,0 +1,2 @@
+GRANULARITY_DAY = "day"
+GRANULARITY_MONTH = "month"
@@ -0,0 +1,21 @@
+UPLOAD_FORMAT_CSV = "csv"
+UPLOAD_FORMAT_PARQUET = "parquet"
+UPLOAD_FORMAT_ARROW_FILE = "arrow_file"
+UPLOAD_FORMAT_ARROW_STREAM = "arrow_stream"
+
+UPLOAD_CONTENT_TYPES = {
+    "application/vnd.apache.parquet": UPLOAD_FORMAT_PARQUET,
+    "application/x-parquet": UPLOAD_FORMAT_PARQUET,
+    "application/parquet": UPLOAD_FORMAT_PARQUET,
+    "application/vnd.apache.arrow.file": UPLOAD_FORMAT_ARROW_FILE,
+    "application/vnd.apache.arrow.stream": UPLOAD_FORMAT_ARROW_STREAM,
+}
+
+# Leading bytes of each columnar format; anything else is read as CSV.
+PARQUET_MAGIC = b"PAR1"
+ARROW_FILE_MAGIC = b"ARROW1"
+ARROW_STREAM_MAGIC = b"\xff\xff\xff\xff"
+MAGIC_BYTES_LENGTH = 8
+
+INVALID_COLUMNAR_FILE_ERROR = "Invalid Parquet or Arrow file"
+COLUMNAR_UNSUPPORTED_ERROR = "Parquet and Arrow uploads are not supported by this server"
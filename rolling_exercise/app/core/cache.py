@@ -0,0 +1,308 @@
+import logging
+import pickle
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable, Iterator
+from contextlib import closing, contextmanager
+from functools import wraps
+from typing import Any, TypeVar
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.constants.cache_constants import CACHE_BACKEND_SQLITE
+from app.constants.config import settings
+from app.core.executor import run_blocking
+from app.core.logger import LOGGER_NAME
+from app.db.session import engine
+
+logger = logging.getLogger(LOGGER_NAME)
+
+T = TypeVar("T")
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after ttl seconds."""
+
+    def __init__(self, *, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = _MISSING) -> Any:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+        }
+
+
+class CacheBackend(ABC):
+    """Storage behind read_cache. Hit/miss counters are per process, entries may be shared."""
+
+    name: str
+
+    @abstractmethod
+    async def get(self, key: Hashable, default: Any = _MISSING) -> Any: ...
+
+    @abstractmethod
+    async def set(self, key: Hashable, value: Any, *, generation: int | None = None) -> None:
+        """Store value, unless generation is given and a clear() has happened since it was read."""
+
+    @abstractmethod
+    async def generation(self) -> int:
+        """Counter bumped by every clear()."""
+
+    @abstractmethod
+    async def replica_lsn(self) -> str | None:
+        """Primary WAL position passed to the last clear(); a replica must have replayed it before its reads are cached."""
+
+    @abstractmethod
+    async def clear(self, *, replica_lsn: str | None = None) -> None: ...
+
+    @abstractmethod
+    async def stats(self) -> dict[str, Any]: ...
+
+
+class MemoryCacheBackend(CacheBackend):
+    name = "memory"
+
+    def __init__(self, *, maxsize: int, ttl: float) -> None:
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generation = 0
+        self._replica_lsn: str | None = None
+
+    async def get(self, key: Hashable, default: Any = _MISSING) -> Any:
+        return self._cache.get(key, default)
+
+    async def set(self, key: Hashable, value: Any, *, generation: int | None = None) -> None:
+        if generation is None or generation == self._generation:
+            self._cache.set(key, value)
+
+    async def generation(self) -> int:
+        return self._generation
+
+    async def replica_lsn(self) -> str | None:
+        return self._replica_lsn
+
+    async def clear(self, *, replica_lsn: str | None = None) -> None:
+        self._generation += 1
+        self._replica_lsn = replica_lsn
+        self._cache.clear()
+
+    async def stats(self) -> dict[str, Any]:
+        return {"backend": self.name, **self._cache.stats()}
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """Cache kept in a SQLite file, so every worker on the host reads, fills and clears the same entries."""
+
+    name = "sqlite"
+
+    def __init__(self, *, path: str, maxsize: int, ttl: float) -> None:
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(cache_entries)")}
+            if columns and "accessed_at" not in columns:
+                # A file from before LRU eviction; its entries are disposable.
+                conn.execute("DROP TABLE cache_entries")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries "
+                "(key TEXT PRIMARY KEY, expires_at REAL NOT NULL, accessed_at REAL NOT NULL, value BLOB NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_entries_expires_at ON cache_entries (expires_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_entries_accessed_at ON cache_entries (accessed_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_generation "
+                "(id INTEGER PRIMARY KEY CHECK (id = 0), value INTEGER NOT NULL, replica_lsn TEXT)"
+            )
+            conn.execute("INSERT OR IGNORE INTO cache_generation (id, value) VALUES (0, 0)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # A sqlite3 connection used as a context manager only ends the transaction; closing() releases it.
+        with closing(sqlite3.connect(self.path, timeout=5, isolation_level=None)) as conn:
+            yield conn
+
+    def _get(self, key: str) -> bytes | None:
+        # Wall clock rather than monotonic: expiry and access times are compared across processes.
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "UPDATE cache_entries SET accessed_at = ? WHERE key = ? AND expires_at >= ? RETURNING value", (now, key, now)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    @staticmethod
+    def _generation(conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT value FROM cache_generation WHERE id = 0").fetchone()[0]
+
+    def _set(self, key: str, value: bytes, generation: int | None) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            # IMMEDIATE takes the write lock up front, so no clear() lands between the check and the insert.
+            conn.execute("BEGIN IMMEDIATE")
+            if generation is not None and generation != self._generation(conn):
+                conn.execute("ROLLBACK")
+                return
+            conn.execute("DELETE FROM cache_entries WHERE expires_at < ?", (now,))
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, expires_at, accessed_at, value) VALUES (?, ?, ?, ?)",
+                (key, now + self.ttl, now, value),
+            )
+            conn.execute(
+                "DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            )
+            conn.execute("COMMIT")
+
+    def _clear(self, replica_lsn: str | None) -> None:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM cache_entries")
+            conn.execute("UPDATE cache_generation SET value = value + 1, replica_lsn = ? WHERE id = 0", (replica_lsn,))
+            conn.execute("COMMIT")
+
+    def _read_replica_lsn(self) -> str | None:
+        with self._connect() as conn:
+            return conn.execute("SELECT replica_lsn FROM cache_generation WHERE id = 0").fetchone()[0]
+
+    def _read_generation(self) -> int:
+        with self._connect() as conn:
+            return self._generation(conn)
+
+    def _size(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT count(*) FROM cache_entries WHERE expires_at >= ?", (time.time(),)).fetchone()[0]
+
+    async def get(self, key: Hashable, default: Any = _MISSING) -> Any:
+        value = await run_blocking(self._get, repr(key))
+        if value is None:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return pickle.loads(value)
+
+    async def set(self, key: Hashable, value: Any, *, generation: int | None = None) -> None:
+        await run_blocking(self._set, repr(key), pickle.dumps(value), generation)
+
+    async def generation(self) -> int:
+        return await run_blocking(self._read_generation)
+
+    async def replica_lsn(self) -> str | None:
+        return await run_blocking(self._read_replica_lsn)
+
+    async def clear(self, *, replica_lsn: str | None = None) -> None:
+        await run_blocking(self._clear, replica_lsn)
+
+    async def stats(self) -> dict[str, Any]:
+        return {
+            "backend": self.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": await run_blocking(self._size),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+        }
+
+
+def build_cache_backend() -> CacheBackend:
+    if settings.cache_backend == CACHE_BACKEND_SQLITE:
+        return SQLiteCacheBackend(path=settings.cache_sqlite_path, maxsize=settings.cache_max_entries, ttl=settings.cache_ttl_seconds)
+    return MemoryCacheBackend(maxsize=settings.cache_max_entries, ttl=settings.cache_ttl_seconds)
+
+
+read_cache: CacheBackend = build_cache_backend()
+
+
+async def _replica_caught_up(session: AsyncSession) -> bool:
+    """Whether session's server is the primary, or a standby that has replayed the last invalidating write."""
+    lsn = await read_cache.replica_lsn()
+    if lsn is None:
+        return True
+    return await session.scalar(
+        text("SELECT NOT pg_is_in_recovery() OR pg_last_wal_replay_lsn() >= CAST(CAST(:lsn AS TEXT) AS pg_lsn)"), {"lsn": lsn}
+    )
+
+
+def cached(namespace: str) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """Cache a keyword-only async service function in read_cache.
+
+    The session argument is left out of the key; everything else must be hashable and have a stable repr.
+    """
+    def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @wraps(func)
+        async def wrapper(**kwargs: Any) -> T:
+            if not settings.cache_enabled:
+                return await func(**kwargs)
+
+            key = (namespace, *sorted((name, value) for name, value in kwargs.items() if not isinstance(value, AsyncSession)))
+            value = await read_cache.get(key)
+            if value is _MISSING:
+                # Read before the query: a write committing while it runs invalidates after this point,
+                # and the set below is then skipped instead of caching what the query saw before the write.
+                generation = await read_cache.generation()
+                session = next((value for value in kwargs.values() if isinstance(value, AsyncSession)), None)
+                # A lagging replica would otherwise keep serving pre-write results from the cache after it catches up.
+                cacheable = session is None or not settings.read_database_url or await _replica_caught_up(session)
+                value = await func(**kwargs)
+                if cacheable:
+                    await read_cache.set(key, value, generation=generation)
+                else:
+                    logger.debug(f"Not caching {namespace}: replica has not replayed the last write yet")
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+async def _primary_wal_lsn() -> str:
+    async with engine.connect() as conn:
+        return await conn.scalar(text("SELECT CAST(pg_current_wal_lsn() AS TEXT)"))
+
+
+async def invalidate_read_caches() -> None:
+    """Drop cached reads after a write. With a shared backend this reaches every worker at once.
+
+    With a replica configured, the primary's WAL position is recorded too, so replica reads are cached again
+    only once the replica has replayed the write.
+    """
+    replica_lsn = await _primary_wal_lsn() if settings.read_database_url else None
+    await read_cache.clear(replica_lsn=replica_lsn)
+    logger.info(f"Read caches invalidated ({read_cache.name} backend)")
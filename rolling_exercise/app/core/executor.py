@@ -0,0 +1,60 @@
+import asyncio
+import logging
+import multiprocessing
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, TypeVar
+
+from app.constants.config import settings
+from app.core.logger import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+T = TypeVar("T")
+
+_cpu_executor: Executor | None = None
+
+
+def start_cpu_executor() -> None:
+    global _cpu_executor
+
+    if _cpu_executor is not None:
+        return
+
+    if settings.cpu_executor == "process":
+        # spawn instead of fork: forking a process that already runs an event loop and DB pools is unsafe.
+        _cpu_executor = ProcessPoolExecutor(
+            max_workers=settings.cpu_executor_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    else:
+        _cpu_executor = ThreadPoolExecutor(max_workers=settings.cpu_executor_workers, thread_name_prefix="cpu")
+
+    logger.info(f"CPU executor started ({settings.cpu_executor}, {settings.cpu_executor_workers} workers)")
+
+
+def shutdown_cpu_executor() -> None:
+    global _cpu_executor
+
+    if _cpu_executor is None:
+        return
+
+    _cpu_executor.shutdown(wait=True, cancel_futures=True)
+    _cpu_executor = None
+    logger.info("CPU executor stopped")
+
+
+async def run_cpu_bound(func: Callable[..., T], *args: Any) -> T:
+    """Run a picklable, CPU-heavy function on the configured executor.
+
+    Falls back to the loop's default thread pool when the executor has not been
+    started (e.g. when the app is driven without its lifespan, as in tests).
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_cpu_executor, partial(func, *args))
+
+
+async def run_blocking(func: Callable[..., T], *args: Any) -> T:
+    """Run blocking work that shares state with the caller (open files, iterators) on a thread."""
+    return await asyncio.to_thread(func, *args)
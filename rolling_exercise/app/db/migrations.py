@@ -0,0 +1,147 @@
+"""Versioned, idempotent schema migrations applied at startup.
+
+create_all only creates missing tables, so changes to existing tables (new
+indexes, columns, constraints) are listed here. Every migration runs once,
+in order, and is recorded in schema_migrations; each step is written so it
+is also a no-op on a database freshly created from the current models.
+
+Steps are literal SQL, frozen when the migration is released: they must not
+be derived from the models, which keep changing after the migration ships.
+"""
+import logging
+
+from sqlalchemy import Executable, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.constants.config import settings
+from app.db.partitions import create_partitioned_measurements, ensure_future_partitions, measurements_relkind
+from app.db.session import Base
+from app.core.logger import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+# Arbitrary constant shared by all workers so only one of them migrates at a time.
+MIGRATIONS_LOCK_ID = 7_311_524
+
+
+MIGRATIONS: list[tuple[int, str, list[Executable]]] = [
+    (
+        1,
+        "query indexes",
+        [
+            text("CREATE INDEX IF NOT EXISTS ix_air_quality_measurements_date_id ON air_quality_measurements (date, id)"),
+            text("CREATE INDEX IF NOT EXISTS ix_air_quality_measurements_city_date_id ON air_quality_measurements (city, date, id)"),
+            # Dropped again by migration 2, once alerts moved to the persisted is_alert flag.
+            text("CREATE INDEX IF NOT EXISTS ix_air_quality_measurements_aqi ON air_quality_measurements (aqi)"),
+            text("CREATE INDEX IF NOT EXISTS ix_air_quality_measurements_city_aqi ON air_quality_measurements (city, aqi)"),
+            text("CREATE INDEX IF NOT EXISTS ix_city_aqi_stats_average_aqi ON city_aqi_stats ((aqi_sum / measurement_count), city)"),
+            # Superseded by the composite indexes above.
+            text("DROP INDEX IF EXISTS ix_air_quality_measurements_date"),
+            text("DROP INDEX IF EXISTS ix_air_quality_measurements_city"),
+        ],
+    ),
+    (
+        2,
+        "persisted is_alert flag",
+        [
+            # Existing rows are flagged by alerts_service.sync_alert_flags, which runs right after migrations.
+            text("ALTER TABLE air_quality_measurements ADD COLUMN IF NOT EXISTS is_alert BOOLEAN NOT NULL DEFAULT false"),
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_air_quality_measurements_alerts_date_id "
+                "ON air_quality_measurements (date, id) WHERE is_alert"
+            ),
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_air_quality_measurements_alerts_city_date_id "
+                "ON air_quality_measurements (city, date, id) WHERE is_alert"
+            ),
+            # Alert queries no longer filter on aqi.
+            text("DROP INDEX IF EXISTS ix_air_quality_measurements_aqi"),
+            text("DROP INDEX IF EXISTS ix_air_quality_measurements_city_aqi"),
+        ],
+    ),
+    (
+        3,
+        "unique (city, date) measurements",
+        [
+            # Keep the most recently uploaded row of each duplicate group, as an upsert would have.
+            text(
+                "DELETE FROM air_quality_measurements AS older USING air_quality_measurements AS newer "
+                "WHERE older.city = newer.city AND older.date = newer.date AND older.id < newer.id"
+            ),
+            text(
+                "DO $$ BEGIN "
+                "IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'uq_air_quality_measurements_city_date') THEN "
+                "ALTER TABLE air_quality_measurements "
+                "ADD CONSTRAINT uq_air_quality_measurements_city_date UNIQUE (city, date); "
+                "END IF; END $$"
+            ),
+            # The deleted duplicates were counted in every aggregate.
+            text("DELETE FROM city_aqi_stats"),
+            text(
+                "INSERT INTO city_aqi_stats (city, measurement_count, aqi_sum, aqi_min, aqi_max, last_date) "
+                "SELECT city, count(*), sum(aqi), min(aqi), max(aqi), max(date) "
+                "FROM air_quality_measurements GROUP BY city"
+            ),
+            text("DELETE FROM city_aqi_daily_rollups"),
+            text(
+                "INSERT INTO city_aqi_daily_rollups (city, period, measurement_count, aqi_sum, aqi_min, aqi_max) "
+                "SELECT city, date, count(*), sum(aqi), min(aqi), max(aqi) "
+                "FROM air_quality_measurements GROUP BY city, date"
+            ),
+            text("DELETE FROM city_aqi_monthly_rollups"),
+            text(
+                "INSERT INTO city_aqi_monthly_rollups (city, period, measurement_count, aqi_sum, aqi_min, aqi_max) "
+                "SELECT city, CAST(date_trunc('month', date) AS DATE), count(*), sum(aqi), min(aqi), max(aqi) "
+                "FROM air_quality_measurements GROUP BY city, CAST(date_trunc('month', date) AS DATE)"
+            ),
+        ],
+    ),
+]
+
+
+async def init_db(conn: AsyncConnection) -> None:
+    # Held until the startup transaction ends, so workers starting together never race on create_all either.
+    await _lock_migrations(conn)
+    partitioned = settings.partition_measurements
+    if partitioned and await measurements_relkind(conn) is None:
+        # Created up front, since create_all would otherwise create a plain table.
+        await create_partitioned_measurements(conn)
+    await conn.run_sync(Base.metadata.create_all)
+    await run_migrations(conn)
+    if not partitioned:
+        return
+
+    if await measurements_relkind(conn) == "p":
+        await ensure_future_partitions(conn)
+    else:
+        # Converting copies every row, far too long for the startup transaction every worker runs.
+        logger.warning(
+            "PARTITION_MEASUREMENTS is set but air_quality_measurements is a plain table; "
+            "convert it once with: python -m app.cli partition-measurements"
+        )
+
+
+async def run_migrations(conn: AsyncConnection) -> None:
+    # Re-entrant: a no-op wait when init_db already holds the lock.
+    await _lock_migrations(conn)
+    await conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, name VARCHAR(200) NOT NULL, applied_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+    ))
+    applied = set((await conn.execute(text("SELECT version FROM schema_migrations"))).scalars())
+
+    for version, name, steps in MIGRATIONS:
+        if version in applied:
+            continue
+
+        logger.info(f"Applying migration {version}: {name}")
+        for step in steps:
+            await conn.execute(step)
+        await conn.execute(
+            text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+            {"version": version, "name": name},
+        )
+
+
+async def _lock_migrations(conn: AsyncConnection) -> None:
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATIONS_LOCK_ID})
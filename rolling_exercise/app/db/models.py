@@ -1,18 +1,80 @@
 from datetime import date as DateType
 
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import Date, Float,Integer,String
+from sqlalchemy import BigInteger, Boolean, ColumnElement, Date, Float, Index, Integer, String, UniqueConstraint, false, text
 
 from app.db.session import Base
 
 class AirQualityMeasurement(Base):
     __tablename__ = "air_quality_measurements"
+    __table_args__ = (
+        # Keyset pagination seeks on (date, id), optionally behind a city filter.
+        Index("ix_air_quality_measurements_date_id", "date", "id"),
+        Index("ix_air_quality_measurements_city_date_id", "city", "date", "id"),
+        # Partial indexes over alert rows only, in the same (date, id) keyset order the alert endpoints page by.
+        Index("ix_air_quality_measurements_alerts_date_id", "date", "id", postgresql_where=text("is_alert")),
+        Index("ix_air_quality_measurements_alerts_city_date_id", "city", "date", "id", postgresql_where=text("is_alert")),
+        # Re-uploads must not duplicate rows; upsert ingest targets this constraint with ON CONFLICT.
+        UniqueConstraint("city", "date", name="uq_air_quality_measurements_city_date"),
+    )
 
     id: Mapped[int] = mapped_column(Integer,primary_key=True,autoincrement=True)
-    date: Mapped[DateType] = mapped_column(Date,index=True,nullable=False)
-    city: Mapped[str] = mapped_column(String(100),index=True,nullable=False)
+    date: Mapped[DateType] = mapped_column(Date,nullable=False)
+    city: Mapped[str] = mapped_column(String(100),nullable=False)
     pm25: Mapped[float] = mapped_column(Float,nullable=False)
     no2: Mapped[float] = mapped_column(Float,nullable=False)
     co2: Mapped[float] = mapped_column(Float,nullable=False)
     aqi: Mapped[float] = mapped_column(Float,nullable=False)
     aqi_level: Mapped[str] = mapped_column(String(50),nullable=False)
+    is_alert: Mapped[bool] = mapped_column(Boolean,nullable=False,default=False,server_default=false())
+
+
+class AqiAggregateMixin:
+    measurement_count: Mapped[int] = mapped_column(BigInteger,nullable=False)
+    aqi_sum: Mapped[float] = mapped_column(Float,nullable=False)
+    aqi_min: Mapped[float] = mapped_column(Float,nullable=False)
+    aqi_max: Mapped[float] = mapped_column(Float,nullable=False)
+
+    @hybrid_property
+    def average_aqi(self) -> float:
+        return self.aqi_sum / self.measurement_count
+
+    @average_aqi.inplace.expression
+    @classmethod
+    def _average_aqi_expression(cls) -> ColumnElement[float]:
+        # A plain "/" keeps the division in double precision (SQLAlchemy's "/" would add casts), and keeps the
+        # expression textually identical to ix_city_aqi_stats_average_aqi so the planner can match it.
+        return cls.aqi_sum.op("/", return_type=Float)(cls.measurement_count)
+
+
+class CityAqiStats(AqiAggregateMixin, Base):
+    __tablename__ = "city_aqi_stats"
+
+    city: Mapped[str] = mapped_column(String(100),primary_key=True)
+    last_date: Mapped[DateType] = mapped_column(Date,nullable=False)
+
+
+# Serves /cities/best (ORDER BY average LIMIT n) by reading only the first n index entries.
+Index("ix_city_aqi_stats_average_aqi", CityAqiStats.average_aqi, CityAqiStats.city)
+
+
+class CityAqiDailyRollup(AqiAggregateMixin, Base):
+    __tablename__ = "city_aqi_daily_rollups"
+
+    city: Mapped[str] = mapped_column(String(100),primary_key=True)
+    period: Mapped[DateType] = mapped_column(Date,primary_key=True)
+
+
+class CityAqiMonthlyRollup(AqiAggregateMixin, Base):
+    __tablename__ = "city_aqi_monthly_rollups"
+
+    city: Mapped[str] = mapped_column(String(100),primary_key=True)
+    period: Mapped[DateType] = mapped_column(Date,primary_key=True)  # first day of the month
+
+
+class AppState(Base):
+    __tablename__ = "app_state"
+
+    key: Mapped[str] = mapped_column(String(100),primary_key=True)
+    value: Mapped[str] = mapped_column(String(200),nullable=False)
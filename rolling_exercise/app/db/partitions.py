@@ -0,0 +1,190 @@
+"""Optional monthly RANGE partitioning of air_quality_measurements on date.
+
+Enabled with PARTITION_MEASUREMENTS. Each month lives in its own partition
+(air_quality_measurements_pYYYYMM), so date-range queries only touch the
+months they cover and retention drops whole partitions instead of deleting rows.
+"""
+import logging
+from collections.abc import Iterable
+from datetime import date
+
+from sqlalchemy import MetaData, PrimaryKeyConstraint, Table, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.constants.config import settings
+from app.db.models import AirQualityMeasurement
+from app.core.logger import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+MEASUREMENTS_TABLE = AirQualityMeasurement.__table__.name
+
+# Held while partitions are created, so concurrent ingests do not race on the same CREATE TABLE.
+PARTITIONS_LOCK_ID = 7_311_525
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{MEASUREMENTS_TABLE}_p{month:%Y%m}"
+
+
+def partition_month(name: str) -> date | None:
+    prefix = f"{MEASUREMENTS_TABLE}_p"
+    suffix = name.removeprefix(prefix)
+    if suffix == name or len(suffix) != 6 or not suffix.isdigit():
+        return None
+    return date(int(suffix[:4]), int(suffix[4:]), 1)
+
+
+def partitioned_measurements_table() -> Table:
+    table = AirQualityMeasurement.__table__.to_metadata(MetaData())
+    # Postgres requires the partition key in every unique constraint, the primary key included.
+    table.c.date.primary_key = True
+    table.append_constraint(PrimaryKeyConstraint(table.c.id, table.c.date, name=f"{MEASUREMENTS_TABLE}_pkey"))
+    table.dialect_kwargs["postgresql_partition_by"] = "RANGE (date)"
+    return table
+
+
+async def measurements_relkind(conn: AsyncConnection | AsyncSession) -> str | None:
+    return await conn.scalar(text("SELECT relkind::text FROM pg_class WHERE oid = to_regclass(:name)"), {"name": MEASUREMENTS_TABLE})
+
+
+async def is_partitioned(conn: AsyncConnection | AsyncSession) -> bool:
+    return await measurements_relkind(conn) == "p"
+
+
+async def create_partitioned_measurements(conn: AsyncConnection) -> None:
+    await conn.run_sync(partitioned_measurements_table().create)
+    logger.info("Created partitioned air_quality_measurements")
+
+
+async def ensure_partitioned_measurements(conn: AsyncConnection) -> None:
+    """Create air_quality_measurements as a partitioned table, converting an existing plain table.
+
+    The conversion copies every row in conn's transaction, so it is run once by the partition-measurements
+    command rather than at startup.
+    """
+    relkind = await measurements_relkind(conn)
+    if relkind == "p":
+        logger.info("air_quality_measurements is already partitioned")
+        return
+
+    if relkind is None:
+        await create_partitioned_measurements(conn)
+        return
+
+    await _convert_to_partitioned(conn)
+
+
+async def _convert_to_partitioned(conn: AsyncConnection) -> None:
+    legacy = f"{MEASUREMENTS_TABLE}_legacy"
+    logger.warning("Converting air_quality_measurements to a partitioned table; rows are copied once")
+
+    # The new table reuses every name (indexes, constraints, id sequence), so the old ones move aside first.
+    await conn.execute(text(f"ALTER TABLE {MEASUREMENTS_TABLE} RENAME TO {legacy}"))
+    await conn.execute(text(f"ALTER SEQUENCE {MEASUREMENTS_TABLE}_id_seq RENAME TO {legacy}_id_seq"))
+    index_names = (await conn.execute(text("SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = :table"), {"table": legacy})).scalars().all()
+    for index_name in index_names:
+        await conn.execute(text(f'ALTER INDEX "{index_name}" RENAME TO "{index_name}_legacy"'))
+
+    await conn.run_sync(partitioned_measurements_table().create)
+    first, last = (await conn.execute(text(f"SELECT min(date), max(date) FROM {legacy}"))).one()
+    if first is not None:
+        await ensure_partitions(conn, _months_between(month_start(first), month_start(last)))
+
+    columns = ", ".join(column.name for column in AirQualityMeasurement.__table__.columns)
+    await conn.execute(text(f"INSERT INTO {MEASUREMENTS_TABLE} ({columns}) SELECT {columns} FROM {legacy}"))
+    await conn.execute(text(
+        f"SELECT setval('{MEASUREMENTS_TABLE}_id_seq', coalesce((SELECT max(id) FROM {MEASUREMENTS_TABLE}), 0) + 1, false)"
+    ))
+    await conn.execute(text(f"DROP TABLE {legacy}"))
+    logger.info("air_quality_measurements converted to a partitioned table")
+
+
+async def _missing_partitions(conn: AsyncConnection | AsyncSession, names: Iterable[str]) -> list[str]:
+    return (await conn.execute(
+        text("SELECT name FROM unnest(CAST(:names AS text[])) AS name WHERE to_regclass(name) IS NULL"),
+        {"names": list(names)},
+    )).scalars().all()
+
+
+async def ensure_partitions(conn: AsyncConnection | AsyncSession, months: Iterable[date]) -> list[str]:
+    """Create the monthly partitions that do not exist yet; returns the names created.
+
+    Each partition is created on its own and then attached, which locks the parent in SHARE UPDATE EXCLUSIVE
+    mode: unlike CREATE TABLE ... PARTITION OF (ACCESS EXCLUSIVE), that does not wait for open transactions
+    writing measurements, nor block reads.
+    """
+    names = {partition_name(month): month for month in months}
+    if not names:
+        return []
+
+    missing = await _missing_partitions(conn, names)
+    if not missing:
+        return []
+
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": PARTITIONS_LOCK_ID})
+    # Another transaction may have created some while this one waited for the lock.
+    missing = await _missing_partitions(conn, missing)
+    for name in missing:
+        month = names[name]
+        await conn.execute(text(f"CREATE TABLE {name} (LIKE {MEASUREMENTS_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+        await conn.execute(text(
+            f"ALTER TABLE {MEASUREMENTS_TABLE} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        ))
+    if missing:
+        logger.info(f"Created measurement partitions: {', '.join(sorted(missing))}")
+    return sorted(missing)
+
+
+async def ensure_partitions_for_write(db: AsyncSession, months: Iterable[date]) -> list[str]:
+    """Make sure db can write into the partitions for months; returns the names created.
+
+    Missing ones are created by ensure_partitions in a short transaction of its own, committed before db writes:
+    inside db's transaction the DDL locks would be held until the whole upload commits.
+    """
+    months = list(months)
+    names = [partition_name(month) for month in months]
+    if not names or not await is_partitioned(db):
+        return []
+
+    created = []
+    if await _missing_partitions(db, names):
+        async with db.bind.begin() as conn:
+            created = await ensure_partitions(conn, months)
+
+    # The lock db's insert would take anyway; acquiring it now also makes db's transaction see partitions
+    # attached since it first wrote to the table (a transaction already holding the parent does not otherwise).
+    await db.execute(text(f"LOCK TABLE {', '.join(names)} IN ROW EXCLUSIVE MODE"))
+    return created
+
+
+async def ensure_future_partitions(conn: AsyncConnection | AsyncSession, *, today: date | None = None) -> list[str]:
+    current = month_start(today or date.today())
+    return await ensure_partitions(conn, _months_between(current, add_months(current, settings.partition_months_ahead)))
+
+
+async def list_partitions(conn: AsyncConnection | AsyncSession) -> dict[str, date]:
+    names = (await conn.execute(
+        text("SELECT child.relname FROM pg_inherits JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid WHERE inhparent = to_regclass(:name)"),
+        {"name": MEASUREMENTS_TABLE},
+    )).scalars().all()
+    return {name: month for name in names if (month := partition_month(name)) is not None}
+
+
+def _months_between(first: date, last: date) -> list[date]:
+    months = []
+    month = first
+    while month <= last:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
@@ -1,18 +1,54 @@
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from typing import Any
+from uuid import uuid4
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 
 from app.constants.config import settings
+from app.db.pool import MeteredQueuePool
 
 
 class Base(DeclarativeBase):
     pass
 
 
-engine = create_async_engine(settings.database_url, pool_pre_ping=True)
+def _connect_args() -> dict[str, Any]:
+    if settings.db_statement_cache_size:
+        return {"prepared_statement_cache_size": settings.db_statement_cache_size}
+    # Behind pgbouncer transaction pooling a server connection is shared between clients: SQLAlchemy's and
+    # asyncpg's own statement caches are both off, and the statements asyncpg still prepares get unique names.
+    return {
+        "prepared_statement_cache_size": 0,
+        "statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+    }
+
+
+def build_engine(url: str) -> AsyncEngine:
+    return create_async_engine(
+        url,
+        poolclass=MeteredQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args=_connect_args(),
+    )
+
+
+engine = build_engine(settings.database_url)
+read_engine = build_engine(settings.read_database_url) if settings.read_database_url else engine
 
 SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+ReadSessionLocal = async_sessionmaker(bind=read_engine, class_=AsyncSession, expire_on_commit=False)
 
 
 async def get_db():
     async with SessionLocal() as session:
         yield session
+
+
+async def get_read_db():
+    async with ReadSessionLocal() as session:
+        yield session
@@ -1,2 +1,22 @@
 class CsvParseError(Exception):
     """Raised when an uploaded CSV cannot be parsed or validated."""
+
+
+class IngestQueueFullError(Exception):
+    """Raised when the background ingest queue cannot accept another job."""
+
+
+class IngestQueueNotRunningError(Exception):
+    """Raised when a job is submitted to an ingest queue that is not started (or already stopped)."""
+
+
+class InvalidCursorError(Exception):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+class UnknownAqiStandardError(Exception):
+    """Raised when an AQI standard is not in the registry."""
+
+
+class AqiStandardConflictError(Exception):
+    """Raised when a requested AQI standard is not the one configured for a city it would apply to."""
@@ -1,28 +1,47 @@
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 
-from app.db.session import Base, engine
-from app.db import models
+from app.db.session import SessionLocal, engine, read_engine
+from app.db.migrations import init_db
+from app.exceptions import InvalidCursorError
 from app.routes.router import api_router  
+from app.core.executor import shutdown_cpu_executor, start_cpu_executor
 from app.core.logger import setup_logging
+from app.core.middleware import MetricsMiddleware
+from app.services.alerts_service import sync_alert_flags
+from app.services.ingest_jobs_service import ingest_jobs
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     setup_logging()
+    start_cpu_executor()
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await init_db(conn)
+    async with SessionLocal() as session:
+        await sync_alert_flags(session=session)
+    await ingest_jobs.start()
 
     yield
 
+    await ingest_jobs.stop()
     await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
+    shutdown_cpu_executor()
 
 
 app = FastAPI(title="Air Quality API", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(api_router) 
 
+@app.exception_handler(InvalidCursorError)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursorError) -> JSONResponse:
+    return JSONResponse(status_code=400, content={"detail": "invalid cursor"})
+
 @app.get("/health")
 async def health() -> dict:
     return {"status": "ok"}
@@ -1,18 +1,20 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
-from app.schemas.air_quality import AirQualityMeasurementOut
+from app.db.session import get_read_db
+from app.routes.pagination import PageParams, measurement_page_response
+from app.schemas.air_quality import MeasurementPage
 from app.services.alerts_service import fetch_alerts, fetch_alerts_by_city
 
 router = APIRouter(prefix="/alerts")
 
 
-@router.get("", response_model=list[AirQualityMeasurementOut])
-async def get_alerts(session: AsyncSession = Depends(get_db)) -> list[AirQualityMeasurementOut]:
-    return await fetch_alerts(session=session)
+@router.get("", response_model=MeasurementPage)
+async def get_alerts(request: Request, page: PageParams = Depends(), session: AsyncSession = Depends(get_read_db)) -> Response:
+    return measurement_page_response(request, await fetch_alerts(session=session, limit=page.limit, cursor=page.cursor))
 
 
-@router.get("/city/{city}", response_model=list[AirQualityMeasurementOut])
-async def get_alerts_by_city(city: str, session: AsyncSession = Depends(get_db),) -> list[AirQualityMeasurementOut]:
-    return await fetch_alerts_by_city(session=session, city=city)
+@router.get("/city/{city}", response_model=MeasurementPage)
+async def get_alerts_by_city(city: str, request: Request, page: PageParams = Depends(), session: AsyncSession = Depends(get_read_db),) -> Response:
+    alerts = await fetch_alerts_by_city(session=session, city=city, limit=page.limit, cursor=page.cursor)
+    return measurement_page_response(request, alerts)
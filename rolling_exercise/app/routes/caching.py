@@ -0,0 +1,21 @@
+import hashlib
+from typing import Any
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+
+def etag_response(request: Request, content: Any) -> Response:
+    """Serialize content with a strong ETag, answering 304 when the client already has it."""
+    return with_etag(request, JSONResponse(jsonable_encoder(content)))
+
+
+def with_etag(request: Request, response: Response) -> Response:
+    etag = f'"{hashlib.sha1(response.body).hexdigest()}"'
+
+    if etag in {tag.strip() for tag in request.headers.get("if-none-match", "").split(",")}:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    response.headers["ETag"] = etag
+    return response
@@ -1,29 +1,54 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
-from app.schemas.air_quality import AirQualityMeasurementOut, CityAqiAverageOut
+from app.db.session import get_read_db
+from app.routes.caching import etag_response
+from app.routes.pagination import PageParams, measurement_page_response
+from app.schemas.air_quality import CityAqiAverageOut, CityAqiRollupOut, MeasurementPage
 from app.services.cities_service import fetch_best_cities, fetch_by_city, fetch_average_city_aqi
+from app.services.rollup_service import fetch_city_rollup
 
 router = APIRouter(prefix="/cities")
 
 @router.get("/best", response_model=list[CityAqiAverageOut])
-async def get_best_cities(session: AsyncSession = Depends(get_db)) -> list[CityAqiAverageOut]:
+async def get_best_cities(request: Request, session: AsyncSession = Depends(get_read_db)) -> Response:
     rows = await fetch_best_cities(session=session, limit=3)
-    return [CityAqiAverageOut(city=city, average_aqi=average_aqi) for city, average_aqi in rows]
+    return etag_response(request, [CityAqiAverageOut(city=city, average_aqi=average_aqi) for city, average_aqi in rows])
 
-@router.get("/{city}", response_model=list[AirQualityMeasurementOut])
-async def get_city_measurements(city: str, session: AsyncSession = Depends(get_db)) -> list[AirQualityMeasurementOut]:
+@router.get("/{city}", response_model=MeasurementPage)
+async def get_city_measurements(city: str, request: Request, page: PageParams = Depends(), session: AsyncSession = Depends(get_read_db)) -> Response:
     try:
-        return await fetch_by_city(session=session, city=city)
+        measurements = await fetch_by_city(session=session, city=city, limit=page.limit, cursor=page.cursor)
     except KeyError:
         raise HTTPException(status_code=404, detail="unknown city")
 
+    return measurement_page_response(request, measurements)
+
 @router.get("/{city}/average", response_model=CityAqiAverageOut)
-async def get_average_city_aqi(city: str, session: AsyncSession = Depends(get_db)) -> CityAqiAverageOut:
+async def get_average_city_aqi(city: str, request: Request, session: AsyncSession = Depends(get_read_db)) -> Response:
     try:
         avg_aqi = await fetch_average_city_aqi(session=session, city=city)
     except KeyError:
         raise HTTPException(status_code=404, detail="no measurements found for this city")
 
-    return CityAqiAverageOut(city=city, average_aqi=avg_aqi)
+    return etag_response(request, CityAqiAverageOut(city=city, average_aqi=avg_aqi))
+
+@router.get("/{city}/rollup", response_model=list[CityAqiRollupOut])
+async def get_city_rollup(
+    city: str,
+    granularity: Literal["day", "month"] = "day",
+    start_date: date | None = None,
+    end_date: date | None = None,
+    session: AsyncSession = Depends(get_read_db),
+) -> list[CityAqiRollupOut]:
+    if start_date is not None and end_date is not None and start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must be <= end_date")
+
+    rows = await fetch_city_rollup(session=session, city=city, granularity=granularity, start_date=start_date, end_date=end_date)
+    return [
+        CityAqiRollupOut(period=period, measurement_count=count, average_aqi=average_aqi, min_aqi=min_aqi, max_aqi=max_aqi)
+        for period, count, average_aqi, min_aqi, max_aqi in rows
+    ]
@@ -1,19 +1,35 @@
 from datetime import date
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
-from app.schemas.air_quality import AirQualityMeasurementOut
-from app.services.history_service import fetch_history
+from app.db.session import get_read_db
+from app.routes.pagination import PageParams, measurement_page_response
+from app.schemas.air_quality import MeasurementPage
+from app.constants.export_constants import CSV_MEDIA_TYPE, NDJSON_MEDIA_TYPE
+from app.services.export_service import iter_csv, iter_ndjson
+from app.services.history_service import fetch_history, stream_history
 
 router = APIRouter()
 
 
-@router.get("/history", response_model=list[AirQualityMeasurementOut])
-async def get_history(start_date: date,end_date: date,db: AsyncSession = Depends(get_db),) -> list[AirQualityMeasurementOut]:
+@router.get("/history", response_model=MeasurementPage)
+async def get_history(start_date: date,end_date: date,request: Request,page: PageParams = Depends(),db: AsyncSession = Depends(get_read_db),) -> Response:
     if start_date > end_date:
         
         raise HTTPException(status_code=400, detail="start_date must be <= end_date")
 
-    return await fetch_history(db=db, start_date=start_date, end_date=end_date)
+    return measurement_page_response(request, await fetch_history(db=db, start_date=start_date, end_date=end_date, limit=page.limit, cursor=page.cursor))
+
+
+@router.get("/history/export", response_class=StreamingResponse)
+async def export_history(start_date: date,end_date: date,accept: str | None = Header(None),db: AsyncSession = Depends(get_read_db),) -> StreamingResponse:
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must be <= end_date")
+
+    partitions = stream_history(db=db, start_date=start_date, end_date=end_date)
+    if accept is not None and CSV_MEDIA_TYPE in accept:
+        return StreamingResponse(iter_csv(partitions), media_type=CSV_MEDIA_TYPE)
+
+    return StreamingResponse(iter_ndjson(partitions), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,36 @@
+import math
+
+from fastapi import Query, Request, Response
+
+from app.constants.config import settings
+from app.routes.caching import with_etag
+from app.routes.responses import PlainJSONResponse
+from app.services.pagination import MEASUREMENT_PAGE_FIELDS, Page
+
+
+class PageParams:
+    def __init__(
+        self,
+        limit: int = Query(settings.page_default_limit, ge=1, le=settings.page_max_limit),
+        cursor: str | None = Query(None),
+    ) -> None:
+        self.limit = limit
+        self.cursor = cursor
+
+
+def measurement_page_content(page: Page) -> dict:
+    """Shape a page of measurement rows like MeasurementPage, without building pydantic models."""
+    # Rows hold the MEASUREMENT_PAGE_FIELDS columns in order, then id, which zip leaves out.
+    items = [{name: _json_value(value) for name, value in zip(MEASUREMENT_PAGE_FIELDS, row)} for row in page.items]
+    return {"items": items, "next_cursor": page.next_cursor}
+
+
+def _json_value(value):
+    # JSON has no NaN or infinity; pydantic wrote them as null, so this does too.
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def measurement_page_response(request: Request, page: Page) -> Response:
+    return with_etag(request, PlainJSONResponse(measurement_page_content(page)))
@@ -0,0 +1,14 @@
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+
+class PlainJSONResponse(JSONResponse):
+    """JSON response for content that is already JSON-native (dicts, lists, str, finite numbers, dates).
+
+    Skips jsonable_encoder and pydantic and encodes straight with the stdlib encoder.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return json.dumps(content, default=str, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
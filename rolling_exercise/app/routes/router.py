@@ -4,10 +4,14 @@ from app.routes.upload import router as upload_router
 from app.routes.cities import router as cities_router
 from app.routes.alerts import router as alerts_router
 from app.routes.history import router as history_router
+from app.routes.stats import router as stats_router
+from app.routes.metrics import router as metrics_router
 
 api_router = APIRouter()
 
 api_router.include_router(upload_router, tags=["upload"])
 api_router.include_router(cities_router,tags=["cities"])
 api_router.include_router(alerts_router,tags=["alerts"])
-api_router.include_router(history_router,tags=["history"])
\ No newline at end of file
+api_router.include_router(history_router,tags=["history"])
+api_router.include_router(stats_router,tags=["stats"])
+api_router.include_router(metrics_router,tags=["metrics"])
\ No newline at end of file
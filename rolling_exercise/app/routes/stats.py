@@ -0,0 +1,22 @@
+from typing import Any
+
+from fastapi import APIRouter
+
+from app.core import cache
+from app.db.pool import pool_status
+from app.db.session import engine, read_engine
+
+router = APIRouter(prefix="/stats")
+
+
+@router.get("/cache")
+async def get_cache_stats() -> dict[str, Any]:
+    return await cache.read_cache.stats()
+
+
+@router.get("/pool")
+async def get_pool_stats() -> dict[str, Any]:
+    return {
+        "primary": pool_status(engine),
+        "replica": pool_status(read_engine) if read_engine is not engine else None,
+    }
@@ -1,11 +1,18 @@
 import logging
-from fastapi import APIRouter, Depends, File, HTTPException, Response, UploadFile
-from sqlalchemy.exc import SQLAlchemyError
+from typing import Literal
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.constants.ingest_constants import ASYNC_MULTIPLE_FILES_ERROR, DUPLICATE_MEASUREMENTS_ERROR
 from app.db.session import get_db
-from app.exceptions import CsvParseError
-from app.services.upload_service import ingest_air_quality_csv
+from app.exceptions import CsvParseError, IngestQueueFullError, IngestQueueNotRunningError
+from app.schemas.air_quality import IngestJobOut
+from app.services.ingest_jobs_service import ingest_jobs
+from app.services.archive_service import UploadSource
+from app.services.upload_service import ingest_air_quality_uploads
 from app.core.logger import LOGGER_NAME
 
 router = APIRouter()
@@ -13,21 +20,53 @@ logger = logging.getLogger(LOGGER_NAME)
 
 
 @router.post("/upload")
-async def upload_csv(file: UploadFile = File(...),db: AsyncSession = Depends(get_db),) -> Response:
-    logger.info(f"Received /upload request for file: {file.filename}")
+async def upload_csv(
+    files: list[UploadFile] = File(..., alias="file"),
+    async_mode: bool = Query(False, alias="async"),
+    transaction: Literal["single", "per_file"] | None = Query(None),
+    db: AsyncSession = Depends(get_db),
+) -> Response:
+    logger.info(f"Received /upload request for files: {', '.join(str(file.filename) for file in files)}")
+    uploads = [UploadSource(filename=file.filename, source=file.file, content_type=file.content_type) for file in files]
+
+    if async_mode:
+        if len(uploads) > 1:
+            raise HTTPException(status_code=400, detail=ASYNC_MULTIPLE_FILES_ERROR)
+        try:
+            job = await ingest_jobs.submit(upload=uploads[0], transaction=transaction)
+        except IngestQueueFullError as exc:
+            raise HTTPException(status_code=429, detail="Ingest queue is full, retry later") from exc
+        except IngestQueueNotRunningError as exc:
+            raise HTTPException(status_code=503, detail="Background ingest is not available") from exc
 
-    content = await file.read()
+        return JSONResponse(status_code=202, content=job.to_out().model_dump())
 
     try:
-        inserted_rows = await ingest_air_quality_csv(file_content=content, db=db)
-        logger.info(f"Upload completed. {inserted_rows} rows inserted")
+        result = await ingest_air_quality_uploads(uploads=uploads, db=db, transaction=transaction)
+        logger.info(
+            f"Upload completed. {result.rows_inserted} inserted, {result.rows_updated} updated, "
+            f"{result.rows_skipped} skipped ({result.rows_per_second:.0f} rows/sec)"
+        )
 
     except CsvParseError as exc:
-        logger.warning(f"CSV parsing error: {exc}")
+        logger.warning(f"Upload parsing error: {exc}")
         raise HTTPException(status_code=400, detail=str(exc)) from exc
-    
+
+    except IntegrityError as exc:
+        logger.warning(f"Upload conflicts with stored measurements: {exc}")
+        raise HTTPException(status_code=409, detail=DUPLICATE_MEASUREMENTS_ERROR) from exc
+
     except SQLAlchemyError as exc:
         logger.error(f"Database error during upload: {exc}")
         raise HTTPException(status_code=500, detail="Database error") from exc
 
-    return Response(content="ok", media_type="text/plain")
+    return JSONResponse(content=result.model_dump())
+
+
+@router.get("/upload/jobs/{job_id}", response_model=IngestJobOut)
+async def get_upload_job(job_id: str) -> IngestJobOut:
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="unknown job")
+
+    return job.to_out()
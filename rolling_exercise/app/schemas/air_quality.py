@@ -3,13 +3,6 @@ from datetime import date
 from pydantic import BaseModel, Field, ConfigDict
 
 
-class AirQualityRow(BaseModel):
-    date: date
-    city: str = Field(min_length=1, max_length=100)
-    pm25: float
-    no2: float
-    co2: float
-
 class AqiResult(BaseModel):
     aqi: float
     aqi_level: str
@@ -25,6 +18,53 @@ class AirQualityMeasurementOut(BaseModel):
     aqi:float
     aqi_level:str
 
+class MeasurementPage(BaseModel):
+    items: list[AirQualityMeasurementOut]
+    next_cursor: str | None = None
+
 class CityAqiAverageOut(BaseModel):
     city: str
-    average_aqi: float
\ No newline at end of file
+    average_aqi: float
+
+class IngestResult(BaseModel):
+    mode: str
+    rows_inserted: int
+    rows_updated: int = 0
+    rows_skipped: int = 0
+    elapsed_seconds: float
+    rows_per_second: float
+
+
+class IngestFileResult(BaseModel):
+    filename: str | None = None
+    status: str
+    rows_inserted: int = 0
+    rows_updated: int = 0
+    rows_skipped: int = 0
+    error: str | None = None
+
+
+class IngestBatchResult(IngestResult):
+    transaction: str
+    files: list[IngestFileResult]
+
+
+class IngestJobOut(BaseModel):
+    job_id: str
+    status: str
+    filename: str | None = None
+    rows_processed: int = 0
+    rows_inserted: int = 0
+    rows_updated: int = 0
+    rows_skipped: int = 0
+    elapsed_seconds: float = 0.0
+    rows_per_second: float = 0.0
+    error: str | None = None
+
+
+class CityAqiRollupOut(BaseModel):
+    period: date
+    measurement_count: int
+    average_aqi: float
+    min_aqi: float
+    max_aqi: float
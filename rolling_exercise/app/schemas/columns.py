@@ -0,0 +1,25 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class AirQualityColumns:
+    date: np.ndarray  # datetime64[D]
+    city: np.ndarray  # object (str)
+    pm25: np.ndarray  # float64
+    no2: np.ndarray  # float64
+    co2: np.ndarray  # float64
+
+    def __len__(self) -> int:
+        return len(self.date)
+
+
+@dataclass(frozen=True)
+class AqiColumns:
+    aqi: np.ndarray
+    aqi_level: np.ndarray
+    is_alert: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.aqi)
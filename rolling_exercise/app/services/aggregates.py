@@ -0,0 +1,49 @@
+import pandas as pd
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import Insert, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.constants.config import settings
+
+from app.db.models import AqiAggregateMixin
+
+
+def aggregate_aqi(frame: pd.DataFrame, keys: list[str], **extra) -> pd.DataFrame:
+    # groupby sorts by the keys, so concurrent ingests lock the aggregate rows in the same order.
+    return frame.groupby(keys).agg(
+        measurement_count=("aqi", "size"),
+        aqi_sum=("aqi", "sum"),
+        aqi_min=("aqi", "min"),
+        aqi_max=("aqi", "max"),
+        **extra,
+    ).reset_index()
+
+
+def upsert_aggregates(model: type[AqiAggregateMixin], keys: list[str], **extra_set) -> Insert:
+    # Core insert against the table: the ORM bulk path would re-process every record in Python.
+    stmt = pg_insert(model.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={
+            "measurement_count": model.measurement_count + stmt.excluded.measurement_count,
+            "aqi_sum": model.aqi_sum + stmt.excluded.aqi_sum,
+            "aqi_min": func.least(model.aqi_min, stmt.excluded.aqi_min),
+            "aqi_max": func.greatest(model.aqi_max, stmt.excluded.aqi_max),
+            **{name: value(stmt.excluded) for name, value in extra_set.items()},
+        },
+    )
+
+
+async def execute_upserts(db: AsyncSession, stmt: Insert, records: list[dict]) -> None:
+    # Parameters are processed on the event loop, so large record lists go out in ingest_batch_size slices.
+    for start in range(0, len(records), settings.ingest_batch_size):
+        await db.execute(stmt, records[start:start + settings.ingest_batch_size])
+
+
+def aggregate_records(grouped: pd.DataFrame) -> list[dict]:
+    records = grouped.to_dict(orient="records")
+    for record in records:
+        for name, value in record.items():
+            if isinstance(value, pd.Timestamp):
+                record[name] = value.date()
+    return records
@@ -1,30 +1,61 @@
 from __future__ import annotations
 
-from sqlalchemy import select
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.constants.config import settings
-from app.db.models import AirQualityMeasurement
+from app.constants.ingest_constants import ALERT_THRESHOLD_STATE_KEY
+from app.db.models import AirQualityMeasurement, AppState
+from app.services.pagination import Page, paginate, select_measurement_rows, to_page
 import logging
+from app.core.cache import cached, invalidate_read_caches
 from app.core.logger import LOGGER_NAME
 
 logger = logging.getLogger(LOGGER_NAME)
 
-async def fetch_alerts(*, session: AsyncSession) -> list[AirQualityMeasurement]:
-    logger.info(f"Fetching alerts (threshold={settings.alert_aqi_threshold})")
-    stmt = select(AirQualityMeasurement).where(AirQualityMeasurement.aqi > settings.alert_aqi_threshold)
-    result = await session.execute(stmt)
-    rows = result.scalars().all()
-    logger.info(f"Alerts fetched: {len(rows)} rows")
+@cached("fetch_alerts")
+async def fetch_alerts(*, session: AsyncSession, limit: int, cursor: str | None = None) -> Page:
+    logger.info(f"Fetching alerts (threshold={settings.alert_aqi_threshold}, limit={limit})")
+    stmt = select_measurement_rows().where(AirQualityMeasurement.is_alert)
+    result = await session.execute(paginate(stmt, limit=limit, cursor=cursor))
+    page = to_page(result.all(), limit=limit)
+    logger.info(f"Alerts fetched: {len(page.items)} rows")
 
-    return rows
+    return page
 
 
-async def fetch_alerts_by_city(*, session: AsyncSession, city: str) -> list[AirQualityMeasurement]:
-    logger.info(f"Fetching alerts for city={city}")
-    stmt = select(AirQualityMeasurement).where(AirQualityMeasurement.aqi > settings.alert_aqi_threshold,AirQualityMeasurement.city == city,)
-    result = await session.execute(stmt)
-    rows = result.scalars().all()
-    logger.info(f"Alerts for city={city}:{len(rows)} rows")
+@cached("fetch_alerts_by_city")
+async def fetch_alerts_by_city(*, session: AsyncSession, city: str, limit: int, cursor: str | None = None) -> Page:
+    logger.info(f"Fetching alerts for city={city} (limit={limit})")
+    stmt = select_measurement_rows().where(AirQualityMeasurement.is_alert,AirQualityMeasurement.city == city,)
+    result = await session.execute(paginate(stmt, limit=limit, cursor=cursor))
+    page = to_page(result.all(), limit=limit)
+    logger.info(f"Alerts for city={city}:{len(page.items)} rows")
     
-    return rows
+    return page
+
+
+async def reflag_alerts(*, session: AsyncSession, threshold: int) -> int:
+    logger.info(f"Re-flagging alerts (threshold={threshold})")
+    is_alert = AirQualityMeasurement.aqi > threshold
+    stmt = (
+        update(AirQualityMeasurement)
+        .where(AirQualityMeasurement.is_alert.is_distinct_from(is_alert))
+        .values(is_alert=is_alert)
+    )
+    result = await session.execute(stmt)
+    await session.merge(AppState(key=ALERT_THRESHOLD_STATE_KEY, value=str(threshold)))
+    await session.commit()
+    await invalidate_read_caches()
+    logger.info(f"Alerts re-flagged: {result.rowcount} rows changed")
+
+    return result.rowcount
+
+
+async def sync_alert_flags(*, session: AsyncSession) -> None:
+    """Re-flag stored rows when ALERT_AQI_THRESHOLD differs from the one they were flagged with."""
+    flagged_with = await session.get(AppState, ALERT_THRESHOLD_STATE_KEY)
+    if flagged_with is not None and flagged_with.value == str(settings.alert_aqi_threshold):
+        return
+
+    await reflag_alerts(session=session, threshold=settings.alert_aqi_threshold)
@@ -0,0 +1,162 @@
+"""Rewrite stored aqi, aqi_level and is_alert under an AQI standard, entirely in SQL.
+
+A standard's breakpoint tables compile to CASE expressions, so each batch is one
+UPDATE ... FROM (SELECT id, <aqi expression> ...) and no row is loaded into Python.
+The arithmetic follows AqiCalculator step for step in double precision, so a
+recomputed row stores the same values an upload under that standard would.
+"""
+import logging
+from collections.abc import Collection
+
+from sqlalchemy import ColumnElement, Float, FromClause, Update, and_, case, func, literal, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.util import ClauseAdapter
+
+from calculate_aqi import MAX_AQI, AqiCalculator
+from app.constants.config import settings
+from app.db.models import AirQualityMeasurement
+from app.services.aqi_service import check_requested_standard, city_standard_overrides, get_aqi_calculator
+from app.services.city_stats_service import recompute_city_stats_statements
+from app.services.rollup_service import recompute_rollup_statements
+from app.core.cache import invalidate_read_caches
+from app.core.logger import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+def _float(value: float) -> ColumnElement[float]:
+    return literal(float(value), Float)
+
+
+def sub_index_expression(column: ColumnElement[float], breakpoints) -> ColumnElement[float]:
+    # Latest range first, so a value on a shared boundary falls in the later range as in AqiCalculator.
+    return case(
+        *(
+            (
+                and_(column >= _float(lower), column <= _float(upper)),
+                _float(aqi_lower) + (column - _float(lower)) * _float(aqi_upper - aqi_lower) / _float(upper - lower),
+            )
+            for lower, upper, aqi_lower, aqi_upper in reversed(breakpoints)
+        ),
+        else_=_float(MAX_AQI),
+    )
+
+
+def aqi_expression(calculator: AqiCalculator, source: FromClause) -> ColumnElement[float]:
+    columns = (source.c.pm25, source.c.no2, source.c.co2)
+    sub_indexes = (
+        func.least(sub_index_expression(column, sub_index.breakpoints), _float(MAX_AQI))
+        for column, sub_index in zip(columns, calculator.sub_indexes)
+    )
+    return func.greatest(*sub_indexes, _float(0), type_=Float)
+
+
+def aqi_level_expression(calculator: AqiCalculator, aqi: ColumnElement[float]) -> ColumnElement[str]:
+    *lower_levels, (_, top_level) = calculator.thresholds
+    return case(*((aqi <= _float(limit), literal(level)) for limit, level in lower_levels), else_=literal(top_level))
+
+
+def recompute_aqi_statement(
+    calculator: AqiCalculator, *filters: ColumnElement[bool], threshold: int
+) -> Update:
+    """UPDATE rewriting the measurements matching filters (over the table) whose stored values differ."""
+    table = AirQualityMeasurement.__table__
+    # Read through an alias, so the subquery does not correlate with the UPDATE target; filters are adapted to it.
+    source = table.alias("source")
+    adapter = ClauseAdapter(source)
+    computed = (
+        select(source.c.id, source.c.date, aqi_expression(calculator, source).label("aqi"))
+        .where(*(adapter.traverse(condition) for condition in filters))
+        .subquery("computed")
+    )
+    aqi_level = aqi_level_expression(calculator, computed.c.aqi)
+    is_alert = computed.c.aqi > threshold
+    return (
+        update(table)
+        .where(
+            table.c.id == computed.c.id,
+            # Lets Postgres prune partitions when measurements are partitioned by date.
+            table.c.date == computed.c.date,
+            tuple_(table.c.aqi, table.c.aqi_level, table.c.is_alert).is_distinct_from(tuple_(computed.c.aqi, aqi_level, is_alert)),
+        )
+        .values(aqi=computed.c.aqi, aqi_level=aqi_level, is_alert=is_alert)
+    )
+
+
+def _recompute_targets(standard: str | None, cities: Collection[str] | None) -> list[tuple[str, list[ColumnElement[bool]]]]:
+    """(standard, filters) pairs covering the requested rows, each city under its configured standard.
+
+    With standard, only the cities configured with it: rows rewritten under any other standard would be
+    reverted by the next recompute.
+    """
+    if standard is not None:
+        get_aqi_calculator(standard)
+        if cities is not None:
+            check_requested_standard(cities, standard)
+
+    city = AirQualityMeasurement.city
+    scope = [city.in_(cities)] if cities is not None else []
+    overrides = city_standard_overrides()
+    overridden = [name for names in overrides.values() for name in names]
+    targets = [(settings.aqi_standard, [*scope, city.not_in(overridden)] if overridden else scope)]
+    targets.extend((name, [*scope, city.in_(names)]) for name, names in overrides.items())
+    return [target for target in targets if standard is None or target[0] == standard]
+
+
+async def recompute_aqi(
+    db: AsyncSession,
+    *,
+    standard: str | None = None,
+    cities: Collection[str] | None = None,
+    batch_rows: int | None = None,
+) -> int:
+    """Recompute stored AQI under each city's configured standard (only the cities configured with standard, when given),
+    then the aggregates; returns rows changed.
+
+    Each batch of batch_rows ids is its own transaction, so locks stay short on large tables;
+    the aggregates catch up in a final transaction.
+    """
+    batch_rows = batch_rows or settings.aqi_recompute_batch_rows
+    threshold = settings.alert_aqi_threshold
+    table = AirQualityMeasurement.__table__
+    changed = 0
+
+    for target_standard, filters in _recompute_targets(standard, cities):
+        calculator = get_aqi_calculator(target_standard)
+        logger.info(f"Recomputing AQI under {target_standard} in batches of {batch_rows} rows...")
+        after = 0
+        while True:
+            batch_ids = select(table.c.id).where(table.c.id > after, *filters).order_by(table.c.id).limit(batch_rows).subquery()
+            last = await db.scalar(select(func.max(batch_ids.c.id)))
+            if last is None:
+                break
+
+            stmt = recompute_aqi_statement(calculator, table.c.id > after, table.c.id <= last, *filters, threshold=threshold)
+            result = await db.execute(stmt)
+            await db.commit()
+            changed += result.rowcount
+            logger.debug(f"AQI recomputed up to id {last}: {changed} rows changed so far")
+            after = last
+
+    if changed:
+        await _recompute_aggregates(db, cities)
+    await invalidate_read_caches()
+    logger.info(f"AQI recompute completed: {changed} rows changed")
+    return changed
+
+
+async def _recompute_aggregates(db: AsyncSession, cities: Collection[str] | None) -> None:
+    statements = recompute_city_stats_statements(cities)
+    if cities is None:
+        statements += recompute_rollup_statements()
+    else:
+        first, last = (await db.execute(
+            select(func.min(AirQualityMeasurement.date), func.max(AirQualityMeasurement.date))
+            .where(AirQualityMeasurement.city.in_(cities))
+        )).one()
+        if first is not None:
+            statements += recompute_rollup_statements(cities, first, last)
+
+    for stmt in statements:
+        await db.execute(stmt)
+    await db.commit()
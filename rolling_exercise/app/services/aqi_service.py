@@ -1,14 +1,142 @@
-from calculate_aqi import calculate_aqi
+import json
+import logging
+from collections import defaultdict
+from collections.abc import Iterable
+
+import numpy as np
+
+from calculate_aqi import AQI_STANDARDS, AqiCalculator
+from app.constants.aqi_constants import AQI_STANDARD_CONFLICT_ERROR, UNKNOWN_AQI_STANDARD_ERROR
 from app.constants.config import settings
+from app.exceptions import AqiStandardConflictError, UnknownAqiStandardError
 from app.schemas.air_quality import AqiResult
+from app.schemas.columns import AqiColumns
+from app.core.logger import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+def load_aqi_calculator(path: str | None = None, *, cache_size: int = settings.aqi_cache_size) -> AqiCalculator:
+    """Calculator with the default EPA-style tables, or the ones in the JSON file at path."""
+    if path is None:
+        return AqiCalculator(cache_size=cache_size)
+
+    with open(path, encoding="utf-8") as file:
+        config = json.load(file)
+    logger.info(f"AQI breakpoints loaded from {path}")
+    return AqiCalculator.from_config(config, cache_size=cache_size)
+
+
+def load_aqi_standards(
+    path: str | None = None,
+    *,
+    breakpoints_path: str | None = None,
+    default_standard: str = settings.aqi_standard,
+    cache_size: int = settings.aqi_cache_size,
+) -> dict[str, AqiCalculator]:
+    """Calculators by standard name: the built-in ones, then those in the JSON file at path, then breakpoints_path
+    for the default standard."""
+    configs = dict(AQI_STANDARDS)
+    if path is not None:
+        with open(path, encoding="utf-8") as file:
+            configs.update(json.load(file))
+        logger.info(f"AQI standards loaded from {path}")
+
+    calculators = {name: AqiCalculator.from_config(config, cache_size=cache_size) for name, config in configs.items()}
+    if breakpoints_path is not None:
+        calculators[default_standard] = load_aqi_calculator(breakpoints_path, cache_size=cache_size)
+    return calculators
+
+
+def _check_configured_standards(calculators: dict[str, AqiCalculator]) -> None:
+    configured = {settings.aqi_standard, *settings.aqi_city_standards.values()}
+    unknown = sorted(configured - calculators.keys())
+    if unknown:
+        raise ValueError(f"AQI standards not in the registry: {', '.join(unknown)} (known: {', '.join(sorted(calculators))})")
+
+
+aqi_calculators = load_aqi_standards(settings.aqi_standards_path, breakpoints_path=settings.aqi_breakpoints_path)
+_check_configured_standards(aqi_calculators)
+
+
+def get_aqi_calculator(standard: str | None = None) -> AqiCalculator:
+    standard = standard or settings.aqi_standard
+    try:
+        return aqi_calculators[standard]
+    except KeyError:
+        logger.warning(f"Unknown AQI standard requested: {standard}")
+        raise UnknownAqiStandardError(f"{UNKNOWN_AQI_STANDARD_ERROR}: {standard}") from None
 
 
-def calculate_aqi_data(pm25:float,no2:float,co2:float)->AqiResult:
-    aqi, aqi_level = calculate_aqi(pm25,no2,co2)
+def configured_standard(city: str) -> str:
+    return settings.aqi_city_standards.get(city, settings.aqi_standard)
+
+
+def check_requested_standard(cities: Iterable[str], standard: str) -> None:
+    """Reject standard unless it is the one configured for each of cities.
+
+    Rows stored under another standard would be reverted by the next recompute, and meanwhile be mixed
+    into aggregates and rankings computed under their city's standard.
+    """
+    conflicts = sorted({city for city in cities if configured_standard(city) != standard})
+    if conflicts:
+        logger.warning(f"AQI standard {standard} requested for {len(conflicts)} cities configured with another one")
+        configured = ", ".join(f"{city} ({configured_standard(city)})" for city in conflicts)
+        raise AqiStandardConflictError(f"{AQI_STANDARD_CONFLICT_ERROR} {configured}; requested {standard}")
+
+
+def city_standard_overrides() -> dict[str, list[str]]:
+    """Cities configured with a standard other than the default, by standard."""
+    overrides = defaultdict(list)
+    for city, standard in settings.aqi_city_standards.items():
+        if standard != settings.aqi_standard:
+            overrides[standard].append(city)
+    return dict(overrides)
+
+
+def calculate_aqi_data(pm25:float,no2:float,co2:float,standard:str|None=None)->AqiResult:
+    aqi, aqi_level = get_aqi_calculator(standard).calculate(pm25,no2,co2)
     is_alert:bool = aqi > settings.alert_aqi_threshold
     return AqiResult(
         aqi=float(aqi),
         aqi_level=str(aqi_level),
         is_alert=bool(is_alert)
     )
-    
\ No newline at end of file
+
+
+def calculate_aqi_columns(
+    pm25: np.ndarray,
+    no2: np.ndarray,
+    co2: np.ndarray,
+    city: np.ndarray | None = None,
+) -> AqiColumns:
+    """AQI for whole columns under each city's configured standard (the default one without city)."""
+    overrides = city_standard_overrides() if city is not None else {}
+    if not overrides:
+        aqi, aqi_level = get_aqi_calculator().calculate_batch(pm25, no2, co2)
+    else:
+        aqi, aqi_level = _calculate_by_city_standard(pm25, no2, co2, city, overrides)
+
+    return AqiColumns(
+        aqi=aqi,
+        aqi_level=aqi_level,
+        is_alert=aqi > settings.alert_aqi_threshold,
+    )
+
+
+def _calculate_by_city_standard(
+    pm25: np.ndarray, no2: np.ndarray, co2: np.ndarray, city: np.ndarray, overrides: dict[str, list[str]]
+) -> tuple[np.ndarray, np.ndarray]:
+    # One batch per standard present in the chunk, each over the rows of its cities.
+    aqi = np.empty(len(city), dtype=np.float64)
+    aqi_level = np.empty(len(city), dtype=object)
+    remaining = np.ones(len(city), dtype=bool)
+    for standard, cities in overrides.items():
+        rows = np.isin(city, cities)
+        if rows.any():
+            aqi[rows], aqi_level[rows] = aqi_calculators[standard].calculate_batch(pm25[rows], no2[rows], co2[rows])
+            remaining &= ~rows
+
+    if remaining.any():
+        aqi[remaining], aqi_level[remaining] = get_aqi_calculator().calculate_batch(pm25[remaining], no2[remaining], co2[remaining])
+    return aqi, aqi_level
@@ -0,0 +1,156 @@
+"""Expands uploads into the files to ingest: plain files as they are, .gz/.zst as one
+decompressing stream, .zip as one stream per member. Nothing is decompressed up front.
+"""
+import gzip
+import io
+import logging
+import os
+import tempfile
+import zipfile
+import zlib
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import BinaryIO
+
+from app.constants.archive_constants import (
+    COMPRESSED_SUFFIXES,
+    COMPRESSION_GZIP,
+    COMPRESSION_ZIP,
+    COMPRESSION_ZSTD,
+    EMPTY_ARCHIVE_ERROR,
+    GZIP_MAGIC,
+    IGNORED_ZIP_PREFIXES,
+    INVALID_ARCHIVE_ERROR,
+    MEMBER_TOO_LARGE_ERROR,
+    SPOOL_BLOCK_BYTES,
+    ZIP_MAGIC,
+    ZSTD_MAGIC,
+    ZSTD_UNSUPPORTED_ERROR,
+)
+from app.exceptions import CsvParseError
+from app.core.logger import LOGGER_NAME
+
+try:
+    import zstandard
+except ImportError:  # optional: .zst uploads are rejected without it
+    zstandard = None
+
+logger = logging.getLogger(LOGGER_NAME)
+
+# Raised by the decompressors on corrupted or truncated input.
+ARCHIVE_ERRORS: tuple[type[Exception], ...] = (zipfile.BadZipFile, gzip.BadGzipFile, zlib.error, EOFError)
+if zstandard is not None:
+    ARCHIVE_ERRORS += (zstandard.ZstdError,)
+
+
+@dataclass(frozen=True)
+class UploadSource:
+    filename: str | None
+    source: BinaryIO
+    content_type: str | None = None
+
+
+def peek_bytes(source: BinaryIO, size: int) -> bytes:
+    """The first size bytes, leaving the stream where it was (non-seekable streams must be buffered readers)."""
+    if source.seekable():
+        head = source.read(size)
+        source.seek(0)
+        return head
+    return source.peek(size)[:size]
+
+
+def detect_compression(source: BinaryIO) -> str | None:
+    head = peek_bytes(source, len(ZIP_MAGIC))
+    if head.startswith(GZIP_MAGIC):
+        return COMPRESSION_GZIP
+    if head.startswith(ZIP_MAGIC):
+        return COMPRESSION_ZIP
+    if head.startswith(ZSTD_MAGIC):
+        return COMPRESSION_ZSTD
+    return None
+
+
+def is_zip(upload: UploadSource) -> bool:
+    return detect_compression(upload.source) == COMPRESSION_ZIP
+
+
+def open_upload(upload: UploadSource) -> UploadSource:
+    """Wrap a .gz/.zst upload in a decompressing stream; other uploads are returned as they are."""
+    compression = detect_compression(upload.source)
+    if compression is None:
+        return upload
+
+    filename = _strip_suffix(upload.filename, COMPRESSED_SUFFIXES.get(compression, ""))
+    if compression == COMPRESSION_GZIP:
+        # The inner format is sniffed from the decompressed bytes, so the outer content type is dropped.
+        return UploadSource(filename=filename, source=gzip.GzipFile(fileobj=upload.source, mode="rb"))
+    if compression == COMPRESSION_ZSTD:
+        return UploadSource(filename=filename, source=_open_zstd(upload.source))
+
+    logger.warning(f"Nested zip archives are not supported: {upload.filename}")
+    raise CsvParseError(INVALID_ARCHIVE_ERROR)
+
+
+def iter_upload_members(upload: UploadSource) -> Iterator[UploadSource]:
+    """Yield each file of an upload, opened for streaming; a member is closed once the next one is requested."""
+    if not is_zip(upload):
+        yield open_upload(upload)
+        return
+
+    try:
+        archive = zipfile.ZipFile(upload.source)
+        members = [info for info in archive.infolist() if not info.is_dir() and not info.filename.startswith(IGNORED_ZIP_PREFIXES)]
+    except ARCHIVE_ERRORS as exc:
+        logger.warning(f"Invalid zip archive: {upload.filename}")
+        raise CsvParseError(INVALID_ARCHIVE_ERROR) from exc
+
+    if not members:
+        raise CsvParseError(EMPTY_ARCHIVE_ERROR)
+
+    with archive:
+        for info in members:
+            with archive.open(info) as member:
+                # zip members are not seekable; buffering lets format detection peek at the first bytes.
+                yield open_upload(UploadSource(filename=info.filename, source=_seekable(member)))
+
+
+def spool_member(upload: UploadSource, max_bytes: int) -> str:
+    """Decompress a file into a temporary file and return its path; the caller removes it.
+
+    Stops with CsvParseError as soon as more than max_bytes come out.
+    """
+    with tempfile.NamedTemporaryFile(prefix="ingest_", suffix=".member", delete=False) as spool:
+        try:
+            written = 0
+            while block := upload.source.read(SPOOL_BLOCK_BYTES):
+                written += len(block)
+                if written > max_bytes:
+                    logger.warning(f"{upload.filename} exceeds {max_bytes} bytes once decompressed")
+                    raise CsvParseError(MEMBER_TOO_LARGE_ERROR)
+                spool.write(block)
+        except ARCHIVE_ERRORS as exc:
+            logger.warning(f"Could not decompress {upload.filename}")
+            os.remove(spool.name)
+            raise CsvParseError(INVALID_ARCHIVE_ERROR) from exc
+        except BaseException:
+            os.remove(spool.name)
+            raise
+    return spool.name
+
+
+def _open_zstd(source: BinaryIO) -> BinaryIO:
+    if zstandard is None:
+        logger.warning("zstd upload rejected: zstandard is not installed")
+        raise CsvParseError(ZSTD_UNSUPPORTED_ERROR)
+
+    return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(source))
+
+
+def _seekable(member: BinaryIO) -> BinaryIO:
+    return member if member.seekable() else io.BufferedReader(member)
+
+
+def _strip_suffix(filename: str | None, suffix: str) -> str | None:
+    if filename is None or not suffix:
+        return filename
+    return filename[: -len(suffix)] if filename.lower().endswith(suffix) else filename
@@ -1,20 +1,23 @@
-from sqlalchemy import select, func
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.models import AirQualityMeasurement
+from app.db.models import AirQualityMeasurement, CityAqiStats
+from app.services.pagination import Page, paginate, select_measurement_rows, to_page
 import logging
+from app.core.cache import cached
 from app.core.logger import LOGGER_NAME
 
 logger = logging.getLogger(LOGGER_NAME)
 
+AVERAGE_AQI = CityAqiStats.average_aqi.label("average_aqi")
+
+@cached("fetch_best_cities")
 async def fetch_best_cities(*, session: AsyncSession, limit: int) -> list[tuple[str, float]]:
     logger.info(f"Fetching best cities (limit={limit})")
 
-    average_aqi = func.avg(AirQualityMeasurement.aqi).label("average_aqi")
     stmt = (
-        select(AirQualityMeasurement.city, average_aqi)
-        .group_by(AirQualityMeasurement.city)
-        .order_by(average_aqi.asc(), AirQualityMeasurement.city.asc())
+        select(CityAqiStats.city, AVERAGE_AQI)
+        .order_by(AVERAGE_AQI.asc(), CityAqiStats.city.asc())
         .limit(limit)
     )
     result = await session.execute(stmt)
@@ -22,23 +25,25 @@ async def fetch_best_cities(*, session: AsyncSession, limit: int) -> list[tuple[
     logger.info(f"Best cities fetched:{len(rows)} results")
     return rows
 
-async def fetch_by_city(*, session: AsyncSession, city: str) -> list[AirQualityMeasurement]:
-    logger.info(f"Fetching measurements for city={city}")
+@cached("fetch_by_city")
+async def fetch_by_city(*, session: AsyncSession, city: str, limit: int, cursor: str | None = None) -> Page:
+    logger.info(f"Fetching measurements for city={city} (limit={limit})")
 
-    stmt = select(AirQualityMeasurement).where(AirQualityMeasurement.city == city)
-    result = await session.execute(stmt)
-    rows = result.scalars().all()
+    stmt = select_measurement_rows().where(AirQualityMeasurement.city == city)
+    result = await session.execute(paginate(stmt, limit=limit, cursor=cursor))
+    page = to_page(result.all(), limit=limit)
 
-    if not rows:
+    if not page.items and cursor is None:
         raise KeyError(city)
 
-    logger.info(f"City={city}: {len(rows)} rows")
-    return rows
+    logger.info(f"City={city}: {len(page.items)} rows")
+    return page
 
+@cached("fetch_average_city_aqi")
 async def fetch_average_city_aqi(*, city: str, session: AsyncSession) -> float:
     logger.info(f"Computing average AQI for city={city}")
 
-    stmt = select(func.avg(AirQualityMeasurement.aqi)).where(AirQualityMeasurement.city == city)
+    stmt = select(AVERAGE_AQI).where(CityAqiStats.city == city)
     result = await session.execute(stmt)
     avg = result.scalar()
 
@@ -0,0 +1,78 @@
+import logging
+from collections.abc import Collection
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Executable, delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import AirQualityMeasurement, CityAqiStats
+from app.services.aggregates import aggregate_aqi, aggregate_records, execute_upserts, upsert_aggregates
+from app.core.cache import invalidate_read_caches
+from app.core.executor import run_cpu_bound
+from app.core.logger import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+async def update_city_stats(db: AsyncSession, fields: dict[str, np.ndarray]) -> None:
+    if len(fields["city"]) == 0:
+        return
+
+    records = await run_cpu_bound(city_stats_records, fields)
+    stmt = upsert_aggregates(
+        CityAqiStats,
+        ["city"],
+        last_date=lambda excluded: func.greatest(CityAqiStats.last_date, excluded.last_date),
+    )
+    await execute_upserts(db, stmt, records)
+    logger.debug(f"City stats updated for {len(records)} cities")
+
+
+def city_stats_records(fields: dict[str, np.ndarray]) -> list[dict]:
+    frame = pd.DataFrame({"city": fields["city"], "aqi": fields["aqi"], "date": fields["date"]})
+    return aggregate_records(aggregate_aqi(frame, ["city"], last_date=("date", "max")))
+
+
+def recompute_city_stats_statements(cities: Collection[str] | None = None) -> list[Executable]:
+    """Statements recomputing city_aqi_stats from measurements, for every city or only the given ones."""
+    target = delete(CityAqiStats)
+    aggregates = select(
+        AirQualityMeasurement.city,
+        func.count(),
+        func.sum(AirQualityMeasurement.aqi),
+        func.min(AirQualityMeasurement.aqi),
+        func.max(AirQualityMeasurement.aqi),
+        func.max(AirQualityMeasurement.date),
+    ).group_by(AirQualityMeasurement.city)
+    if cities is not None:
+        target = target.where(CityAqiStats.city.in_(cities))
+        aggregates = aggregates.where(AirQualityMeasurement.city.in_(cities))
+
+    return [
+        target,
+        insert(CityAqiStats).from_select(
+            ["city", "measurement_count", "aqi_sum", "aqi_min", "aqi_max", "last_date"],
+            aggregates,
+        ),
+    ]
+
+
+async def refresh_city_stats(db: AsyncSession, cities: Collection[str]) -> None:
+    # Used when rows were updated in place: sums can be corrected incrementally, min/max cannot.
+    for stmt in recompute_city_stats_statements(cities):
+        await db.execute(stmt)
+    logger.debug(f"City stats recomputed for {len(cities)} cities")
+
+
+async def rebuild_city_stats(db: AsyncSession) -> int:
+    logger.info("Rebuilding city AQI stats from measurements...")
+
+    for stmt in recompute_city_stats_statements():
+        await db.execute(stmt)
+    await db.commit()
+    await invalidate_read_caches()
+
+    count = await db.scalar(select(func.count()).select_from(CityAqiStats))
+    logger.info(f"City AQI stats rebuilt for {count} cities")
+    return count
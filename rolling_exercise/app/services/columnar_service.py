@@ -0,0 +1,179 @@
+"""Parquet and Arrow IPC uploads, read into the same AirQualityColumns the CSV path produces.
+
+pyarrow is optional and imported on first use; without it, columnar uploads are rejected
+with a parse error and CSV keeps working.
+"""
+import logging
+from collections.abc import Iterable, Iterator
+from typing import BinaryIO
+
+import numpy as np
+
+from app.constants.csv_constants import (
+    CSV_CITY_COL,
+    CSV_CO2_COL,
+    CSV_DATE_COL,
+    CSV_MISSING_COLUMNS_ERROR,
+    CSV_NO2_COL,
+    CSV_PM25_COL,
+    EMPTY_CITY_ERROR,
+    INVALID_VALUES_ERROR,
+    REQUIRED_CSV_COLUMNS,
+)
+from app.constants.ingest_constants import INGEST_STAGE_PARSE, INGEST_STAGE_READ
+from app.constants.upload_format_constants import (
+    ARROW_FILE_MAGIC,
+    ARROW_STREAM_MAGIC,
+    COLUMNAR_UNSUPPORTED_ERROR,
+    INVALID_COLUMNAR_FILE_ERROR,
+    MAGIC_BYTES_LENGTH,
+    PARQUET_MAGIC,
+    UPLOAD_CONTENT_TYPES,
+    UPLOAD_FORMAT_ARROW_FILE,
+    UPLOAD_FORMAT_ARROW_STREAM,
+    UPLOAD_FORMAT_CSV,
+    UPLOAD_FORMAT_PARQUET,
+)
+from app.exceptions import CsvParseError
+from app.schemas.columns import AirQualityColumns
+from app.services.archive_service import peek_bytes
+from app.services.csv_service import (
+    check_numeric_values,
+    iter_air_quality_csv,
+    normalize_city_column,
+    parse_date_column,
+    parse_numeric_column,
+)
+from app.core.logger import LOGGER_NAME
+from app.core.metrics import ingest_stage_duration
+
+logger = logging.getLogger(LOGGER_NAME)
+
+REQUIRED_COLUMNS = sorted(REQUIRED_CSV_COLUMNS)
+
+
+def detect_upload_format(source: BinaryIO, content_type: str | None = None) -> str:
+    """A columnar content type wins; otherwise the leading bytes decide, defaulting to CSV."""
+    media_type = (content_type or "").split(";", 1)[0].strip().lower()
+    if media_type in UPLOAD_CONTENT_TYPES:
+        return UPLOAD_CONTENT_TYPES[media_type]
+
+    head = peek_bytes(source, MAGIC_BYTES_LENGTH)
+    if head.startswith(PARQUET_MAGIC):
+        return UPLOAD_FORMAT_PARQUET
+    if head.startswith(ARROW_FILE_MAGIC):
+        return UPLOAD_FORMAT_ARROW_FILE
+    if head.startswith(ARROW_STREAM_MAGIC):
+        return UPLOAD_FORMAT_ARROW_STREAM
+    return UPLOAD_FORMAT_CSV
+
+
+def iter_air_quality_upload(source: BinaryIO, *, content_type: str | None = None, chunk_rows: int) -> Iterator[AirQualityColumns]:
+    upload_format = detect_upload_format(source, content_type)
+    logger.info(f"Upload format detected: {upload_format}")
+
+    if upload_format == UPLOAD_FORMAT_CSV:
+        return iter_air_quality_csv(source, chunk_rows=chunk_rows)
+    return iter_air_quality_columnar(source, upload_format=upload_format, chunk_rows=chunk_rows)
+
+
+def iter_air_quality_columnar(source: BinaryIO, *, upload_format: str, chunk_rows: int) -> Iterator[AirQualityColumns]:
+    pa = _import_pyarrow()
+
+    try:
+        batches = _open_batches(pa, source, upload_format=upload_format, chunk_rows=chunk_rows)
+        while True:
+            with ingest_stage_duration.time(stage=INGEST_STAGE_READ):
+                batch = next(batches, None)
+            if batch is None:
+                return
+
+            with ingest_stage_duration.time(stage=INGEST_STAGE_PARSE):
+                columns = _prepare_batch(pa, batch)
+            logger.debug(f"Columnar chunk parsed successfully: {len(columns)} valid rows")
+            yield columns
+    except (pa.ArrowException, OSError) as exc:
+        logger.warning(f"Columnar parsing failed: invalid or corrupted {upload_format} file")
+        raise CsvParseError(INVALID_COLUMNAR_FILE_ERROR) from exc
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as exc:
+        logger.warning("Columnar upload rejected: pyarrow is not installed")
+        raise CsvParseError(COLUMNAR_UNSUPPORTED_ERROR) from exc
+
+    return pyarrow
+
+
+def _open_batches(pa, source: BinaryIO, *, upload_format: str, chunk_rows: int) -> Iterator:
+    if upload_format == UPLOAD_FORMAT_PARQUET:
+        parquet = pa.parquet.ParquetFile(source)
+        _validate_required_columns(parquet.schema_arrow.names)
+        return parquet.iter_batches(batch_size=chunk_rows, columns=REQUIRED_COLUMNS)
+
+    if upload_format == UPLOAD_FORMAT_ARROW_FILE:
+        reader = pa.ipc.open_file(source)
+        batches = (reader.get_batch(index) for index in range(reader.num_record_batches))
+    else:
+        reader = pa.ipc.open_stream(source)
+        batches = iter(reader)
+
+    _validate_required_columns(reader.schema.names)
+    return _sliced(batches, chunk_rows)
+
+
+def _sliced(batches: Iterable, chunk_rows: int) -> Iterator:
+    # IPC batches come in whatever size the writer chose; slices are views, so nothing is copied.
+    for batch in batches:
+        for offset in range(0, batch.num_rows, chunk_rows):
+            yield batch.slice(offset, chunk_rows)
+
+
+def _validate_required_columns(names: list[str]) -> None:
+    if not REQUIRED_CSV_COLUMNS.issubset(names):
+        logger.warning(f"Missing required columns. Found: {names}")
+        raise CsvParseError(CSV_MISSING_COLUMNS_ERROR)
+
+
+def _prepare_batch(pa, batch) -> AirQualityColumns:
+    return AirQualityColumns(
+        date=_date_column(pa, batch.column(CSV_DATE_COL)),
+        city=_city_column(batch.column(CSV_CITY_COL)),
+        pm25=_numeric_column(pa, batch.column(CSV_PM25_COL)),
+        no2=_numeric_column(pa, batch.column(CSV_NO2_COL)),
+        co2=_numeric_column(pa, batch.column(CSV_CO2_COL)),
+    )
+
+
+def _date_column(pa, values) -> np.ndarray:
+    if not (pa.types.is_date(values.type) or pa.types.is_timestamp(values.type)):
+        return parse_date_column(values.to_pandas())
+
+    if values.null_count:
+        logger.warning("Upload contains missing date values")
+        raise CsvParseError(INVALID_VALUES_ERROR)
+    # Timestamps keep only their day, as in the CSV path.
+    return values.cast(pa.date32(), safe=False).to_numpy(zero_copy_only=False).astype("datetime64[D]", copy=False)
+
+
+def _city_column(values) -> np.ndarray:
+    if values.null_count:
+        logger.warning("Some rows contain empty city values.")
+        raise CsvParseError(EMPTY_CITY_ERROR)
+
+    return normalize_city_column(values.to_pandas())
+
+
+def _numeric_column(pa, values) -> np.ndarray:
+    if not (pa.types.is_floating(values.type) or pa.types.is_integer(values.type)):
+        return parse_numeric_column(values.to_pandas())
+
+    if values.null_count:
+        logger.warning("Upload contains missing numeric values")
+        raise CsvParseError(INVALID_VALUES_ERROR)
+    # float64 columns without nulls are viewed in place; other numeric types are converted once.
+    return check_numeric_values(values.to_numpy(zero_copy_only=False).astype(np.float64, copy=False))
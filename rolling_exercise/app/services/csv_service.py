@@ -1,5 +1,8 @@
+from collections.abc import Iterator
 from io import BytesIO
+from typing import BinaryIO
 
+import numpy as np
 import pandas as pd
 from pandas.errors import EmptyDataError, ParserError
 
@@ -11,48 +14,78 @@ from app.constants.csv_constants import (
     CSV_NO2_COL,
     CSV_CO2_COL,
     REQUIRED_CSV_COLUMNS,
+    CITY_MIN_LENGTH,
+    CITY_MAX_LENGTH,
     CSV_MISSING_COLUMNS_ERROR,
     INVALID_CSV_FILE_ERROR,
     INVALID_VALUES_ERROR,
     EMPTY_CITY_ERROR,
+    CITY_TOO_LONG_ERROR,
 )
+from app.constants.archive_constants import INVALID_ARCHIVE_ERROR
+from app.constants.ingest_constants import INGEST_STAGE_PARSE, INGEST_STAGE_READ
 from app.exceptions import CsvParseError
-from app.schemas.air_quality import AirQualityRow
+from app.schemas.columns import AirQualityColumns
+from app.services.archive_service import ARCHIVE_ERRORS
 import logging
 from app.core.logger import LOGGER_NAME
+from app.core.metrics import ingest_stage_duration
 
 logger = logging.getLogger(LOGGER_NAME)
 
 
-def parse_air_quality_csv(file_content: bytes) -> list[AirQualityRow]:
-    df = _read_csv_bytes(file_content)
-    _validate_required_columns(df)
-    df = _select_relevant_columns(df)
-    _normalize_city_column(df)
-    _parse_date_column(df)
-    _parse_numeric_columns(df)
-
-    records = df.to_dict(orient="records")
-    logger.info(f"CSV parsed successfully: {len(records)} valid rows")
-
-    return [
-        AirQualityRow(
-            date=record[CSV_DATE_COL],
-            city=record[CSV_CITY_COL],
-            pm25=float(record[CSV_PM25_COL]),
-            no2=float(record[CSV_NO2_COL]),
-            co2=float(record[CSV_CO2_COL]),
-        )
-        for record in records
-    ]
-
-
-def _read_csv_bytes(file_content: bytes) -> pd.DataFrame:
+def parse_air_quality_csv(file_content: bytes) -> AirQualityColumns:
+    df = _read_csv(BytesIO(file_content))
+    columns = _prepare_columns(df)
+
+    logger.info(f"CSV parsed successfully: {len(columns)} valid rows")
+    return columns
+
+
+def iter_air_quality_csv(source: BinaryIO, *, chunk_rows: int) -> Iterator[AirQualityColumns]:
+    reader = _read_csv(source, chunksize=chunk_rows)
+
+    with reader:
+        while True:
+            try:
+                with ingest_stage_duration.time(stage=INGEST_STAGE_READ):
+                    chunk = next(reader)
+            except StopIteration:
+                return
+            except (ParserError, UnicodeDecodeError) as exc:
+                logger.warning("CSV parsing failed: invalid or corrupted chunk")
+                raise CsvParseError(INVALID_CSV_FILE_ERROR) from exc
+            except ARCHIVE_ERRORS as exc:
+                logger.warning("CSV decompression failed: corrupted or truncated archive")
+                raise CsvParseError(INVALID_ARCHIVE_ERROR) from exc
+
+            with ingest_stage_duration.time(stage=INGEST_STAGE_PARSE):
+                columns = _prepare_columns(chunk)
+            logger.debug(f"CSV chunk parsed successfully: {len(columns)} valid rows")
+            yield columns
+
+
+def _read_csv(source: BinaryIO, chunksize: int | None = None):
     try:
-        return pd.read_csv(BytesIO(file_content), encoding=CSV_ENCODING)
+        return pd.read_csv(source, encoding=CSV_ENCODING, chunksize=chunksize)
     except (EmptyDataError, ParserError, UnicodeDecodeError) as exc:
         logger.warning("CSV parsing failed: invalid or corrupted file")
         raise CsvParseError(INVALID_CSV_FILE_ERROR) from exc
+    except ARCHIVE_ERRORS as exc:
+        logger.warning("CSV decompression failed: corrupted or truncated archive")
+        raise CsvParseError(INVALID_ARCHIVE_ERROR) from exc
+
+
+def _prepare_columns(df: pd.DataFrame) -> AirQualityColumns:
+    _validate_required_columns(df)
+
+    return AirQualityColumns(
+        date=parse_date_column(df[CSV_DATE_COL]),
+        city=normalize_city_column(df[CSV_CITY_COL]),
+        pm25=parse_numeric_column(df[CSV_PM25_COL]),
+        no2=parse_numeric_column(df[CSV_NO2_COL]),
+        co2=parse_numeric_column(df[CSV_CO2_COL]),
+    )
 
 
 def _validate_required_columns(df: pd.DataFrame) -> None:
@@ -61,30 +94,48 @@ def _validate_required_columns(df: pd.DataFrame) -> None:
         raise CsvParseError(CSV_MISSING_COLUMNS_ERROR)
 
 
-def _select_relevant_columns(df: pd.DataFrame) -> pd.DataFrame:
-    return df[[CSV_DATE_COL, CSV_CITY_COL, CSV_PM25_COL, CSV_NO2_COL, CSV_CO2_COL]].copy()
-
-
-def _normalize_city_column(df: pd.DataFrame) -> None:
-    df[CSV_CITY_COL] = df[CSV_CITY_COL].astype(str).str.strip()
+def normalize_city_column(city: pd.Series) -> np.ndarray:
+    city = city.astype(str).str.strip()
+    lengths = city.str.len()
 
-    if (df[CSV_CITY_COL] == "").any():
+    if (lengths < CITY_MIN_LENGTH).any():
         logger.warning("Some rows contain empty city values.")
         raise CsvParseError(EMPTY_CITY_ERROR)
 
+    if (lengths > CITY_MAX_LENGTH).any():
+        logger.warning(f"Some rows contain city values longer than {CITY_MAX_LENGTH} characters.")
+        raise CsvParseError(CITY_TOO_LONG_ERROR)
+
+    return city.to_numpy(dtype=object)
+
 
-def _parse_date_column(df: pd.DataFrame) -> None:
+def parse_date_column(date: pd.Series) -> np.ndarray:
     try:
-        df[CSV_DATE_COL] = pd.to_datetime(df[CSV_DATE_COL], errors="raise").dt.date
+        parsed = pd.to_datetime(date, errors="raise")
     except (ValueError, TypeError) as exc:
         logger.warning("CSV contains invalid numeric or date values")
         raise CsvParseError(INVALID_VALUES_ERROR) from exc
 
+    if parsed.isna().any():
+        logger.warning("CSV contains missing date values")
+        raise CsvParseError(INVALID_VALUES_ERROR)
 
-def _parse_numeric_columns(df: pd.DataFrame) -> None:
+    return parsed.to_numpy().astype("datetime64[D]")
+
+
+def parse_numeric_column(values: pd.Series) -> np.ndarray:
     try:
-        for col in (CSV_PM25_COL, CSV_NO2_COL, CSV_CO2_COL):
-            df[col] = pd.to_numeric(df[col], errors="raise")
+        parsed = pd.to_numeric(values, errors="raise").to_numpy(dtype=np.float64)
     except (ValueError, TypeError) as exc:
         logger.warning("CSV contains invalid numeric values")
         raise CsvParseError(INVALID_VALUES_ERROR) from exc
+
+    return check_numeric_values(parsed)
+
+
+def check_numeric_values(values: np.ndarray) -> np.ndarray:
+    # An empty cell (NaN) or infinity is not a measurement, in any upload format.
+    if not np.isfinite(values).all():
+        logger.warning("Upload contains missing or non-finite numeric values")
+        raise CsvParseError(INVALID_VALUES_ERROR)
+    return values
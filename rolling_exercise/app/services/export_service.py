@@ -0,0 +1,32 @@
+import csv
+import io
+import json
+from collections.abc import AsyncIterator, Sequence
+
+from sqlalchemy import Row
+
+from app.constants.export_constants import EXPORT_CSV_HEADER
+
+
+async def iter_ndjson(partitions: AsyncIterator[Sequence[Row]]) -> AsyncIterator[bytes]:
+    async for rows in partitions:
+        lines = [json.dumps(row._asdict(), default=str) for row in rows]
+        yield ("\n".join(lines) + "\n").encode()
+
+
+async def iter_csv(partitions: AsyncIterator[Sequence[Row]]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(EXPORT_CSV_HEADER)
+    yield _drain(buffer)
+
+    async for rows in partitions:
+        writer.writerows(rows)
+        yield _drain(buffer)
+
+
+def _drain(buffer: io.StringIO) -> bytes:
+    data = buffer.getvalue().encode()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
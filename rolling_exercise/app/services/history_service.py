@@ -1,19 +1,43 @@
 from __future__ import annotations
+from collections.abc import AsyncIterator, Sequence
 from datetime import date
-from sqlalchemy import select
+from sqlalchemy import Row, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.constants.config import settings
+from app.constants.export_constants import EXPORT_FIELDS
 from app.db.models import AirQualityMeasurement
+from app.services.pagination import Page, paginate, select_measurement_rows, to_page
 import logging
 from app.core.logger import LOGGER_NAME
 
 logger = logging.getLogger(LOGGER_NAME)
 
-async def fetch_history(*, db: AsyncSession,start_date: date,end_date: date) -> list[AirQualityMeasurement]:
-    stmt = select(AirQualityMeasurement).where(AirQualityMeasurement.date >= start_date,AirQualityMeasurement.date <= end_date,)
-    logger.info(f"Fetching history: {start_date} → {end_date}")
-    result = await db.execute(stmt)
-    rows = result.scalars().all()
-    logger.info(f"History results: {len(rows)} rows")
+async def fetch_history(*, db: AsyncSession,start_date: date,end_date: date,limit: int,cursor: str | None = None) -> Page:
+    stmt = select_measurement_rows().where(AirQualityMeasurement.date >= start_date,AirQualityMeasurement.date <= end_date,)
+    logger.info(f"Fetching history: {start_date} → {end_date} (limit={limit})")
+    result = await db.execute(paginate(stmt, limit=limit, cursor=cursor))
+    page = to_page(result.all(), limit=limit)
+    logger.info(f"History results: {len(page.items)} rows")
 
-    return rows
+    return page
+
+
+async def stream_history(*, db: AsyncSession, start_date: date, end_date: date) -> AsyncIterator[Sequence[Row]]:
+    columns = [getattr(AirQualityMeasurement, field) for field in EXPORT_FIELDS]
+    stmt = (
+        select(*columns)
+        .where(AirQualityMeasurement.date >= start_date, AirQualityMeasurement.date <= end_date)
+        .order_by(AirQualityMeasurement.date.asc(), AirQualityMeasurement.id.asc())
+        .execution_options(yield_per=settings.export_batch_rows)
+    )
+    logger.info(f"Streaming history export: {start_date} → {end_date}")
+
+    # stream() keeps a server-side cursor open and fetches yield_per rows per round trip.
+    result = await db.stream(stmt)
+    total = 0
+    async for partition in result.partitions():
+        total += len(partition)
+        yield partition
+
+    logger.info(f"History export streamed: {total} rows")
@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import BinaryIO
+
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.constants.config import settings
+from app.constants.ingest_constants import (
+    DUPLICATE_MEASUREMENTS_ERROR,
+    JOB_STATUS_FAILED,
+    JOB_STATUS_QUEUED,
+    JOB_STATUS_RUNNING,
+    JOB_STATUS_SUCCEEDED,
+    MAX_TRACKED_JOBS,
+)
+from app.db.session import SessionLocal
+from app.exceptions import CsvParseError, IngestQueueFullError, IngestQueueNotRunningError
+from app.schemas.air_quality import IngestJobOut
+from app.services.archive_service import UploadSource
+from app.services.upload_service import ingest_air_quality_uploads
+from app.core.executor import run_blocking
+from app.core.logger import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+@dataclass
+class IngestJob:
+    path: str
+    filename: str | None
+    content_type: str | None = None
+    transaction: str | None = None
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = JOB_STATUS_QUEUED
+    rows_processed: int = 0
+    rows_inserted: int = 0
+    rows_updated: int = 0
+    rows_skipped: int = 0
+    started_at: float | None = None
+    finished_at: float | None = None
+    error: str | None = None
+
+    def to_out(self) -> IngestJobOut:
+        elapsed = 0.0
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.perf_counter()) - self.started_at
+
+        return IngestJobOut(
+            job_id=self.job_id,
+            status=self.status,
+            filename=self.filename,
+            rows_processed=self.rows_processed,
+            rows_inserted=self.rows_inserted,
+            rows_updated=self.rows_updated,
+            rows_skipped=self.rows_skipped,
+            elapsed_seconds=elapsed,
+            rows_per_second=self.rows_processed / elapsed if elapsed > 0 else 0.0,
+            error=self.error,
+        )
+
+
+class IngestJobQueue:
+    def __init__(self, *, session_factory: async_sessionmaker[AsyncSession], workers: int, queue_size: int) -> None:
+        self.session_factory = session_factory
+        self._workers_count = workers
+        self._queue_size = queue_size
+        self._queue: asyncio.Queue[IngestJob] | None = None
+        self._workers: list[asyncio.Task] = []
+        self._jobs: OrderedDict[str, IngestJob] = OrderedDict()
+
+    async def start(self) -> None:
+        if self._workers:
+            return
+
+        self._queue = asyncio.Queue(maxsize=self._queue_size)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self._workers_count)]
+        logger.info(f"Ingest job queue started ({self._workers_count} workers, queue size {self._queue_size})")
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        while self._queue is not None and not self._queue.empty():
+            job = self._queue.get_nowait()
+            self._finish(job, JOB_STATUS_FAILED, error="Ingest queue stopped before the job ran")
+        self._queue = None
+        logger.info("Ingest job queue stopped")
+
+    async def submit(self, *, upload: UploadSource, transaction: str | None = None) -> IngestJob:
+        if self._queue is None:
+            logger.error("Ingest job queue is not running, rejecting upload")
+            raise IngestQueueNotRunningError()
+        if self._queue.full():
+            logger.warning("Ingest job queue is full, rejecting upload")
+            raise IngestQueueFullError()
+
+        # The request's upload is closed once the response is sent, so the job keeps its own copy on disk.
+        path = await run_blocking(_copy_to_temp_file, upload.source)
+
+        job = IngestJob(path=path, filename=upload.filename, content_type=upload.content_type, transaction=transaction)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull as exc:
+            # Another upload took the last slot while this one was being copied.
+            os.remove(path)
+            raise IngestQueueFullError() from exc
+        self._track(job)
+        logger.info(f"Ingest job {job.job_id} queued for file: {job.filename}")
+        return job
+
+    def get(self, job_id: str) -> IngestJob | None:
+        return self._jobs.get(job_id)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: IngestJob) -> None:
+        job.status = JOB_STATUS_RUNNING
+        job.started_at = time.perf_counter()
+        logger.info(f"Ingest job {job.job_id} started")
+
+        def on_progress(rows: int) -> None:
+            job.rows_processed = rows
+
+        try:
+            with open(job.path, "rb") as source:
+                async with self.session_factory() as db:
+                    upload = UploadSource(filename=job.filename, source=source, content_type=job.content_type)
+                    result = await ingest_air_quality_uploads(
+                        uploads=[upload],
+                        db=db,
+                        transaction=job.transaction,
+                        on_progress=on_progress,
+                    )
+
+        except CsvParseError as exc:
+            logger.warning(f"Ingest job {job.job_id} failed: {exc}")
+            self._finish(job, JOB_STATUS_FAILED, error=str(exc))
+
+        except IntegrityError as exc:
+            logger.warning(f"Ingest job {job.job_id} conflicts with stored measurements: {exc}")
+            self._finish(job, JOB_STATUS_FAILED, error=DUPLICATE_MEASUREMENTS_ERROR)
+
+        except SQLAlchemyError as exc:
+            logger.error(f"Ingest job {job.job_id} database error: {exc}")
+            self._finish(job, JOB_STATUS_FAILED, error="Database error")
+
+        except Exception:
+            logger.exception(f"Ingest job {job.job_id} crashed")
+            self._finish(job, JOB_STATUS_FAILED, error="Internal error")
+
+        else:
+            job.rows_inserted = result.rows_inserted
+            job.rows_updated = result.rows_updated
+            job.rows_skipped = result.rows_skipped
+            self._finish(job, JOB_STATUS_SUCCEEDED)
+            logger.info(
+                f"Ingest job {job.job_id} completed. {result.rows_inserted} inserted, "
+                f"{result.rows_updated} updated, {result.rows_skipped} skipped"
+            )
+
+    def _finish(self, job: IngestJob, status: str, *, error: str | None = None) -> None:
+        job.status = status
+        job.error = error
+        job.finished_at = time.perf_counter()
+        if os.path.exists(job.path):
+            os.remove(job.path)
+
+    def _track(self, job: IngestJob) -> None:
+        self._jobs[job.job_id] = job
+        while len(self._jobs) > MAX_TRACKED_JOBS:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if oldest.status not in (JOB_STATUS_SUCCEEDED, JOB_STATUS_FAILED):
+                break
+            del self._jobs[oldest_id]
+
+
+def _copy_to_temp_file(source: BinaryIO) -> str:
+    with tempfile.NamedTemporaryFile(prefix="ingest_", suffix=".upload", delete=False) as tmp:
+        shutil.copyfileobj(source, tmp)
+    return tmp.name
+
+
+ingest_jobs = IngestJobQueue(
+    session_factory=SessionLocal,
+    workers=settings.ingest_job_workers,
+    queue_size=settings.ingest_job_queue_size,
+)
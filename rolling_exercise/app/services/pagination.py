@@ -0,0 +1,57 @@
+import base64
+import binascii
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import date
+
+from sqlalchemy import Select, select, tuple_
+
+from app.db.models import AirQualityMeasurement
+from app.exceptions import InvalidCursorError
+from app.schemas.air_quality import AirQualityMeasurementOut
+
+# Page queries select these columns (plus id, for the cursor) as plain rows instead of ORM instances.
+MEASUREMENT_PAGE_FIELDS = tuple(AirQualityMeasurementOut.model_fields)
+
+
+@dataclass(frozen=True)
+class Page:
+    items: Sequence
+    next_cursor: str | None
+
+
+def encode_cursor(row_date: date, row_id: int) -> str:
+    raw = f"{row_date.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[date, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        row_date, row_id = raw.split("|")
+        return date.fromisoformat(row_date), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise InvalidCursorError(cursor) from exc
+
+
+def select_measurement_rows() -> Select:
+    columns = [getattr(AirQualityMeasurement, field) for field in MEASUREMENT_PAGE_FIELDS]
+    return select(*columns, AirQualityMeasurement.id)
+
+
+def paginate(stmt: Select, *, limit: int, cursor: str | None) -> Select:
+    """Order by (date, id) and continue strictly after the cursor row, fetching one extra row to detect a next page."""
+    if cursor is not None:
+        after_date, after_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(AirQualityMeasurement.date, AirQualityMeasurement.id) > tuple_(after_date, after_id))
+
+    return stmt.order_by(AirQualityMeasurement.date.asc(), AirQualityMeasurement.id.asc()).limit(limit + 1)
+
+
+def to_page(rows: Sequence, *, limit: int) -> Page:
+    if len(rows) <= limit:
+        return Page(items=rows, next_cursor=None)
+
+    items = rows[:limit]
+    last = items[-1]
+    return Page(items=items, next_cursor=encode_cursor(last.date, last.id))
@@ -0,0 +1,45 @@
+import logging
+from datetime import date
+
+from sqlalchemy import delete, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import AirQualityMeasurement
+from app.db.partitions import add_months, is_partitioned, list_partitions, month_start
+from app.services.city_stats_service import recompute_city_stats_statements
+from app.services.rollup_service import ROLLUP_MODELS
+from app.core.cache import invalidate_read_caches
+from app.core.logger import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+def retention_cutoff(*, keep_months: int, today: date | None = None) -> date:
+    """First day kept when keeping keep_months months, the current one included."""
+    return add_months(month_start(today or date.today()), 1 - keep_months)
+
+
+async def apply_retention(db: AsyncSession, *, keep_months: int, today: date | None = None) -> list[str]:
+    """Remove measurements older than the retention window; returns the partitions dropped."""
+    cutoff = retention_cutoff(keep_months=keep_months, today=today)
+    logger.info(f"Applying retention: removing measurements before {cutoff}")
+
+    dropped = []
+    if await is_partitioned(db):
+        partitions = await list_partitions(db)
+        dropped = sorted(name for name, month in partitions.items() if month < cutoff)
+        for name in dropped:
+            await db.execute(text(f"DROP TABLE {name}"))
+    else:
+        await db.execute(delete(AirQualityMeasurement).where(AirQualityMeasurement.date < cutoff))
+
+    # Rollups of removed months go away with them; per-city totals span all months and are recomputed.
+    for model in ROLLUP_MODELS.values():
+        await db.execute(delete(model).where(model.period < cutoff))
+    for stmt in recompute_city_stats_statements():
+        await db.execute(stmt)
+
+    await db.commit()
+    await invalidate_read_caches()
+    logger.info(f"Retention applied before {cutoff}; dropped partitions: {', '.join(dropped) or 'none'}")
+    return dropped
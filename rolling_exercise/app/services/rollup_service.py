@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import logging
+from collections.abc import Collection
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Executable, delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.constants.rollup_constants import GRANULARITY_DAY, GRANULARITY_MONTH
+from app.db.models import AirQualityMeasurement, CityAqiDailyRollup, CityAqiMonthlyRollup
+from app.services.aggregates import aggregate_aqi, aggregate_records, execute_upserts, upsert_aggregates
+from app.core.executor import run_cpu_bound
+from app.core.logger import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+ROLLUP_MODELS = {
+    GRANULARITY_DAY: CityAqiDailyRollup,
+    GRANULARITY_MONTH: CityAqiMonthlyRollup,
+}
+
+ROLLUP_PERIODS = {
+    GRANULARITY_DAY: AirQualityMeasurement.date,
+    GRANULARITY_MONTH: func.date_trunc("month", AirQualityMeasurement.date).cast(AirQualityMeasurement.date.type),
+}
+
+
+async def update_rollups(db: AsyncSession, fields: dict[str, np.ndarray]) -> None:
+    if len(fields["city"]) == 0:
+        return
+
+    rollups = await run_cpu_bound(rollup_records, fields)
+    for granularity, records in rollups.items():
+        await execute_upserts(db, upsert_aggregates(ROLLUP_MODELS[granularity], ["city", "period"]), records)
+
+    logger.debug(f"AQI rollups updated for {len(fields['city'])} rows")
+
+
+def rollup_records(fields: dict[str, np.ndarray]) -> dict[str, list[dict]]:
+    periods = {
+        GRANULARITY_DAY: fields["date"],
+        GRANULARITY_MONTH: fields["date"].astype("datetime64[M]").astype("datetime64[D]"),
+    }
+    rollups = {}
+    for granularity, period in periods.items():
+        frame = pd.DataFrame({"city": fields["city"], "period": period, "aqi": fields["aqi"]})
+        rollups[granularity] = aggregate_records(aggregate_aqi(frame, ["city", "period"]))
+    return rollups
+
+
+def recompute_rollup_statements(
+    cities: Collection[str] | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+) -> list[Executable]:
+    """Statements recomputing both rollups from measurements, for everything or only the given cities and dates."""
+    statements = []
+    for granularity, period in ROLLUP_PERIODS.items():
+        model = ROLLUP_MODELS[granularity]
+        target = delete(model)
+        aggregates = select(
+            AirQualityMeasurement.city,
+            period,
+            func.count(),
+            func.sum(AirQualityMeasurement.aqi),
+            func.min(AirQualityMeasurement.aqi),
+            func.max(AirQualityMeasurement.aqi),
+        ).group_by(AirQualityMeasurement.city, period)
+        if cities is not None:
+            first, last = _period_start(granularity, start_date), _period_start(granularity, end_date)
+            target = target.where(model.city.in_(cities), model.period.between(first, last))
+            aggregates = aggregates.where(AirQualityMeasurement.city.in_(cities), period.between(first, last))
+
+        statements.append(target)
+        statements.append(
+            insert(model).from_select(
+                ["city", "period", "measurement_count", "aqi_sum", "aqi_min", "aqi_max"],
+                aggregates,
+            )
+        )
+    return statements
+
+
+async def refresh_rollups(db: AsyncSession, *, cities: Collection[str], start_date: date, end_date: date) -> None:
+    for stmt in recompute_rollup_statements(cities, start_date, end_date):
+        await db.execute(stmt)
+    logger.debug(f"AQI rollups recomputed for {len(cities)} cities, {start_date} → {end_date}")
+
+
+async def rebuild_rollups(db: AsyncSession) -> None:
+    logger.info("Rebuilding AQI rollups from measurements...")
+
+    for stmt in recompute_rollup_statements():
+        await db.execute(stmt)
+    await db.commit()
+    logger.info("AQI rollups rebuilt")
+
+
+async def fetch_city_rollup(
+    *,
+    session: AsyncSession,
+    city: str,
+    granularity: str,
+    start_date: date | None = None,
+    end_date: date | None = None,
+) -> list[tuple[date, int, float, float, float]]:
+    logger.info(f"Fetching {granularity} rollup for city={city}: {start_date} → {end_date}")
+
+    model = ROLLUP_MODELS[granularity]
+    stmt = (
+        select(
+            model.period,
+            model.measurement_count,
+            model.average_aqi.label("average_aqi"),
+            model.aqi_min,
+            model.aqi_max,
+        )
+        .where(model.city == city)
+        .order_by(model.period.asc())
+    )
+    if start_date is not None:
+        stmt = stmt.where(model.period >= _period_start(granularity, start_date))
+    if end_date is not None:
+        stmt = stmt.where(model.period <= end_date)
+
+    result = await session.execute(stmt)
+    rows = result.all()
+    logger.info(f"Rollup for city={city}: {len(rows)} periods")
+    return rows
+
+
+def _period_start(granularity: str, day: date) -> date:
+    return day.replace(day=1) if granularity == GRANULARITY_MONTH else day
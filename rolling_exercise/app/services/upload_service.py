@@ -1,40 +1,520 @@
+import asyncio
 import logging
-from sqlalchemy.exc import SQLAlchemyError
+import os
+import time
+from collections import defaultdict, deque
+from collections.abc import AsyncIterator, Callable, Iterator
+from datetime import date, timedelta
+from io import BytesIO
+from typing import BinaryIO
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Update, bindparam, func, insert, tuple_, update
+from sqlalchemy.dialects.postgresql import ARRAY, Insert, insert as pg_insert
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.constants.config import settings
+from app.constants.ingest_constants import (
+    DUPLICATE_MEASUREMENTS_ERROR,
+    INGEST_MODE_BULK,
+    INGEST_MODE_UPSERT,
+    INGEST_STAGE_AQI,
+    INGEST_STAGE_WRITE,
+    JOB_STATUS_FAILED,
+    JOB_STATUS_SUCCEEDED,
+    MEASUREMENT_FIELDS,
+    MEASUREMENT_KEY_FIELDS,
+    UPLOAD_TRANSACTION_PER_FILE,
+)
 from app.db.models import AirQualityMeasurement
-from app.services.aqi_service import calculate_aqi_data
-from app.services.csv_service import parse_air_quality_csv
+from app.db.partitions import add_months, ensure_partitions_for_write, month_start
+from app.exceptions import CsvParseError
+from app.schemas.air_quality import IngestBatchResult, IngestFileResult, IngestResult
+from app.schemas.columns import AirQualityColumns, AqiColumns
+from app.services.aqi_service import calculate_aqi_columns
+from app.services.city_stats_service import refresh_city_stats, update_city_stats
+from app.services.rollup_service import refresh_rollups, update_rollups
+from app.services.archive_service import UploadSource, is_zip, iter_upload_members, open_upload, spool_member
+from app.services.columnar_service import iter_air_quality_upload
+from app.core.cache import invalidate_read_caches
+from app.core.executor import run_blocking, run_cpu_bound
 from app.core.logger import LOGGER_NAME
+from app.core.metrics import ingest_stage_duration
 
 logger = logging.getLogger(LOGGER_NAME)
 
-async def ingest_air_quality_csv(*, file_content: bytes, db: AsyncSession) -> int:
-    logger.info("Starting CSV ingestion...")
 
-    rows = parse_air_quality_csv(file_content)
-    logger.info(f"CSV parsed successfully. {len(rows)} rows found.")
+async def ingest_air_quality_csv(
+    *, file_content: bytes, db: AsyncSession, mode: str | None = None
+) -> IngestResult:
+    return await ingest_air_quality_stream(source=BytesIO(file_content), db=db, mode=mode)
+
+
+async def ingest_air_quality_uploads(
+    *,
+    uploads: list[UploadSource],
+    db: AsyncSession,
+    mode: str | None = None,
+    transaction: str | None = None,
+    on_progress: Callable[[int], None] | None = None,
+) -> IngestBatchResult:
+    """Ingest one or more uploaded files, with a result per file; a single plain, .gz or .zst file is streamed in chunks."""
+    if len(uploads) == 1 and not await run_blocking(is_zip, uploads[0]):
+        return await _ingest_single_file(
+            uploads[0], db=db, mode=mode, transaction=transaction, on_progress=on_progress
+        )
+
+    return await ingest_air_quality_files(
+        uploads=uploads, db=db, mode=mode, transaction=transaction, on_progress=on_progress
+    )
+
 
+async def ingest_air_quality_stream(
+    *,
+    source: BinaryIO,
+    db: AsyncSession,
+    mode: str | None = None,
+    content_type: str | None = None,
+    on_progress: Callable[[int], None] | None = None,
+) -> IngestResult:
+    mode = mode or settings.ingest_mode
+    logger.info(f"Starting CSV ingestion (mode={mode}, chunk_rows={settings.csv_chunk_rows})...")
+    started = time.perf_counter()
+    rows_read = rows_inserted = rows_updated = 0
+    # (city, month) pairs with updated rows, whose aggregates are recomputed on commit.
+    updated_months: set[tuple[str, date]] = set()
+
+    chunks = iter_air_quality_upload(source, content_type=content_type, chunk_rows=settings.csv_chunk_rows)
     try:
-        for row in rows:
-            aqi_data = calculate_aqi_data(row.pm25, row.no2, row.co2)
-
-            measurement = AirQualityMeasurement(
-                date=row.date,
-                city=row.city,
-                pm25=row.pm25,
-                no2=row.no2,
-                co2=row.co2,
-                aqi=aqi_data.aqi,
-                aqi_level=aqi_data.aqi_level,
-            )
-            db.add(measurement)
-
-        await db.commit()
-        logger.info(f"CSV ingestion completed. {len(rows)} rows inserted.")
-        return len(rows)
+        # Parsing advances a reader over the open file, so it stays on a thread; the AQI batch is pure and
+        # can go to the configured (thread or process) CPU executor.
+        while (columns := await run_blocking(next, chunks, None)) is not None:
+            with ingest_stage_duration.time(stage=INGEST_STAGE_AQI):
+                aqi_data = await run_cpu_bound(
+                    calculate_aqi_columns, columns.pm25, columns.no2, columns.co2, columns.city
+                )
+            rows_read += len(columns)
+
+            inserted, updated, months = await _write_chunk(db, columns, aqi_data, mode=mode)
+            rows_inserted += inserted
+            rows_updated += updated
+            updated_months |= months
+            logger.debug(f"CSV chunk ingested. {rows_read} rows so far.")
+            if on_progress is not None:
+                on_progress(rows_read)
+
+        await _commit(db, updated_months)
+
+    except CsvParseError:
+        await db.rollback()
+        raise
 
     except SQLAlchemyError as exc:
         logger.error(f"Database error during ingest: {exc}")
         await db.rollback()
         raise
+
+    finally:
+        # Release the CSV reader now, not whenever an aborted generator is collected (after the file is closed).
+        chunks.close()
+
+    elapsed = time.perf_counter() - started
+    result = IngestResult(
+        mode=mode,
+        rows_inserted=rows_inserted,
+        rows_updated=rows_updated,
+        rows_skipped=rows_read - rows_inserted - rows_updated,
+        elapsed_seconds=elapsed,
+        rows_per_second=rows_read / elapsed if elapsed > 0 else 0.0,
+    )
+    logger.info(
+        f"CSV ingestion completed. {result.rows_inserted} rows inserted, {result.rows_updated} updated, "
+        f"{result.rows_skipped} skipped in {result.elapsed_seconds:.3f}s "
+        f"({result.rows_per_second:.0f} rows/sec, mode={mode})."
+    )
+    return result
+
+
+async def ingest_air_quality_files(
+    *,
+    uploads: list[UploadSource],
+    db: AsyncSession,
+    mode: str | None = None,
+    transaction: str | None = None,
+    on_progress: Callable[[int], None] | None = None,
+) -> IngestBatchResult:
+    """Ingest several files (zip members included), parsed in parallel and written in upload order."""
+    mode = mode or settings.ingest_mode
+    transaction = transaction or settings.upload_transaction
+    per_file = transaction == UPLOAD_TRANSACTION_PER_FILE
+    logger.info(f"Starting multi-file ingestion (mode={mode}, transaction={transaction}, uploads={len(uploads)})...")
+    started = time.perf_counter()
+    rows_read = 0
+    pending_months: set[tuple[str, date]] = set()
+    files: list[IngestFileResult] = []
+
+    parsed = _parse_members(_iter_members(uploads))
+    try:
+        async for filename, chunks in parsed:
+            if isinstance(chunks, CsvParseError):
+                if not per_file:
+                    raise CsvParseError(f"{filename}: {chunks}") from chunks
+                logger.warning(f"Skipping {filename}: {chunks}")
+                files.append(IngestFileResult(filename=filename, status=JOB_STATUS_FAILED, error=str(chunks)))
+                continue
+
+            file_rows = sum(len(columns) for columns, _ in chunks)
+            rows_read += file_rows
+            try:
+                inserted = updated = 0
+                months: set[tuple[str, date]] = set()
+                for columns, aqi_data in chunks:
+                    chunk_inserted, chunk_updated, chunk_months = await _write_chunk(db, columns, aqi_data, mode=mode)
+                    inserted += chunk_inserted
+                    updated += chunk_updated
+                    months |= chunk_months
+                if per_file:
+                    await _commit(db, months)
+                else:
+                    pending_months |= months
+            except CsvParseError as exc:
+                if not per_file:
+                    raise CsvParseError(f"{filename}: {exc}") from exc
+                logger.warning(f"Rejected rows in {filename}, file rolled back: {exc}")
+                await db.rollback()
+                files.append(IngestFileResult(filename=filename, status=JOB_STATUS_FAILED, error=str(exc)))
+                continue
+            except SQLAlchemyError as exc:
+                if not per_file:
+                    raise
+                logger.warning(f"Database error while ingesting {filename}, file rolled back: {exc}")
+                await db.rollback()
+                error = DUPLICATE_MEASUREMENTS_ERROR if isinstance(exc, IntegrityError) else "Database error"
+                files.append(IngestFileResult(filename=filename, status=JOB_STATUS_FAILED, error=error))
+                continue
+
+            files.append(IngestFileResult(
+                filename=filename,
+                status=JOB_STATUS_SUCCEEDED,
+                rows_inserted=inserted,
+                rows_updated=updated,
+                rows_skipped=file_rows - inserted - updated,
+            ))
+            if on_progress is not None:
+                on_progress(rows_read)
+
+        if not per_file:
+            await _commit(db, pending_months)
+
+    except CsvParseError:
+        await db.rollback()
+        raise
+
+    except SQLAlchemyError as exc:
+        logger.error(f"Database error during multi-file ingest: {exc}")
+        await db.rollback()
+        raise
+
+    finally:
+        await parsed.aclose()
+
+    elapsed = time.perf_counter() - started
+    succeeded = [file for file in files if file.status == JOB_STATUS_SUCCEEDED]
+    result = IngestBatchResult(
+        mode=mode,
+        transaction=transaction,
+        rows_inserted=sum(file.rows_inserted for file in succeeded),
+        rows_updated=sum(file.rows_updated for file in succeeded),
+        rows_skipped=sum(file.rows_skipped for file in succeeded),
+        elapsed_seconds=elapsed,
+        rows_per_second=rows_read / elapsed if elapsed > 0 else 0.0,
+        files=files,
+    )
+    logger.info(
+        f"Multi-file ingestion completed. {len(succeeded)}/{len(files)} files, {result.rows_inserted} rows inserted, "
+        f"{result.rows_updated} updated, {result.rows_skipped} skipped in {result.elapsed_seconds:.3f}s."
+    )
+    return result
+
+
+async def _ingest_single_file(
+    upload: UploadSource,
+    *,
+    db: AsyncSession,
+    mode: str | None,
+    transaction: str | None,
+    on_progress: Callable[[int], None] | None,
+) -> IngestBatchResult:
+    """Stream one file in chunks and report it as a batch of one, failing it like ingest_air_quality_files would."""
+    mode = mode or settings.ingest_mode
+    transaction = transaction or settings.upload_transaction
+    started = time.perf_counter()
+    filename = upload.filename
+    try:
+        opened = await run_blocking(open_upload, upload)
+        filename = opened.filename
+        result = await ingest_air_quality_stream(
+            source=opened.source,
+            db=db,
+            mode=mode,
+            content_type=opened.content_type,
+            on_progress=on_progress,
+        )
+    except (CsvParseError, SQLAlchemyError) as exc:
+        if transaction != UPLOAD_TRANSACTION_PER_FILE:
+            raise
+        # ingest_air_quality_stream has already rolled the file back.
+        logger.warning(f"Skipping {filename}: {exc}")
+        if isinstance(exc, CsvParseError):
+            error = str(exc)
+        else:
+            error = DUPLICATE_MEASUREMENTS_ERROR if isinstance(exc, IntegrityError) else "Database error"
+        return IngestBatchResult(
+            mode=mode,
+            transaction=transaction,
+            rows_inserted=0,
+            elapsed_seconds=time.perf_counter() - started,
+            rows_per_second=0.0,
+            files=[IngestFileResult(filename=filename, status=JOB_STATUS_FAILED, error=error)],
+        )
+
+    file = IngestFileResult(
+        filename=filename,
+        status=JOB_STATUS_SUCCEEDED,
+        rows_inserted=result.rows_inserted,
+        rows_updated=result.rows_updated,
+        rows_skipped=result.rows_skipped,
+    )
+    return IngestBatchResult(**result.model_dump(), transaction=transaction, files=[file])
+
+
+def _iter_members(uploads: list[UploadSource]) -> Iterator[UploadSource]:
+    for upload in uploads:
+        yield from iter_upload_members(upload)
+
+
+async def _parse_members(
+    members: Iterator[UploadSource]
+) -> AsyncIterator[tuple[str | None, list[tuple[AirQualityColumns, AqiColumns]] | CsvParseError]]:
+    """Parse files on the CPU executor, up to cpu_executor_workers ahead of the writer, yielding them in order.
+
+    Each file is first spooled to a temporary file (bounded by max_member_bytes), which the parser reads back.
+    """
+    # A file that could not be spooled keeps its place in line as its error, with no path.
+    pending: deque[tuple[str | None, str | None, asyncio.Future | CsvParseError]] = deque()
+    try:
+        while True:
+            while len(pending) < settings.cpu_executor_workers:
+                # Advancing the members closes the previous zip member, so each one is spooled before the next.
+                member = await run_blocking(next, members, None)
+                if member is None:
+                    break
+                try:
+                    path = await run_blocking(spool_member, member, settings.max_member_bytes)
+                except CsvParseError as exc:
+                    pending.append((member.filename, None, exc))
+                    continue
+                parse = _parse_file(path, member.content_type)
+                pending.append((member.filename, path, asyncio.ensure_future(parse)))
+
+            if not pending:
+                return
+
+            filename, path, parse = pending.popleft()
+            if isinstance(parse, CsvParseError):
+                yield filename, parse
+                continue
+            try:
+                yield filename, await parse
+            except CsvParseError as exc:
+                yield filename, exc
+            finally:
+                await run_blocking(os.remove, path)
+    finally:
+        for _, path, parse in pending:
+            if path is not None:
+                parse.cancel()
+                os.remove(path)
+        members.close()
+
+
+async def _parse_file(path: str, content_type: str | None) -> list[tuple[AirQualityColumns, AqiColumns]]:
+    columns = await run_cpu_bound(_read_file, path, content_type, settings.csv_chunk_rows)
+    chunks = []
+    for chunk in columns:
+        # Timed here rather than in the worker, whose metrics a process pool would lose.
+        with ingest_stage_duration.time(stage=INGEST_STAGE_AQI):
+            aqi_data = await run_cpu_bound(calculate_aqi_columns, chunk.pm25, chunk.no2, chunk.co2, chunk.city)
+        chunks.append((chunk, aqi_data))
+    return chunks
+
+
+def _read_file(path: str, content_type: str | None, chunk_rows: int) -> list[AirQualityColumns]:
+    # Runs on the CPU executor (possibly another process): parses a whole file in one task.
+    with open(path, "rb") as source:
+        return list(iter_air_quality_upload(source, content_type=content_type, chunk_rows=chunk_rows))
+
+
+async def _write_chunk(
+    db: AsyncSession, columns: AirQualityColumns, aqi_data: AqiColumns, *, mode: str
+) -> tuple[int, int, set[tuple[str, date]]]:
+    """Write one parsed chunk; returns the rows inserted, the rows updated and the (city, month) pairs updated."""
+    fields = _measurement_fields(columns, aqi_data)
+    if mode == INGEST_MODE_UPSERT:
+        fields = await run_cpu_bound(_drop_duplicate_keys, fields)
+    updated, updated_months = 0, set()
+
+    with ingest_stage_duration.time(stage=INGEST_STAGE_WRITE):
+        if settings.partition_measurements:
+            await ensure_partitions_for_write(db, np.unique(fields["date"].astype("datetime64[M]")).tolist())
+
+        if mode == INGEST_MODE_UPSERT:
+            fields, updated, updated_months = await _upsert(db, fields)
+        elif mode == INGEST_MODE_BULK:
+            await _insert_bulk(db, fields)
+        else:
+            await _insert_orm(db, fields)
+        # fields now only holds newly inserted rows, which the aggregates absorb incrementally.
+        await update_city_stats(db, fields)
+        await update_rollups(db, fields)
+
+    return len(fields["date"]), updated, updated_months
+
+
+async def _commit(db: AsyncSession, updated_months: set[tuple[str, date]]) -> None:
+    if updated_months:
+        await _refresh_aggregates(db, updated_months)
+    await db.commit()
+    await invalidate_read_caches()
+
+
+def _measurement_fields(columns: AirQualityColumns, aqi_data: AqiColumns) -> dict[str, np.ndarray]:
+    return {
+        "date": columns.date,
+        "city": columns.city,
+        "pm25": columns.pm25,
+        "no2": columns.no2,
+        "co2": columns.co2,
+        "aqi": aqi_data.aqi,
+        "aqi_level": aqi_data.aqi_level,
+        "is_alert": aqi_data.is_alert,
+    }
+
+
+async def _insert_orm(db: AsyncSession, fields: dict[str, np.ndarray]) -> None:
+    db.add_all(AirQualityMeasurement(**record) for record in _iter_records(fields))
+    # Flush each chunk and drop it from the identity map so memory stays bounded.
+    await db.flush()
+    db.expunge_all()
+
+
+async def _insert_bulk(db: AsyncSession, fields: dict[str, np.ndarray]) -> None:
+    stmt = insert(AirQualityMeasurement.__table__)
+    total = len(fields["date"])
+    for start in range(0, total, settings.ingest_batch_size):
+        stop = min(start + settings.ingest_batch_size, total)
+        await db.execute(stmt, await run_blocking(_records, fields, start, stop))
+
+
+def _insert_new_statement() -> Insert:
+    table = AirQualityMeasurement.__table__
+    return (
+        pg_insert(table)
+        .on_conflict_do_nothing(index_elements=list(MEASUREMENT_KEY_FIELDS))
+        .returning(*(table.c[name] for name in MEASUREMENT_KEY_FIELDS))
+    )
+
+
+def _update_changed_statement() -> Update:
+    table = AirQualityMeasurement.__table__
+    # One array parameter per column, unnested into rows server side, so a whole batch is a single UPDATE.
+    incoming = func.unnest(
+        *(bindparam(f"{name}_values", type_=ARRAY(table.c[name].type)) for name in MEASUREMENT_FIELDS)
+    ).table_valued(*MEASUREMENT_FIELDS).render_derived(name="incoming")
+    values = [name for name in MEASUREMENT_FIELDS if name not in MEASUREMENT_KEY_FIELDS]
+    return (
+        update(table)
+        .where(
+            *(table.c[name] == incoming.c[name] for name in MEASUREMENT_KEY_FIELDS),
+            # An identical stored row is left alone and not returned, which is what counts it as skipped.
+            tuple_(*(table.c[name] for name in values)).is_distinct_from(tuple_(*(incoming.c[name] for name in values))),
+        )
+        .values({name: incoming.c[name] for name in values})
+        .returning(*(table.c[name] for name in MEASUREMENT_KEY_FIELDS))
+    )
+
+
+async def _upsert(
+    db: AsyncSession, fields: dict[str, np.ndarray]
+) -> tuple[dict[str, np.ndarray], int, set[tuple[str, date]]]:
+    """Upsert a chunk with unique keys; returns the fields of the inserted rows, the rows updated and their (city, month) pairs."""
+    # Insert-then-update rather than ON CONFLICT DO UPDATE: telling inserts from updates in a single
+    # upsert needs xmax, which partitioned tables cannot return.
+    inserted_keys: set[tuple[str, date]] = set()
+    total = len(fields["date"])
+    insert_stmt = _insert_new_statement()
+    for start in range(0, total, settings.ingest_batch_size):
+        stop = min(start + settings.ingest_batch_size, total)
+        result = await db.execute(insert_stmt, await run_blocking(_records, fields, start, stop))
+        inserted_keys.update(map(tuple, result))
+
+    if len(inserted_keys) == total:
+        return fields, 0, set()
+
+    fields, conflicting = await run_cpu_bound(_split_keys, fields, inserted_keys)
+    updated, updated_months = 0, set()
+    update_stmt = _update_changed_statement()
+    for start in range(0, len(conflicting["date"]), settings.ingest_batch_size):
+        params = await run_blocking(_update_params, conflicting, start, start + settings.ingest_batch_size)
+        keys = (await db.execute(update_stmt, params)).all()
+        updated += len(keys)
+        updated_months.update((city, month_start(day)) for city, day in keys)
+    return fields, updated, updated_months
+
+
+async def _refresh_aggregates(db: AsyncSession, months: set[tuple[str, date]]) -> None:
+    cities_by_month: dict[date, set[str]] = defaultdict(set)
+    for city, month in months:
+        cities_by_month[month].add(city)
+    await refresh_city_stats(db, {city for city, _ in months})
+    for month, cities in sorted(cities_by_month.items()):
+        await refresh_rollups(db, cities=cities, start_date=month, end_date=add_months(month, 1) - timedelta(days=1))
+
+
+def _drop_duplicate_keys(fields: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    # Within one statement ON CONFLICT cannot touch a row twice, so the last row per key wins up front.
+    # Repeats in later chunks or files are left to the upsert, which updates the row or skips an identical one.
+    keep = ~pd.DataFrame(fields).duplicated(subset=list(MEASUREMENT_KEY_FIELDS), keep="last").to_numpy()
+    if keep.all():
+        return fields
+    return {name: values[keep] for name, values in fields.items()}
+
+
+def _split_keys(
+    fields: dict[str, np.ndarray], keys: set[tuple[str, date]]
+) -> tuple[dict[str, np.ndarray], dict[str, np.ndarray]]:
+    """Split fields into the rows whose key is in keys and the rest."""
+    matched = np.fromiter(
+        (key in keys for key in zip(fields["city"].tolist(), fields["date"].tolist())),
+        dtype=bool,
+        count=len(fields["date"]),
+    )
+    return {name: values[matched] for name, values in fields.items()}, {name: values[~matched] for name, values in fields.items()}
+
+
+def _records(fields: dict[str, np.ndarray], start: int, stop: int) -> list[dict]:
+    # Built on a thread rather than the process pool: pickling the dicts back would cost more than building them.
+    return list(_iter_records(fields, start, stop))
+
+
+def _update_params(fields: dict[str, np.ndarray], start: int, stop: int) -> dict[str, list]:
+    return {f"{name}_values": fields[name][start:stop].tolist() for name in MEASUREMENT_FIELDS}
+
+
+def _iter_records(fields: dict[str, np.ndarray], start: int = 0, stop: int | None = None) -> Iterator[dict]:
+    # tolist() converts to native Python values (datetime64[D] -> datetime.date) in one C-level pass.
+    columns = [fields[name][start:stop].tolist() for name in MEASUREMENT_FIELDS]
+    for values in zip(*columns):
+        yield dict(zip(MEASUREMENT_FIELDS, values))
@@ -0,0 +1,29 @@
+"""Compare two benchmark result files: python -m benchmarks.compare <baseline.json> <candidate.json>"""
+import argparse
+import json
+from pathlib import Path
+
+
+def _by_key(path: Path) -> dict[tuple[str, int], dict]:
+    report = json.loads(path.read_text())
+    return {(result["name"], result["rows"]): result for result in report["results"]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare median timings between two benchmark runs")
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--threshold", type=float, default=1.10, help="Flag candidates slower than baseline by this ratio")
+    args = parser.parse_args()
+
+    baseline, candidate = _by_key(args.baseline), _by_key(args.candidate)
+    print(f"{'benchmark':<40} {'rows':>9} {'baseline':>11} {'candidate':>11} {'ratio':>7}")
+    for key in sorted(baseline.keys() & candidate.keys(), key=lambda key: (key[1], key[0])):
+        old, new = baseline[key]["median_seconds"], candidate[key]["median_seconds"]
+        ratio = new / old if old else float("inf")
+        flag = "  slower" if ratio > args.threshold else ""
+        print(f"{key[0]:<40} {key[1]:>9} {old * 1000:>9.2f}ms {new * 1000:>9.2f}ms {ratio:>7.2f}{flag}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Run the benchmark suite and write the results as JSON.
+
+Run from the rolling_exercise directory against the test database, e.g.:
+    python -m benchmarks.run --sizes 1000 10000 100000
+    python -m benchmarks.compare benchmarks/results/<old>.json benchmarks/results/<new>.json
+
+The DB benchmarks work in a schema of their own (dropped afterwards), so the tables of the
+target database are left alone.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark CSV parsing, AQI, ingest and the read endpoints")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000], help="Table sizes, in rows")
+    parser.add_argument("--cities", type=int, default=50)
+    parser.add_argument("--days", type=int, default=3650)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--mode", action="append", dest="modes", help="Ingest mode(s); defaults to INGEST_MODE")
+    parser.add_argument("--schema", default="benchmark")
+    parser.add_argument("--env-file", default=".env.test")
+    parser.add_argument("-o", "--output", type=Path, help="Defaults to benchmarks/results/<git revision>.json")
+    args = parser.parse_args()
+
+    # Settings are read on import, so the environment has to be loaded before the app is.
+    load_dotenv(args.env_file, override=True)
+    from app.constants.config import settings
+    from benchmarks.suite import run_suite
+
+    revision = _git_revision()
+    modes = args.modes or [settings.ingest_mode]
+    results = asyncio.run(run_suite(
+        sizes=sorted(args.sizes), cities=args.cities, days=args.days, repeat=args.repeat, modes=modes, schema=args.schema
+    ))
+
+    report = {
+        "revision": revision,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "params": {"sizes": sorted(args.sizes), "cities": args.cities, "days": args.days, "repeat": args.repeat, "modes": modes},
+        "results": results,
+    }
+    output = args.output or RESULTS_DIR / f"{revision}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+    print(f"Wrote {len(results)} results to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""Ingest and query benchmarks; imported by benchmarks.run once the environment is loaded."""
+import asyncio
+import statistics
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from calculate_aqi import AqiCalculator, calculate_aqi, calculate_aqi_batch
+from app.constants.config import settings
+from app.db.migrations import init_db
+from app.db.models import AirQualityMeasurement
+from app.db.session import Base, get_db, get_read_db
+from app.main import app
+from app.routes.pagination import measurement_page_content
+from app.routes.responses import PlainJSONResponse
+from app.schemas.air_quality import MeasurementPage
+from app.services.csv_service import parse_air_quality_csv
+from app.services.pagination import Page, select_measurement_rows
+from app.services.upload_service import ingest_air_quality_csv
+from benchmarks.synthetic_csv import city_names, date_span, generate_air_quality_csv
+
+# The scalar AQI path is a Python loop, so it is timed on a slice and reported per row like the others.
+SCALAR_AQI_MAX_ROWS = 20_000
+# Rows fetched and serialized per read-path run, well past the API page limit so per-row costs dominate.
+READ_PAGE_MAX_ROWS = 10_000
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    rows: int
+    seconds: list[float] = field(default_factory=list)
+    # False for latency samples taken while rows are processed elsewhere, where per-row rates mean nothing.
+    per_row: bool = True
+
+    def to_dict(self) -> dict:
+        median = statistics.median(self.seconds)
+        return {
+            "name": self.name,
+            "rows": self.rows,
+            "repeat": len(self.seconds),
+            "min_seconds": min(self.seconds),
+            "median_seconds": median,
+            "mean_seconds": statistics.fmean(self.seconds),
+            "max_seconds": max(self.seconds),
+            "rows_per_second": self.rows / median if median and self.per_row else None,
+            "microseconds_per_row": median / self.rows * 1e6 if self.rows and self.per_row else None,
+        }
+
+
+def _time(name: str, rows: int, repeat: int, func: Callable[[], object]) -> BenchmarkResult:
+    result = BenchmarkResult(name=name, rows=rows)
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        result.seconds.append(time.perf_counter() - started)
+    return result
+
+
+async def _time_async(name: str, rows: int, repeat: int, func: Callable[[], Awaitable[object]]) -> BenchmarkResult:
+    result = BenchmarkResult(name=name, rows=rows)
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await func()
+        result.seconds.append(time.perf_counter() - started)
+    return result
+
+
+def bench_parse(content: bytes, *, rows: int, repeat: int) -> list[BenchmarkResult]:
+    return [_time("parse_air_quality_csv", rows, repeat, lambda: parse_air_quality_csv(content))]
+
+
+def bench_aqi(content: bytes, *, rows: int, repeat: int) -> list[BenchmarkResult]:
+    columns = parse_air_quality_csv(content)
+    scalar_rows = min(rows, SCALAR_AQI_MAX_ROWS)
+    pm25, no2, co2 = (values[:scalar_rows].tolist() for values in (columns.pm25, columns.no2, columns.co2))
+
+    uncached = AqiCalculator(cache_size=0)
+
+    def scalar(func) -> Callable[[], None]:
+        def run() -> None:
+            for row in zip(pm25, no2, co2):
+                func(*row)
+        return run
+
+    # calculate_aqi memoizes its last DEFAULT_CACHE_SIZE inputs; the uncached row shows what a miss costs.
+    return [
+        _time("calculate_aqi[scalar]", scalar_rows, repeat, scalar(calculate_aqi)),
+        _time("calculate_aqi[scalar_uncached]", scalar_rows, repeat, scalar(uncached.calculate)),
+        _time("calculate_aqi[batch]", rows, repeat, lambda: calculate_aqi_batch(columns.pm25, columns.no2, columns.co2)),
+    ]
+
+
+def schema_engine(schema: str) -> AsyncEngine:
+    return create_async_engine(settings.database_url, connect_args={"server_settings": {"search_path": schema}})
+
+
+async def reset_schema(engine: AsyncEngine, schema: str) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {schema}"))
+        await init_db(conn)
+
+
+async def drop_schema(engine: AsyncEngine, schema: str) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+
+
+async def _truncate(engine: AsyncEngine) -> None:
+    tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+    async with engine.begin() as conn:
+        await conn.execute(text(f"TRUNCATE TABLE {tables} RESTART IDENTITY"))
+
+
+async def bench_ingest(engine: AsyncEngine, content: bytes, *, rows: int, repeat: int, mode: str) -> list[BenchmarkResult]:
+    """Time a full upload into empty tables; the last run leaves the data in place for the read benchmarks."""
+    SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
+    result = BenchmarkResult(name=f"ingest_air_quality_csv[{mode}]", rows=rows)
+    for _ in range(repeat):
+        await _truncate(engine)
+        async with SessionLocal() as db:
+            started = time.perf_counter()
+            await ingest_air_quality_csv(file_content=content, db=db, mode=mode)
+            result.seconds.append(time.perf_counter() - started)
+    return [result]
+
+
+async def bench_read_page(engine: AsyncEngine, *, rows: int, repeat: int) -> list[BenchmarkResult]:
+    """Fetch and serialize one page of measurements both ways: ORM + pydantic (the old path) and Core rows as plain dicts.
+
+    The gain comes from skipping ORM objects and pydantic models; both ends use the stdlib JSON encoder.
+    """
+    SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
+    order = (AirQualityMeasurement.date, AirQualityMeasurement.id)
+    rows = min(rows, READ_PAGE_MAX_ROWS)
+
+    async def orm_pydantic() -> bytes:
+        async with SessionLocal() as db:
+            items = (await db.execute(select(AirQualityMeasurement).order_by(*order).limit(rows))).scalars().all()
+            return JSONResponse(jsonable_encoder(MeasurementPage(items=items))).body
+
+    async def core_plain_json() -> bytes:
+        async with SessionLocal() as db:
+            items = (await db.execute(select_measurement_rows().order_by(*order).limit(rows))).all()
+            return PlainJSONResponse(measurement_page_content(Page(items=items, next_cursor=None))).body
+
+    await orm_pydantic()
+    await core_plain_json()
+    return [
+        await _time_async("read_page[orm+pydantic]", rows, repeat, orm_pydantic),
+        await _time_async("read_page[core_rows+no_pydantic]", rows, repeat, core_plain_json),
+    ]
+
+
+def read_endpoints(*, cities: int, days: int) -> dict[str, tuple[str, dict]]:
+    city = city_names(cities)[0]
+    start_date, end_date = date_span(days=days)
+    return {
+        "GET /cities/best": ("/cities/best", {}),
+        "GET /cities/{city}": (f"/cities/{city}", {}),
+        "GET /cities/{city}/average": (f"/cities/{city}/average", {}),
+        "GET /alerts": ("/alerts", {}),
+        "GET /history": ("/history", {"start_date": start_date.isoformat(), "end_date": end_date.isoformat()}),
+    }
+
+
+@asynccontextmanager
+async def _app_client(engine: AsyncEngine) -> AsyncIterator[AsyncClient]:
+    """In-process (no network) client for the app, on engine, with the read cache off so every call hits the DB."""
+    SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def override_db():
+        async with SessionLocal() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_read_db] = override_db
+    cache_enabled, settings.cache_enabled = settings.cache_enabled, False
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://benchmark") as client:
+            yield client
+    finally:
+        settings.cache_enabled = cache_enabled
+        app.dependency_overrides.clear()
+
+
+async def bench_reads(engine: AsyncEngine, *, rows: int, cities: int, days: int, repeat: int) -> list[BenchmarkResult]:
+    async with _app_client(engine) as client:
+        results = []
+        for name, (path, params) in read_endpoints(cities=cities, days=days).items():
+            async def request() -> None:
+                response = await client.get(path, params=params)
+                response.raise_for_status()
+
+            await request()  # warm-up: connection checkout and statement preparation
+            results.append(await _time_async(name, rows, repeat, request))
+        return results
+
+
+async def bench_health_during_upload(engine: AsyncEngine, content: bytes, *, rows: int) -> list[BenchmarkResult]:
+    """/health latency while the content is uploaded, i.e. how long ingest keeps the event loop busy at a time."""
+    result = BenchmarkResult(name="GET /health during upload", rows=rows, per_row=False)
+    await _truncate(engine)
+    async with _app_client(engine) as client:
+        upload = asyncio.create_task(client.post("/upload", files={"file": ("benchmark.csv", content, "text/csv")}))
+        while not upload.done():
+            # Timed from just before yielding to the loop, so time the loop spends blocked by the upload counts too.
+            started = time.perf_counter()
+            await asyncio.sleep(0)
+            response = await client.get("/health")
+            response.raise_for_status()
+            result.seconds.append(time.perf_counter() - started)
+        (await upload).raise_for_status()
+    return [result] if result.seconds else []
+
+
+async def run_suite(*, sizes: list[int], cities: int, days: int, repeat: int, modes: list[str], schema: str) -> list[dict]:
+    engine = schema_engine(schema)
+    results: list[BenchmarkResult] = []
+    try:
+        await reset_schema(engine, schema)
+        for rows in sizes:
+            content = generate_air_quality_csv(rows=rows, cities=cities, days=days)
+            results += bench_parse(content, rows=rows, repeat=repeat)
+            results += bench_aqi(content, rows=rows, repeat=repeat)
+            for mode in modes:
+                results += await bench_ingest(engine, content, rows=rows, repeat=repeat, mode=mode)
+            results += await bench_read_page(engine, rows=rows, repeat=repeat)
+            results += await bench_reads(engine, rows=rows, cities=cities, days=days, repeat=repeat)
+            results += await bench_health_during_upload(engine, content, rows=rows)
+    finally:
+        await drop_schema(engine, schema)
+        await engine.dispose()
+    return [result.to_dict() for result in results]
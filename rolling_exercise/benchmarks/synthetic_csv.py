@@ -0,0 +1,83 @@
+"""Synthetic air-quality CSVs in the upload format (see app/constants/csv_constants.py).
+
+Usage, from the rolling_exercise directory:
+    python -m benchmarks.synthetic_csv --rows 100000 --cities 50 --days 365 -o air_quality_synthetic.csv
+"""
+import argparse
+import io
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from app.constants.csv_constants import CSV_CITY_COL, CSV_CO2_COL, CSV_DATE_COL, CSV_ENCODING, CSV_NO2_COL, CSV_PM25_COL
+
+DEFAULT_START_DATE = date(2024, 1, 1)
+
+# Rough pollutant distributions, with a thin tail above the alert threshold so alerts are exercised too.
+POLLUTANT_RANGES = {
+    CSV_PM25_COL: (5.0, 120.0),
+    CSV_NO2_COL: (10.0, 300.0),
+    CSV_CO2_COL: (1.0, 60.0),
+}
+HAZARDOUS_SHARE = 0.02
+HAZARDOUS_PM25_RANGE = (260.0, 480.0)
+
+
+def city_names(cities: int) -> list[str]:
+    return [f"City {index:04d}" for index in range(cities)]
+
+
+def generate_air_quality_csv(
+    *,
+    rows: int,
+    cities: int,
+    days: int,
+    start_date: date = DEFAULT_START_DATE,
+    seed: int = 0,
+) -> bytes:
+    """Return a CSV with rows measurements, each a distinct (city, date) among cities x days."""
+    if rows > cities * days:
+        raise ValueError(f"{rows} rows do not fit in {cities} cities x {days} days without duplicate keys")
+
+    rng = np.random.default_rng(seed)
+    keys = rng.choice(cities * days, size=rows, replace=False)
+    day_offsets, city_indexes = np.divmod(keys, cities)
+
+    frame = pd.DataFrame({
+        CSV_DATE_COL: (np.datetime64(start_date) + day_offsets.astype("timedelta64[D]")).astype(str),
+        CSV_CITY_COL: np.asarray(city_names(cities), dtype=object)[city_indexes],
+    })
+    for column, (low, high) in POLLUTANT_RANGES.items():
+        frame[column] = rng.uniform(low, high, size=rows).round(1)
+    hazardous = rng.random(rows) < HAZARDOUS_SHARE
+    frame.loc[hazardous, CSV_PM25_COL] = rng.uniform(*HAZARDOUS_PM25_RANGE, size=int(hazardous.sum())).round(1)
+
+    buffer = io.StringIO()
+    frame.to_csv(buffer, index=False)
+    return buffer.getvalue().encode(CSV_ENCODING)
+
+
+def date_span(*, days: int, start_date: date = DEFAULT_START_DATE) -> tuple[date, date]:
+    return start_date, start_date + timedelta(days=days - 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic air-quality CSV")
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--cities", type=int, default=50)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--start-date", type=date.fromisoformat, default=DEFAULT_START_DATE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", required=True)
+    args = parser.parse_args()
+
+    content = generate_air_quality_csv(
+        rows=args.rows, cities=args.cities, days=args.days, start_date=args.start_date, seed=args.seed
+    )
+    with open(args.output, "wb") as file:
+        file.write(content)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,52 +1,208 @@
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping, Sequence
+from functools import lru_cache
+
+import numpy as np
+
+PM25_BREAKPOINTS = (
+    (0, 12, 0, 50),
+    (12.1, 35.4, 51, 100),
+    (35.5, 55.4, 101, 150),
+    (55.5, 150.4, 151, 200),
+    (150.5, 250.4, 201, 300),
+    (250.5, 500.4, 301, 500),
+)
+
+NO2_BREAKPOINTS = (
+    (0, 53, 0, 50),
+    (54, 100, 51, 100),
+    (101, 360, 101, 150),
+    (361, 649, 151, 200),
+    (650, 1249, 201, 300),
+    (1250, 2049, 301, 500),
+)
+
+CO2_BREAKPOINTS = (
+    (0, 5, 0, 50),
+    (5.1, 15, 51, 100),
+    (15.1, 30, 101, 150),
+    (30.1, 60, 151, 200),
+    (60.1, 100, 201, 300),
+    (100.1, 200, 301, 500),
+)
+
+AQI_THRESHOLDS = (
+    (50, "Good"),
+    (100, "Moderate"),
+    (150, "Unhealthy for Sensitive Groups"),
+    (200, "Unhealthy"),
+    (300, "Very Unhealthy"),
+    (500, "Hazardous"),
+)
+
+# European Common Air Quality Index (hourly grid, 0-100 with "Very high" above 100). CAQI has CO rather
+# than CO2 (mg/m3), applied here to the co2 column; its open-ended top band is stretched to 500.
+EU_CAQI_PM25_BREAKPOINTS = (
+    (0, 15, 0, 25),
+    (15, 30, 25, 50),
+    (30, 55, 50, 75),
+    (55, 110, 75, 100),
+    (110, 500.4, 100, 500),
+)
+
+EU_CAQI_NO2_BREAKPOINTS = (
+    (0, 50, 0, 25),
+    (50, 100, 25, 50),
+    (100, 200, 50, 75),
+    (200, 400, 75, 100),
+    (400, 2049, 100, 500),
+)
+
+EU_CAQI_CO2_BREAKPOINTS = (
+    (0, 5, 0, 25),
+    (5, 7.5, 25, 50),
+    (7.5, 10, 50, 75),
+    (10, 20, 75, 100),
+    (20, 200, 100, 500),
+)
+
+EU_CAQI_THRESHOLDS = (
+    (25, "Very low"),
+    (50, "Low"),
+    (75, "Medium"),
+    (100, "High"),
+    (500, "Very high"),
+)
+
+AQI_STANDARD_EPA = "epa"
+AQI_STANDARD_EU_CAQI = "eu_caqi"
+
+# Built-in standards, in the same shape AqiCalculator.from_config reads from JSON.
+AQI_STANDARDS = {
+    AQI_STANDARD_EPA: {"pm25": PM25_BREAKPOINTS, "no2": NO2_BREAKPOINTS, "co2": CO2_BREAKPOINTS, "levels": AQI_THRESHOLDS},
+    AQI_STANDARD_EU_CAQI: {
+        "pm25": EU_CAQI_PM25_BREAKPOINTS,
+        "no2": EU_CAQI_NO2_BREAKPOINTS,
+        "co2": EU_CAQI_CO2_BREAKPOINTS,
+        "levels": EU_CAQI_THRESHOLDS,
+    },
+}
+
+MAX_AQI = 500
+DEFAULT_CACHE_SIZE = 4096
+
+Breakpoints = Sequence[tuple[float, float, float, float]]
+
+
+class _SubIndex:
+    """One pollutant's breakpoint table, split into columns for bisect (scalar) and searchsorted (batch)."""
+
+    def __init__(self, breakpoints: Breakpoints) -> None:
+        breakpoints = tuple(tuple(row) for row in breakpoints)
+        if not breakpoints or any(len(row) != 4 for row in breakpoints):
+            raise ValueError("breakpoints must be non-empty (lower, upper, aqi_lower, aqi_upper) rows")
+        if any(lower >= upper for lower, upper, _, _ in breakpoints):
+            raise ValueError("each breakpoint range needs lower < upper")
+        # Ranges may share a boundary (as in CAQI); a value on it falls in the later range.
+        if any(previous[1] > current[0] for previous, current in zip(breakpoints, breakpoints[1:])):
+            raise ValueError("breakpoint ranges must be sorted and must not overlap")
+
+        self.breakpoints = breakpoints
+        self.lowers = [row[0] for row in breakpoints]
+        self.arrays = tuple(np.array(column, dtype=np.float64) for column in zip(*breakpoints))
+
+    def scalar(self, value: float) -> float:
+        # The ranges are sorted and disjoint, so the only candidate is the last range starting at or below the value.
+        index = bisect_right(self.lowers, value) - 1
+        if index < 0:
+            return MAX_AQI
+        lower, upper, aqi_lower, aqi_upper = self.breakpoints[index]
+        if not value <= upper:
+            return MAX_AQI
+        return aqi_lower + (value - lower) * (aqi_upper - aqi_lower) / (upper - lower)
+
+    def batch(self, values: np.ndarray) -> np.ndarray:
+        lowers, uppers, aqi_lowers, aqi_uppers = self.arrays
+        index = np.searchsorted(lowers, values, side="right") - 1
+        candidate = np.clip(index, 0, len(lowers) - 1)
+        in_range = (index >= 0) & (values <= uppers[candidate])
+
+        lower = lowers[candidate]
+        sub_index = aqi_lowers[candidate] + (values - lower) * (aqi_uppers[candidate] - aqi_lowers[candidate]) / (uppers[candidate] - lower)
+        return np.where(in_range, sub_index, float(MAX_AQI))
+
+
+class AqiCalculator:
+    """AQI from PM2.5, NO2 and CO2, compiled once from breakpoint tables.
+
+    Values outside (or between) a pollutant's ranges score 500, and the overall AQI is
+    the highest sub-index clipped to [0, 500]. Scalar results are memoized.
+    """
+
+    def __init__(
+        self,
+        *,
+        pm25: Breakpoints = PM25_BREAKPOINTS,
+        no2: Breakpoints = NO2_BREAKPOINTS,
+        co2: Breakpoints = CO2_BREAKPOINTS,
+        thresholds: Sequence[tuple[float, str]] = AQI_THRESHOLDS,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+    ) -> None:
+        thresholds = tuple(tuple(row) for row in thresholds)
+        limits = [limit for limit, _ in thresholds]
+        if not thresholds or limits != sorted(limits) or limits[-1] < MAX_AQI:
+            raise ValueError(f"AQI thresholds must be sorted and reach {MAX_AQI}")
+
+        self.sub_indexes = (_SubIndex(pm25), _SubIndex(no2), _SubIndex(co2))
+        self.thresholds = thresholds
+        self._limits = limits
+        self._levels = [level for _, level in thresholds]
+        self._limits_array = np.array(limits, dtype=np.float64)
+        self._levels_array = np.array(self._levels, dtype=object)
+        self.calculate = lru_cache(maxsize=cache_size)(self._calculate)
+
+    @classmethod
+    def from_config(cls, config: Mapping, *, cache_size: int = DEFAULT_CACHE_SIZE) -> "AqiCalculator":
+        """Build from {"pm25": [...], "no2": [...], "co2": [...], "levels": [[limit, name], ...]}; missing keys keep the defaults."""
+        return cls(
+            pm25=config.get("pm25", PM25_BREAKPOINTS),
+            no2=config.get("no2", NO2_BREAKPOINTS),
+            co2=config.get("co2", CO2_BREAKPOINTS),
+            thresholds=config.get("levels", AQI_THRESHOLDS),
+            cache_size=cache_size,
+        )
+
+    def _calculate(self, pm25: float, no2: float, co2: float) -> tuple[float, str]:
+        pm25_index, no2_index, co2_index = self.sub_indexes
+        overall_aqi = max(
+            min(pm25_index.scalar(pm25), MAX_AQI),
+            min(no2_index.scalar(no2), MAX_AQI),
+            min(co2_index.scalar(co2), MAX_AQI),
+            0,
+        )
+        return overall_aqi, self._levels[bisect_left(self._limits, overall_aqi)]
+
+    def calculate_batch(self, pm25, no2, co2) -> tuple[np.ndarray, np.ndarray]:
+        columns = (np.asarray(values, dtype=np.float64) for values in (pm25, no2, co2))
+        sub_indexes = [np.clip(sub_index.batch(values), 0, MAX_AQI) for sub_index, values in zip(self.sub_indexes, columns)]
+        overall_aqi = np.maximum.reduce(sub_indexes)
+        aqi_level = self._levels_array[np.searchsorted(self._limits_array, overall_aqi, side="left")]
+        return overall_aqi, aqi_level
+
+
+DEFAULT_CALCULATOR = AqiCalculator()
+
+
 def calculate_aqi(pm25, no2, co2):
-    pm25_breakpoints = [
-        (0, 12, 0, 50),
-        (12.1, 35.4, 51, 100),
-        (35.5, 55.4, 101, 150),
-        (55.5, 150.4, 151, 200),
-        (150.5, 250.4, 201, 300),
-        (250.5, 500.4, 301, 500),
-    ]
-
-    no2_breakpoints = [
-        (0, 53, 0, 50),
-        (54, 100, 51, 100),
-        (101, 360, 101, 150),
-        (361, 649, 151, 200),
-        (650, 1249, 201, 300),
-        (1250, 2049, 301, 500),
-    ]
-
-    co2_breakpoints = [
-        (0, 5, 0, 50),
-        (5.1, 15, 51, 100),
-        (15.1, 30, 101, 150),
-        (30.1, 60, 151, 200),
-        (60.1, 100, 201, 300),
-        (100.1, 200, 301, 500),
-    ]
-
-    def calculate_sub_index(value, breakpoints):
-        for lower, upper, aqi_lower, aqi_upper in breakpoints:
-            if lower <= value <= upper:
-                return aqi_lower + (value - lower) * (aqi_upper - aqi_lower) / (upper - lower)
-        return 500
-
-    pm25_aqi = calculate_sub_index(pm25, pm25_breakpoints)
-    no2_aqi = calculate_sub_index(no2, no2_breakpoints)
-    co2_aqi = calculate_sub_index(co2, co2_breakpoints)
-
-    overall_aqi = max(min(pm25_aqi, 500), 0, min(no2_aqi, 500), 0, min(co2_aqi, 500), 0)
-
-    aqi_thresholds = [
-        (50, "Good"),
-        (100, "Moderate"),
-        (150, "Unhealthy for Sensitive Groups"),
-        (200, "Unhealthy"),
-        (300, "Very Unhealthy"),
-        (500, "Hazardous")
-    ]
-
-    aqi_level = next(level for threshold, level in aqi_thresholds if overall_aqi <= threshold)
-
-    return overall_aqi, aqi_level
+    return DEFAULT_CALCULATOR.calculate(pm25, no2, co2)
+
+
+def calculate_aqi_batch(pm25, no2, co2):
+    """Vectorized calculate_aqi over whole columns.
+
+    Accepts array-likes (NumPy arrays, pandas Series, lists) of equal length and
+    returns an (aqi, aqi_level) pair of NumPy arrays that matches calling
+    calculate_aqi row by row, including the 500 fallback for values that fall
+    outside (or between) the breakpoint ranges.
+    """
+    return DEFAULT_CALCULATOR.calculate_batch(pm25, no2, co2)
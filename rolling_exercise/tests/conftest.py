@@ -1,25 +1,39 @@
 import asyncio
+import os
 import pytest
 import pytest_asyncio
 from dotenv import load_dotenv
 from httpx import ASGITransport, AsyncClient
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
 from sqlalchemy import text
 
 load_dotenv(".env.test", override=True)
+# Read routes go through their own engine; point it at the same database so both paths are exercised.
+os.environ.setdefault("READ_DATABASE_URL", os.environ["DATABASE_URL"])
 
 from app.constants.config import settings
-from app.db.session import Base
+from app.core.cache import invalidate_read_caches
+from app.db.migrations import init_db
+from app.db.session import Base, build_engine
 from app.main import app as fastapi_app
 
 
 
 @pytest_asyncio.fixture(scope="session")
 async def test_engine():
-    engine = create_async_engine(settings.database_url, pool_pre_ping=True)
+    engine = build_engine(settings.database_url)
 
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await init_db(conn)
+
+    yield engine
+
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture(scope="session")
+async def test_read_engine(test_engine):
+    engine = build_engine(settings.read_database_url)
 
     yield engine
 
@@ -37,21 +51,29 @@ async def db_session(test_engine) :
 @pytest_asyncio.fixture(autouse=True)
 async def clean_db(test_engine):
     async with test_engine.begin() as conn:
-        await conn.execute(text("TRUNCATE TABLE air_quality_measurements RESTART IDENTITY;"))
+        tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+        await conn.execute(text(f"TRUNCATE TABLE {tables} RESTART IDENTITY;"))
+    await invalidate_read_caches()
     yield
 
 
 @pytest_asyncio.fixture
-async def client(test_engine):
-    from app.db.session import get_db
+async def client(test_engine, test_read_engine):
+    from app.db.session import get_db, get_read_db
 
     SessionLocal = async_sessionmaker(bind=test_engine, expire_on_commit=False)
+    ReadSessionLocal = async_sessionmaker(bind=test_read_engine, expire_on_commit=False)
 
     async def override_get_db():
         async with SessionLocal() as session:
             yield session
 
+    async def override_get_read_db():
+        async with ReadSessionLocal() as session:
+            yield session
+
     fastapi_app.dependency_overrides[get_db] = override_get_db
+    fastapi_app.dependency_overrides[get_read_db] = override_get_read_db
 
     transport = ASGITransport(app=fastapi_app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
@@ -0,0 +1,140 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+from calculate_aqi import AQI_STANDARD_EU_CAQI, AQI_STANDARDS, AqiCalculator, calculate_aqi, calculate_aqi_batch
+from app.services.aqi_service import load_aqi_calculator, load_aqi_standards
+
+# Includes range boundaries, the gaps between ranges (e.g. 12.05), negatives and
+# out-of-range values that all hit the 500 fallback.
+PM25_VALUES = [0, 5, 12, 12.05, 12.1, 35.4, 35.45, 55.5, 150.4, 250.5, 500.4, 500.5, 1000, -1]
+NO2_VALUES = [0, 20, 53, 53.5, 54, 100, 100.5, 360, 649, 1249, 2049, 2050, -3]
+CO2_VALUES = [0, 3, 5, 5.05, 5.1, 15, 30.05, 60, 100.1, 200, 200.1, 400, -0.5]
+
+
+def _reference_calculate_aqi(pm25, no2, co2):
+    # The original per-call implementation, kept to pin results.
+    pm25_breakpoints = [
+        (0, 12, 0, 50), (12.1, 35.4, 51, 100), (35.5, 55.4, 101, 150),
+        (55.5, 150.4, 151, 200), (150.5, 250.4, 201, 300), (250.5, 500.4, 301, 500),
+    ]
+    no2_breakpoints = [
+        (0, 53, 0, 50), (54, 100, 51, 100), (101, 360, 101, 150),
+        (361, 649, 151, 200), (650, 1249, 201, 300), (1250, 2049, 301, 500),
+    ]
+    co2_breakpoints = [
+        (0, 5, 0, 50), (5.1, 15, 51, 100), (15.1, 30, 101, 150),
+        (30.1, 60, 151, 200), (60.1, 100, 201, 300), (100.1, 200, 301, 500),
+    ]
+
+    def calculate_sub_index(value, breakpoints):
+        for lower, upper, aqi_lower, aqi_upper in breakpoints:
+            if lower <= value <= upper:
+                return aqi_lower + (value - lower) * (aqi_upper - aqi_lower) / (upper - lower)
+        return 500
+
+    pm25_aqi = calculate_sub_index(pm25, pm25_breakpoints)
+    no2_aqi = calculate_sub_index(no2, no2_breakpoints)
+    co2_aqi = calculate_sub_index(co2, co2_breakpoints)
+    overall_aqi = max(min(pm25_aqi, 500), 0, min(no2_aqi, 500), 0, min(co2_aqi, 500), 0)
+    aqi_thresholds = [
+        (50, "Good"), (100, "Moderate"), (150, "Unhealthy for Sensitive Groups"),
+        (200, "Unhealthy"), (300, "Very Unhealthy"), (500, "Hazardous"),
+    ]
+    aqi_level = next(level for threshold, level in aqi_thresholds if overall_aqi <= threshold)
+    return overall_aqi, aqi_level
+
+
+def test_scalar_matches_reference_implementation():
+    grid = np.array(np.meshgrid(PM25_VALUES, NO2_VALUES, CO2_VALUES)).reshape(3, -1).T.tolist()
+    rng = np.random.default_rng(1)
+    random = np.column_stack([rng.uniform(-10, 600, 2000), rng.uniform(-10, 2200, 2000), rng.uniform(-10, 300, 2000)]).tolist()
+
+    for pm25, no2, co2 in grid + random + [[math.nan, 1.0, 1.0]]:
+        assert calculate_aqi(pm25, no2, co2) == _reference_calculate_aqi(pm25, no2, co2)
+
+
+def test_batch_matches_scalar_on_breakpoint_grid():
+    grid = np.array(np.meshgrid(PM25_VALUES, NO2_VALUES, CO2_VALUES)).reshape(3, -1)
+
+    aqi, aqi_level = calculate_aqi_batch(grid[0], grid[1], grid[2])
+
+    for i, (pm25, no2, co2) in enumerate(grid.T.tolist()):
+        expected_aqi, expected_level = calculate_aqi(pm25, no2, co2)
+        assert aqi[i] == expected_aqi
+        assert aqi_level[i] == expected_level
+
+
+def test_batch_matches_scalar_on_random_values():
+    rng = np.random.default_rng(0)
+    pm25 = rng.uniform(-10, 600, 5000).round(1)
+    no2 = rng.uniform(-10, 2200, 5000).round(0)
+    co2 = rng.uniform(-10, 2000, 5000).round(0)
+
+    aqi, aqi_level = calculate_aqi_batch(pm25, no2, co2)
+
+    for i in range(len(pm25)):
+        expected_aqi, expected_level = calculate_aqi(pm25[i], no2[i], co2[i])
+        assert aqi[i] == expected_aqi
+        assert aqi_level[i] == expected_level
+
+
+def test_batch_treats_nan_as_out_of_range():
+    aqi, aqi_level = calculate_aqi_batch([math.nan], [1.0], [1.0])
+
+    assert aqi.tolist() == [500]
+    assert aqi_level.tolist() == ["Hazardous"]
+
+
+def test_batch_handles_empty_columns():
+    aqi, aqi_level = calculate_aqi_batch([], [], [])
+
+    assert len(aqi) == 0
+    assert len(aqi_level) == 0
+
+
+def test_calculator_from_config_and_validation(tmp_path):
+    config = {"pm25": [[0, 10, 0, 100], [10.1, 100, 101, 500]], "levels": [[100, "Fine"], [500, "Bad"]]}
+    path = tmp_path / "aqi.json"
+    path.write_text(json.dumps(config))
+
+    calculator = load_aqi_calculator(str(path))
+
+    assert calculator.calculate(5, 0, 0) == (50.0, "Fine")
+    assert calculator.calculate(50, 0, 0)[1] == "Bad"
+    aqi, levels = calculator.calculate_batch([5, 50], [0, 0], [0, 0])
+    assert aqi[0] == 50.0 and levels.tolist() == ["Fine", "Bad"]
+
+    with pytest.raises(ValueError):
+        AqiCalculator(pm25=[(0, 12, 0, 50), (10, 20, 51, 100)])
+    with pytest.raises(ValueError):
+        AqiCalculator(thresholds=[(100, "Fine"), (50, "Good")])
+
+
+def test_eu_caqi_standard():
+    caqi = AqiCalculator.from_config(AQI_STANDARDS[AQI_STANDARD_EU_CAQI])
+
+    assert caqi.calculate(10, 20, 1) == (pytest.approx(10 / 15 * 25), "Very low")
+    # Ranges share their boundaries: 30 ug/m3 PM2.5 starts the "Medium" range at exactly 50.
+    assert caqi.calculate(30, 0, 0) == (50.0, "Low")
+    assert caqi.calculate(0, 150, 0) == (62.5, "Medium")
+    assert caqi.calculate(0, 0, 30)[1] == "Very high"
+
+    values = np.array([0, 15, 29.9, 30, 55, 109, 110, 600, -1], dtype=np.float64)
+    zeros = np.zeros_like(values)
+    aqi, levels = caqi.calculate_batch(values, zeros, zeros)
+    assert list(zip(aqi.tolist(), levels.tolist())) == [caqi.calculate(value, 0.0, 0.0) for value in values.tolist()]
+
+
+def test_standards_registry_from_json(tmp_path):
+    path = tmp_path / "standards.json"
+    path.write_text(json.dumps({"local": {"pm25": [[0, 10, 0, 100], [10, 500, 100, 500]], "levels": [[100, "Fine"], [500, "Bad"]]}}))
+
+    standards = load_aqi_standards(str(path), cache_size=0)
+
+    assert set(standards) == {*AQI_STANDARDS, "local"}
+    assert standards["local"].calculate(10, 0, 0) == (100.0, "Fine")
+    assert standards["epa"].calculate(10, 20, 4) == calculate_aqi(10, 20, 4)
+
@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import select
+
+from app.constants.config import settings
+from app.db.models import CityAqiStats
+from app.services.aqi_service import calculate_aqi_data
+from app.services.city_stats_service import rebuild_city_stats
+from app.services.upload_service import ingest_air_quality_csv
+
+CSV_FIRST = b"""date,city,PM2.5,NO2,CO2
+2024-11-19,Tel Aviv,10,20,4
+2024-11-20,Tel Aviv,30,40,4
+2024-11-20,Jerusalem,15,25,4
+"""
+
+CSV_SECOND = b"""date,city,PM2.5,NO2,CO2
+2024-11-18,Tel Aviv,100,20,4
+2024-11-21,Jerusalem,1,2,3
+"""
+
+
+async def _stats(db_session) -> dict[str, tuple]:
+    rows = (await db_session.execute(select(CityAqiStats))).scalars().all()
+    return {
+        row.city: (row.measurement_count, pytest.approx(row.aqi_sum), row.aqi_min, row.aqi_max, row.last_date)
+        for row in rows
+    }
+
+
+@pytest.mark.asyncio
+async def test_ingest_updates_city_stats_incrementally(db_session, monkeypatch):
+    monkeypatch.setattr(settings, "csv_chunk_rows", 2)
+
+    await ingest_air_quality_csv(file_content=CSV_FIRST, db=db_session)
+    await ingest_air_quality_csv(file_content=CSV_SECOND, db=db_session)
+
+    tel_aviv = [calculate_aqi_data(pm25, no2, 4).aqi for pm25, no2 in ((10, 20), (30, 40), (100, 20))]
+    stats = await _stats(db_session)
+    count, aqi_sum, aqi_min, aqi_max, last_date = stats["Tel Aviv"]
+    assert count == 3
+    assert aqi_sum == sum(tel_aviv)
+    assert (aqi_min, aqi_max) == (min(tel_aviv), max(tel_aviv))
+    assert str(last_date) == "2024-11-20"
+    assert stats["Jerusalem"][0] == 2
+
+    incremental = stats
+    await rebuild_city_stats(db_session)
+    db_session.expire_all()
+    assert await _stats(db_session) == incremental
@@ -0,0 +1,69 @@
+import re
+
+import pytest
+from sqlalchemy import text
+
+from app.constants.config import settings
+from app.db.pool import pool_status
+from app.db.session import build_engine
+
+
+@pytest.mark.asyncio
+async def test_pool_status_reports_checked_out_and_overflow(monkeypatch):
+    monkeypatch.setattr(settings, "db_pool_size", 1)
+    monkeypatch.setattr(settings, "db_max_overflow", 1)
+    monkeypatch.setattr(settings, "db_statement_cache_size", 0)
+    engine = build_engine(settings.database_url)
+
+    try:
+        async with engine.connect() as first, engine.connect() as second:
+            assert await first.scalar(text("SELECT 1")) == 1
+            assert await second.scalar(text("SELECT 1")) == 1
+            status = pool_status(engine)
+            assert status["pool_size"] == 1
+            assert status["checked_out"] == 2
+            assert status["overflow"] == 1
+
+        status = pool_status(engine)
+        assert status["checked_out"] == 0
+        assert status["checkouts"] == 2
+        assert status["wait_seconds_max"] >= status["wait_seconds_avg"] > 0
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_disabled_statement_cache_names_statements_uniquely(monkeypatch):
+    monkeypatch.setattr(settings, "db_statement_cache_size", 0)
+    engine = build_engine(settings.database_url)
+
+    try:
+        async with engine.connect() as conn:
+            for value in (1, 2):
+                assert await conn.scalar(text("SELECT CAST(:value AS INTEGER)"), {"value": value}) == value
+            driver = (await conn.get_raw_connection()).driver_connection
+            assert driver._config.statement_cache_size == 0
+            names = (await conn.scalars(text("SELECT name FROM pg_prepared_statements"))).all()
+            assert names and all(re.fullmatch(r"__asyncpg_[0-9a-f-]{36}__", name) for name in names)
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_pool_stats_endpoint(client):
+    resp = await client.get("/stats/pool")
+    assert resp.status_code == 200
+    stats = resp.json()
+    assert {"pool_size", "checked_out", "overflow", "wait_seconds_avg"} <= stats["primary"].keys()
+    assert stats["replica"] is not None
+
+
+@pytest.mark.asyncio
+async def test_read_routes_use_replica_session(client, test_read_engine):
+    resp = await client.post("/upload", files={"file": ("air.csv", b"date,city,PM2.5,NO2,CO2\n2024-11-19,Haifa,10,10,10\n", "text/csv")})
+    assert resp.status_code == 200
+
+    checkouts = test_read_engine.pool.wait_stats.checkouts
+    resp = await client.get("/history", params={"start_date": "2024-11-01", "end_date": "2024-11-30"})
+    assert len(resp.json()["items"]) == 1
+    assert test_read_engine.pool.wait_stats.checkouts == checkouts + 1
@@ -1,5 +1,9 @@
 import pytest
 
+from app.constants.config import settings
+from app.schemas.air_quality import AirQualityMeasurementOut, MeasurementPage
+from app.services.alerts_service import reflag_alerts, sync_alert_flags
+
 CSV_ALERTS = b"""date,city,PM2.5,NO2,CO2
 2024-11-19,Tel Aviv,1000,1000,5000
 2024-11-20,Tel Aviv,2,2,350
@@ -10,7 +14,7 @@ CSV_ALERTS = b"""date,city,PM2.5,NO2,CO2
 async def test_alerts_returns_list(client):
     resp = await client.get("/alerts")
     assert resp.status_code == 200
-    data = resp.json()
+    data = resp.json()["items"]
     assert isinstance(data, list)
 
 
@@ -21,8 +25,45 @@ async def test_alerts_by_city_returns_only_that_city(client):
 
     resp = await client.get("/alerts/city/Tel Aviv")
     assert resp.status_code == 200
-    data = resp.json()
+    data = resp.json()["items"]
 
     assert isinstance(data, list)
     for item in data:
         assert item["city"] == "Tel Aviv"
+
+
+@pytest.mark.asyncio
+async def test_alerts_come_from_flags_set_at_ingest_and_reflag(client, db_session, monkeypatch):
+    resp = await client.post("/upload", files={"file": ("air.csv", CSV_ALERTS, "text/csv")})
+    assert resp.status_code == 200
+
+    resp = await client.get("/alerts")
+    assert len(resp.json()["items"]) == 3
+
+    monkeypatch.setattr(settings, "alert_aqi_threshold", 500)
+    changed = await reflag_alerts(session=db_session, threshold=settings.alert_aqi_threshold)
+    assert changed == 3
+
+    resp = await client.get("/alerts")
+    assert resp.json()["items"] == []
+
+    await sync_alert_flags(session=db_session)
+    monkeypatch.setattr(settings, "alert_aqi_threshold", 300)
+    await sync_alert_flags(session=db_session)
+
+    resp = await client.get("/alerts")
+    assert len(resp.json()["items"]) == 3
+
+
+@pytest.mark.asyncio
+async def test_alerts_rows_serialize_like_the_measurement_schema(client):
+    await client.post("/upload", files={"file": ("air.csv", CSV_ALERTS, "text/csv")})
+
+    resp = await client.get("/alerts", params={"limit": 1})
+    assert resp.headers["content-type"] == "application/json"
+    body = resp.json()
+
+    assert MeasurementPage.model_validate(body).model_dump(mode="json") == body
+    assert list(body["items"][0]) == list(AirQualityMeasurementOut.model_fields)
+    assert body["items"][0]["date"] == "2024-11-19"
+    assert body["next_cursor"] is not None
@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+from sqlalchemy import select
+
+from calculate_aqi import AQI_STANDARD_EU_CAQI
+from app.constants.config import settings
+from app.db.models import AirQualityMeasurement, CityAqiStats
+from app.exceptions import AqiStandardConflictError
+from app.services.aqi_recompute_service import recompute_aqi
+from app.services.aqi_service import calculate_aqi_data, get_aqi_calculator
+
+CSV_CITIES = b"""date,city,PM2.5,NO2,CO2
+2024-11-19,Paris,10,20,4
+2024-11-20,Paris,30,150,8
+2024-11-19,Haifa,10,20,4
+"""
+
+
+async def _stored(db_session, city: str) -> list[tuple[float, str, bool]]:
+    rows = await db_session.execute(
+        select(AirQualityMeasurement.aqi, AirQualityMeasurement.aqi_level, AirQualityMeasurement.is_alert)
+        .where(AirQualityMeasurement.city == city)
+        .order_by(AirQualityMeasurement.date)
+    )
+    return [tuple(row) for row in rows]
+
+
+def _expected(standard: str | None, rows) -> list[tuple[float, str, bool]]:
+    results = (calculate_aqi_data(pm25, no2, co2, standard) for pm25, no2, co2 in rows)
+    return [(result.aqi, result.aqi_level, result.is_alert) for result in results]
+
+
+@pytest.mark.asyncio
+async def test_upload_uses_each_city_standard(client, db_session, monkeypatch):
+    monkeypatch.setattr(settings, "aqi_city_standards", {"Paris": AQI_STANDARD_EU_CAQI})
+
+    resp = await client.post("/upload", files={"file": ("air.csv", CSV_CITIES, "text/csv")})
+    assert resp.status_code == 200
+
+    assert await _stored(db_session, "Paris") == _expected(AQI_STANDARD_EU_CAQI, [(10, 20, 4), (30, 150, 8)])
+    assert await _stored(db_session, "Haifa") == _expected(None, [(10, 20, 4)])
+
+
+@pytest.mark.asyncio
+async def test_recompute_matches_vectorized_calculator(client, db_session, monkeypatch):
+    rng = np.random.default_rng(3)
+    # Breakpoint boundaries and out-of-range values on top of random ones.
+    pm25 = [*rng.uniform(0, 600, 200).tolist(), 0, 12, 15, 30, 55, 110, 500.4, 500.5]
+    no2 = [*rng.uniform(0, 2200, 200).tolist(), 0, 50, 53, 100, 200, 400, 2049, 2050]
+    co2 = [*rng.uniform(0, 250, 200).tolist(), 0, 5, 7.5, 10, 15, 20, 200, 201]
+    days = (np.datetime64("2024-01-01") + np.arange(len(pm25))).tolist()
+    lines = (
+        f"{day},{'Paris' if index % 2 else 'Haifa'},{a!r},{b!r},{c!r}"
+        for index, (day, a, b, c) in enumerate(zip(days, pm25, no2, co2))
+    )
+    csv = ("date,city,PM2.5,NO2,CO2\n" + "\n".join(lines)).encode()
+    resp = await client.post("/upload", files={"file": ("air.csv", csv, "text/csv")})
+    assert resp.status_code == 200
+    monkeypatch.setattr(settings, "aqi_city_standards", {"Paris": AQI_STANDARD_EU_CAQI, "Haifa": AQI_STANDARD_EU_CAQI})
+
+    changed = await recompute_aqi(db_session, standard=AQI_STANDARD_EU_CAQI, batch_rows=37)
+    assert changed == len(pm25)
+
+    rows = (await db_session.execute(
+        select(AirQualityMeasurement.pm25, AirQualityMeasurement.no2, AirQualityMeasurement.co2, AirQualityMeasurement.city,
+               AirQualityMeasurement.aqi, AirQualityMeasurement.aqi_level, AirQualityMeasurement.is_alert)
+        .order_by(AirQualityMeasurement.date)
+    )).all()
+    columns = np.array([row[:3] for row in rows], dtype=np.float64).T
+    aqi, aqi_level = get_aqi_calculator(AQI_STANDARD_EU_CAQI).calculate_batch(*columns)
+    assert [row.aqi for row in rows] == aqi.tolist()
+    assert [row.aqi_level for row in rows] == aqi_level.tolist()
+    assert [row.is_alert for row in rows] == (aqi > settings.alert_aqi_threshold).tolist()
+
+    stats = (await db_session.execute(select(CityAqiStats).where(CityAqiStats.city == "Haifa"))).scalar_one()
+    haifa = aqi[[row.city == "Haifa" for row in rows]]
+    assert stats.aqi_max == haifa.max()
+    assert stats.aqi_sum == pytest.approx(haifa.sum())
+
+    assert await recompute_aqi(db_session, standard=AQI_STANDARD_EU_CAQI) == 0
+
+
+@pytest.mark.asyncio
+async def test_recompute_follows_city_standards(client, db_session, monkeypatch):
+    resp = await client.post("/upload", files={"file": ("air.csv", CSV_CITIES, "text/csv")})
+    assert resp.status_code == 200
+    monkeypatch.setattr(settings, "aqi_city_standards", {"Paris": AQI_STANDARD_EU_CAQI})
+
+    changed = await recompute_aqi(db_session)
+
+    assert changed == 2
+    assert await _stored(db_session, "Paris") == _expected(AQI_STANDARD_EU_CAQI, [(10, 20, 4), (30, 150, 8)])
+    assert await _stored(db_session, "Haifa") == _expected(None, [(10, 20, 4)])
+
+    resp = await client.get("/cities/best", params={"limit": 2})
+    assert resp.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_recompute_standard_only_targets_cities_configured_with_it(client, db_session, monkeypatch):
+    resp = await client.post("/upload", files={"file": ("air.csv", CSV_CITIES, "text/csv")})
+    assert resp.status_code == 200
+    monkeypatch.setattr(settings, "aqi_city_standards", {"Paris": AQI_STANDARD_EU_CAQI})
+
+    with pytest.raises(AqiStandardConflictError):
+        await recompute_aqi(db_session, standard=AQI_STANDARD_EU_CAQI, cities=["Haifa"])
+
+    assert await recompute_aqi(db_session, standard=AQI_STANDARD_EU_CAQI) == 2
+    assert await _stored(db_session, "Haifa") == _expected(None, [(10, 20, 4)])
+    assert await recompute_aqi(db_session) == 0
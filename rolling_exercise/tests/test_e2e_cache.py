@@ -0,0 +1,154 @@
+import itertools
+
+import pytest
+
+from app.core import cache
+from app.core.cache import MemoryCacheBackend, SQLiteCacheBackend, TTLCache, cached, invalidate_read_caches
+
+CSV = b"""date,city,PM2.5,NO2,CO2
+2024-11-19,Tel Aviv,10,10,10
+2024-11-20,Haifa,20,20,20
+"""
+
+CSV_MORE = b"""date,city,PM2.5,NO2,CO2
+2024-11-21,Eilat,1,1,1
+"""
+
+
+@pytest.mark.asyncio
+async def test_read_results_are_cached_until_upload(client):
+    resp = await client.post("/upload", files={"file": ("air.csv", CSV, "text/csv")})
+    assert resp.status_code == 200
+
+    first = await client.get("/cities/best")
+    before = (await client.get("/stats/cache")).json()
+    second = await client.get("/cities/best")
+    after = (await client.get("/stats/cache")).json()
+
+    assert first.json() == second.json()
+    assert after["hits"] == before["hits"] + 1
+
+    resp = await client.post("/upload", files={"file": ("air.csv", CSV_MORE, "text/csv")})
+    assert resp.status_code == 200
+
+    cities = [row["city"] for row in (await client.get("/cities/best")).json()]
+    assert "Eilat" in cities
+
+
+@pytest.mark.asyncio
+async def test_etag_round_trip_returns_304(client):
+    await client.post("/upload", files={"file": ("air.csv", CSV, "text/csv")})
+
+    resp = await client.get("/cities/Haifa/average")
+    etag = resp.headers["etag"]
+
+    resp = await client.get("/cities/Haifa/average", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.headers["etag"] == etag
+
+    await client.post("/upload", files={"file": ("air.csv", b"date,city,PM2.5,NO2,CO2\n2024-11-22,Haifa,90,90,90\n", "text/csv")})
+    resp = await client.get("/cities/Haifa/average", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["etag"] != etag
+
+
+def test_ttl_cache_evicts_least_recently_used_and_expired(monkeypatch):
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a", None)
+    cache.set("c", 3)
+
+    assert cache.get("a", None) == 1
+    assert cache.get("c", None) == 3
+    assert cache.stats()["size"] == 2
+    assert cache.get("b", None) is None
+
+    monkeypatch.setattr("app.core.cache.time.monotonic", lambda: float("inf"))
+    assert cache.get("a", None) is None
+    assert (cache.hits, cache.misses) == (3, 2)
+
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    worker_a = SQLiteCacheBackend(path=path, maxsize=2, ttl=10)
+    worker_b = SQLiteCacheBackend(path=path, maxsize=2, ttl=10)
+
+    await worker_a.set(("fetch_best_cities", ("limit", 3)), [("Haifa", 12.5)])
+    assert await worker_b.get(("fetch_best_cities", ("limit", 3)), None) == [("Haifa", 12.5)]
+
+    await worker_b.set("b", 2)
+    await worker_b.set("c", 3)
+    assert (await worker_a.stats())["size"] == 2
+
+    await worker_b.clear()
+    assert await worker_a.get("c", None) is None
+    assert (worker_a.misses, worker_b.hits) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_evicts_least_recently_used(tmp_path, monkeypatch):
+    clock = itertools.count(1_000)
+    monkeypatch.setattr("app.core.cache.time.time", lambda: float(next(clock)))
+    backend = SQLiteCacheBackend(path=str(tmp_path / "cache.sqlite3"), maxsize=2, ttl=60)
+
+    await backend.set("a", 1)
+    await backend.set("b", 2)
+    assert await backend.get("a", None) == 1
+    await backend.set("c", 3)
+
+    assert await backend.get("b", None) is None
+    assert [await backend.get(key, None) for key in ("a", "c")] == [1, 3]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+async def test_read_overlapping_invalidation_is_not_cached(backend, tmp_path, monkeypatch):
+    if backend == "sqlite":
+        read_cache = SQLiteCacheBackend(path=str(tmp_path / "cache.sqlite3"), maxsize=16, ttl=30)
+    else:
+        read_cache = MemoryCacheBackend(maxsize=16, ttl=30)
+    monkeypatch.setattr(cache, "read_cache", read_cache)
+    calls = []
+
+    @cached("overlapping")
+    async def fetch(*, city: str) -> int:
+        calls.append(city)
+        if len(calls) == 1:
+            # An upload commits and invalidates while this read is still running.
+            await invalidate_read_caches()
+        return len(calls)
+
+    assert await fetch(city="Haifa") == 1
+    assert await fetch(city="Haifa") == 2
+    assert await fetch(city="Haifa") == 2
+    assert (await read_cache.stats())["size"] == 1
+
+
+@pytest.mark.asyncio
+async def test_replica_reads_are_cached_only_once_caught_up(client, db_session, monkeypatch):
+    await client.post("/upload", files={"file": ("air.csv", CSV, "text/csv")})
+    assert await cache.read_cache.replica_lsn() is not None
+    # The test database is a primary, which never lags.
+    assert await cache._replica_caught_up(db_session)
+
+    async def lagging(session):
+        return False
+
+    monkeypatch.setattr(cache, "_replica_caught_up", lagging)
+    await client.get("/cities/best")
+    assert (await client.get("/stats/cache")).json()["size"] == 0
+
+
+@pytest.mark.asyncio
+async def test_upload_invalidates_shared_backend(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "read_cache", SQLiteCacheBackend(path=str(tmp_path / "cache.sqlite3"), maxsize=16, ttl=30))
+    await client.post("/upload", files={"file": ("air.csv", CSV, "text/csv")})
+
+    assert len((await client.get("/cities/best")).json()) == 2
+    assert (await client.get("/stats/cache")).json()["size"] == 1
+
+    await client.post("/upload", files={"file": ("air.csv", CSV_MORE, "text/csv")})
+    assert (await client.get("/stats/cache")).json()["size"] == 0
+    assert len((await client.get("/cities/best")).json()) == 3
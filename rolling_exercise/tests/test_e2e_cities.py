@@ -1,5 +1,7 @@
 import pytest
+from sqlalchemy import text
 
+from app.core.cache import invalidate_read_caches
 from app.services.aqi_service import calculate_aqi_data
 
 CSV_MIX = b"""date,city,PM2.5,NO2,CO2
@@ -14,6 +16,21 @@ async def test_city_unknown_returns_404(client):
     assert resp.status_code == 404
 
 
+@pytest.mark.asyncio
+async def test_city_rows_with_nan_values_are_returned_as_null(client, db_session):
+    resp = await client.post("/upload", files={"file": ("air.csv", CSV_MIX, "text/csv")})
+    assert resp.status_code == 200
+    # A stored NaN, as an empty pollutant cell leaves behind.
+    await db_session.execute(text("UPDATE air_quality_measurements SET pm25 = 'NaN' WHERE city = 'Jerusalem'"))
+    await db_session.commit()
+    await invalidate_read_caches()
+
+    resp = await client.get("/cities/Jerusalem")
+
+    assert resp.status_code == 200
+    assert resp.json()["items"][0]["pm25"] is None
+
+
 @pytest.mark.asyncio
 async def test_city_average_matches_expected(client):
     resp = await client.post("/upload", files={"file": ("air.csv", CSV_MIX, "text/csv")})
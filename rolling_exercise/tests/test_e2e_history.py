@@ -19,7 +19,7 @@ async def test_history_filters_by_date_range(client):
 
     resp = await client.get("/history", params={"start_date": "2024-11-01", "end_date": "2024-11-30"})
     assert resp.status_code == 200
-    data = resp.json()
+    data = resp.json()["items"]
 
     dates = [row["date"] for row in data]
     assert "2024-11-01" in dates
@@ -0,0 +1,58 @@
+import csv
+import io
+import json
+
+import pytest
+
+from app.constants.config import settings
+
+CSV_HISTORY = b"""date,city,PM2.5,NO2,CO2
+2024-11-02,Tel Aviv,30,40,4
+2024-11-01,Tel Aviv,10,20,4
+2024-11-10,Haifa,15,25,4
+2024-12-01,Jerusalem,15,25,4
+"""
+
+EXPORT_RANGE = {"start_date": "2024-11-01", "end_date": "2024-11-30"}
+
+
+@pytest.mark.asyncio
+async def test_export_streams_ndjson_by_default(client, monkeypatch):
+    monkeypatch.setattr(settings, "export_batch_rows", 2)
+    resp = await client.post("/upload", files={"file": ("air.csv", CSV_HISTORY, "text/csv")})
+    assert resp.status_code == 200
+
+    resp = await client.get("/history/export", params=EXPORT_RANGE)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+
+    rows = [json.loads(line) for line in resp.text.splitlines()]
+    assert [(row["date"], row["city"]) for row in rows] == [
+        ("2024-11-01", "Tel Aviv"),
+        ("2024-11-02", "Tel Aviv"),
+        ("2024-11-10", "Haifa"),
+    ]
+    assert set(rows[0]) == {"date", "city", "pm25", "no2", "co2", "aqi", "aqi_level"}
+
+
+@pytest.mark.asyncio
+async def test_export_csv_can_be_reuploaded(client):
+    resp = await client.post("/upload", files={"file": ("air.csv", CSV_HISTORY, "text/csv")})
+    assert resp.status_code == 200
+
+    resp = await client.get("/history/export", params=EXPORT_RANGE, headers={"Accept": "text/csv"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/csv")
+
+    rows = list(csv.DictReader(io.StringIO(resp.text)))
+    assert len(rows) == 3
+    assert rows[0]["PM2.5"] == "10.0"
+
+    resp = await client.post("/upload", files={"file": ("export.csv", resp.content, "text/csv")})
+    assert resp.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_export_rejects_inverted_range(client):
+    resp = await client.get("/history/export", params={"start_date": "2024-12-10", "end_date": "2024-12-01"})
+    assert resp.status_code == 400
@@ -0,0 +1,74 @@
+import pytest
+
+from app.core.metrics import Counter, Histogram, REGISTRY, db_query_duration, http_request_duration, ingest_stage_duration
+
+CSV = b"""date,city,PM2.5,NO2,CO2
+2024-11-19,Tel Aviv,10,10,10
+2024-11-20,Haifa,20,20,20
+"""
+
+
+@pytest.mark.asyncio
+async def test_metrics_record_routes_queries_and_ingest_stages(client):
+    route_count = http_request_duration.count(method="GET", route="/cities/{city}", status="200")
+    select_count = db_query_duration.count(operation="SELECT")
+    stage_counts = {stage: ingest_stage_duration.count(stage=stage) for stage in ("read", "parse", "aqi", "write")}
+
+    resp = await client.post("/upload", files={"file": ("air.csv", CSV, "text/csv")})
+    assert resp.status_code == 200
+    assert (await client.get("/cities/Haifa")).status_code == 200
+    assert (await client.get("/cities/Haifa")).status_code == 200
+
+    assert http_request_duration.count(method="GET", route="/cities/{city}", status="200") == route_count + 2
+    assert db_query_duration.count(operation="SELECT") > select_count
+    for stage, count in stage_counts.items():
+        assert ingest_stage_duration.count(stage=stage) > count
+
+    resp = await client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = resp.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/cities/{city}",status="200"}' in body
+    assert 'db_query_duration_seconds_bucket{operation="INSERT",le="+Inf"}' in body
+    assert 'ingest_stage_duration_seconds_sum{stage="aqi"}' in body
+
+
+@pytest.mark.asyncio
+async def test_multi_file_upload_records_the_aqi_stage(client):
+    before = ingest_stage_duration.count(stage="aqi")
+    files = [("file", ("a.csv", CSV, "text/csv")), ("file", ("b.csv", CSV.replace(b"2024-11", b"2024-12"), "text/csv"))]
+
+    resp = await client.post("/upload", files=files)
+
+    assert resp.status_code == 200
+    assert ingest_stage_duration.count(stage="aqi") == before + 2
+
+
+@pytest.mark.asyncio
+async def test_unmatched_paths_share_one_series(client):
+    before = http_request_duration.count(method="GET", route="unmatched", status="404")
+
+    await client.get("/no-such-path/1")
+    await client.get("/no-such-path/2")
+
+    assert http_request_duration.count(method="GET", route="unmatched", status="404") == before + 2
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_latency_seconds", "test", ("kind",), buckets=(0.1, 1.0))
+    counter = Counter("test_rows_total", "test", ("kind",))
+    try:
+        histogram.observe(0.05, kind="a")
+        histogram.observe(0.5, kind="a")
+        histogram.observe(5.0, kind="a")
+        counter.inc(3, kind='quote"d')
+
+        lines = histogram.render().splitlines()
+        assert 'test_latency_seconds_bucket{kind="a",le="0.1"} 1' in lines
+        assert 'test_latency_seconds_bucket{kind="a",le="1.0"} 2' in lines
+        assert 'test_latency_seconds_bucket{kind="a",le="+Inf"} 3' in lines
+        assert 'test_latency_seconds_count{kind="a"} 3' in lines
+        assert 'test_rows_total{kind="quote\\"d"} 3.0' in counter.render().splitlines()
+    finally:
+        REGISTRY.remove(histogram)
+        REGISTRY.remove(counter)
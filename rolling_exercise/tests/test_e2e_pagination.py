@@ -0,0 +1,58 @@
+import pytest
+
+CSV_PAGES = b"""date,city,PM2.5,NO2,CO2
+2024-11-03,Haifa,1,1,1
+2024-11-01,Haifa,2,2,2
+2024-11-02,Haifa,3,3,3
+2024-11-01,Eilat,4,4,4
+2024-11-02,Eilat,5,5,5
+"""
+
+
+async def _collect(client, path: str, params: dict) -> list[list[dict]]:
+    pages = []
+    cursor = None
+    while True:
+        resp = await client.get(path, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert resp.status_code == 200
+        body = resp.json()
+        pages.append(body["items"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("path", "params", "expected"),
+    [
+        ("/cities/Haifa", {}, [("2024-11-01", 2), ("2024-11-02", 3), ("2024-11-03", 1)]),
+        (
+            # Dates tie across cities, so pages must break ties on id.
+            "/history",
+            {"start_date": "2024-11-01", "end_date": "2024-11-30"},
+            [("2024-11-01", 2), ("2024-11-01", 4), ("2024-11-02", 3), ("2024-11-02", 5), ("2024-11-03", 1)],
+        ),
+    ],
+)
+async def test_keyset_pages_cover_all_rows_in_date_order(client, path, params, expected):
+    resp = await client.post("/upload", files={"file": ("air.csv", CSV_PAGES, "text/csv")})
+    assert resp.status_code == 200
+
+    pages = await _collect(client, path, {**params, "limit": 2})
+
+    assert all(len(page) == 2 for page in pages[:-1])
+    rows = [row for page in pages for row in page]
+    assert [(row["date"], row["pm25"]) for row in rows] == expected
+
+
+@pytest.mark.asyncio
+async def test_invalid_cursor_returns_400(client):
+    resp = await client.get("/alerts", params={"cursor": "not-a-cursor"})
+    assert resp.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_limit_above_maximum_is_rejected(client):
+    resp = await client.get("/alerts", params={"limit": 1_000_000})
+    assert resp.status_code == 422
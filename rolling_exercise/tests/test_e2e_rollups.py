@@ -0,0 +1,85 @@
+import pytest
+from sqlalchemy import select
+
+from app.db.models import CityAqiDailyRollup, CityAqiMonthlyRollup
+from app.services.aqi_service import calculate_aqi_data
+from app.services.rollup_service import rebuild_rollups
+
+CSV_ROLLUP = b"""date,city,PM2.5,NO2,CO2
+2024-10-31,Haifa,5,5,1
+2024-11-01,Haifa,10,20,4
+2024-11-02,Haifa,30,40,4
+2024-11-15,Haifa,100,20,4
+2024-11-15,Eilat,1,1,1
+"""
+
+
+def _aqi(pm25, no2, co2) -> float:
+    return calculate_aqi_data(pm25=pm25, no2=no2, co2=co2).aqi
+
+
+@pytest.mark.asyncio
+async def test_daily_rollup_returns_average_and_max_per_day(client):
+    resp = await client.post("/upload", files={"file": ("air.csv", CSV_ROLLUP, "text/csv")})
+    assert resp.status_code == 200
+
+    resp = await client.get("/cities/Haifa/rollup", params={"granularity": "day", "start_date": "2024-11-01"})
+    assert resp.status_code == 200
+    data = resp.json()
+
+    assert [row["period"] for row in data] == ["2024-11-01", "2024-11-02", "2024-11-15"]
+    assert data[1]["measurement_count"] == 1
+    assert data[1]["average_aqi"] == pytest.approx(_aqi(30, 40, 4))
+    assert data[1]["max_aqi"] == _aqi(30, 40, 4)
+
+
+@pytest.mark.asyncio
+async def test_monthly_rollup_groups_by_month(client):
+    resp = await client.post("/upload", files={"file": ("air.csv", CSV_ROLLUP, "text/csv")})
+    assert resp.status_code == 200
+
+    resp = await client.get(
+        "/cities/Haifa/rollup",
+        params={"granularity": "month", "start_date": "2024-10-15", "end_date": "2024-11-30"},
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+
+    assert [(row["period"], row["measurement_count"]) for row in data] == [("2024-10-01", 1), ("2024-11-01", 3)]
+    assert data[1]["max_aqi"] == _aqi(100, 20, 4)
+
+
+@pytest.mark.asyncio
+async def test_rollup_rejects_bad_parameters(client):
+    resp = await client.get("/cities/Haifa/rollup", params={"granularity": "week"})
+    assert resp.status_code == 422
+
+    resp = await client.get("/cities/Haifa/rollup", params={"start_date": "2024-12-01", "end_date": "2024-11-01"})
+    assert resp.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_rebuild_rollups_matches_incremental(client, db_session):
+    # The second upload replaces stored rows in two months, so their rollups are recomputed rather than added to.
+    replacement = (
+        CSV_ROLLUP.replace(b"2024-11-02,Haifa,30,40,4", b"2024-11-02,Haifa,1,1,1")
+        .replace(b"Eilat,1,1,1", b"Eilat,9,9,9")
+        .replace(b"2024-10-31,Haifa,5,5,1", b"2024-10-31,Haifa,7,7,7")
+    )
+    for csv in (CSV_ROLLUP, replacement):
+        resp = await client.post("/upload", files={"file": ("air.csv", csv, "text/csv")})
+        assert resp.status_code == 200
+
+    async def snapshot():
+        rows = {}
+        for model in (CityAqiDailyRollup, CityAqiMonthlyRollup):
+            for row in (await db_session.execute(select(model))).scalars():
+                rows[(model.__tablename__, row.city, row.period)] = (
+                    row.measurement_count, pytest.approx(row.aqi_sum), row.aqi_min, row.aqi_max,
+                )
+        return rows
+
+    incremental = await snapshot()
+    await rebuild_rollups(db_session)
+    db_session.expire_all()
+    assert await snapshot() == incremental
@@ -1,4 +1,23 @@
+import sys
+
+import numpy as np
 import pytest
+from sqlalchemy import select
+
+from app.constants.config import settings
+from app.constants.csv_constants import (
+    CITY_TOO_LONG_ERROR,
+    CSV_MISSING_COLUMNS_ERROR,
+    EMPTY_CITY_ERROR,
+    INVALID_CSV_FILE_ERROR,
+    INVALID_VALUES_ERROR,
+)
+from app.constants.ingest_constants import DUPLICATE_MEASUREMENTS_ERROR
+from app.constants.upload_format_constants import COLUMNAR_UNSUPPORTED_ERROR
+from app.db.models import AirQualityMeasurement
+from app.services.aqi_service import calculate_aqi_data
+from app.services.csv_service import parse_air_quality_csv
+from app.services.upload_service import ingest_air_quality_csv
 
 CSV_OK = b"""date,city,PM2.5,NO2,CO2
 2024-11-19,Tel Aviv,10,20,400
@@ -14,7 +33,144 @@ async def test_upload_then_city_endpoint_returns_rows(client):
     resp = await client.get("/cities/Tel Aviv")
     assert resp.status_code == 200
 
-    data = resp.json()  
+    data = resp.json()["items"]
     assert isinstance(data, list)
     assert len(data)
     assert all(row["city"]=="Tel Aviv" for row in data)  
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["orm", "bulk", "upsert"])
+async def test_ingest_modes_store_same_rows(db_session, mode):
+    result = await ingest_air_quality_csv(file_content=CSV_OK, db=db_session, mode=mode)
+    assert result.mode == mode
+    assert result.rows_inserted == 3
+    assert result.rows_per_second > 0
+
+    rows = (await db_session.execute(select(AirQualityMeasurement).order_by(AirQualityMeasurement.id))).scalars().all()
+    assert [(row.city, row.pm25) for row in rows] == [("Tel Aviv", 10), ("Tel Aviv", 30), ("Jerusalem", 15)]
+    assert rows[0].aqi == calculate_aqi_data(pm25=10, no2=20, co2=400).aqi
+
+
+@pytest.mark.asyncio
+async def test_upload_streams_file_in_chunks(client, monkeypatch):
+    monkeypatch.setattr(settings, "csv_chunk_rows", 2)
+    csv = b"date,city,PM2.5,NO2,CO2\n" + b"".join(b"2024-11-%02d,Haifa,10,20,400\n" % day for day in range(1, 8))
+
+    resp = await client.post("/upload", files={"file": ("air.csv", csv, "text/csv")})
+    assert resp.status_code == 200
+
+    resp = await client.get("/cities/Haifa")
+    assert len(resp.json()["items"]) == 7
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("csv", "detail"),
+    [
+        (b"", INVALID_CSV_FILE_ERROR),
+        (b"date,city,PM2.5\n2024-11-19,Haifa,10\n", CSV_MISSING_COLUMNS_ERROR),
+        (CSV_OK + b"2024-11-21,Haifa,not-a-number,20,400\n", INVALID_VALUES_ERROR),
+        (CSV_OK + b"2024-11-21, ,10,20,400\n", EMPTY_CITY_ERROR),
+        (CSV_OK + b"2024-11-21," + b"x" * 101 + b",10,20,400\n", CITY_TOO_LONG_ERROR),
+        (CSV_OK + b",Haifa,10,20,400\n", INVALID_VALUES_ERROR),
+    ],
+)
+async def test_upload_invalid_chunk_returns_400_and_rolls_back(client, monkeypatch, csv, detail):
+    monkeypatch.setattr(settings, "csv_chunk_rows", 2)
+
+    resp = await client.post("/upload", files={"file": ("air.csv", csv, "text/csv")})
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == detail
+
+    resp = await client.get("/cities/Tel Aviv")
+    assert resp.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_upsert_reupload_is_idempotent_and_reports_counts(client):
+    resp = await client.post("/upload", files={"file": ("air.csv", CSV_OK, "text/csv")})
+    assert resp.json()["rows_inserted"] == 3
+
+    resp = await client.post("/upload", files={"file": ("air.csv", CSV_OK, "text/csv")})
+    assert resp.status_code == 200
+    assert {key: resp.json()[key] for key in ("rows_inserted", "rows_updated", "rows_skipped")} == {
+        "rows_inserted": 0, "rows_updated": 0, "rows_skipped": 3,
+    }
+
+    # One stored row changes, one new row arrives twice in the file (the identical copy is skipped).
+    csv = CSV_OK.replace(b"2024-11-20,Jerusalem,15,25,410", b"2024-11-20,Jerusalem,150,25,410")
+    csv += b"2024-11-21,Jerusalem,2,2,2\n2024-11-21,Jerusalem,2,2,2\n"
+    resp = await client.post("/upload", files={"file": ("air.csv", csv, "text/csv")})
+    assert {key: resp.json()[key] for key in ("rows_inserted", "rows_updated", "rows_skipped")} == {
+        "rows_inserted": 1, "rows_updated": 1, "rows_skipped": 3,
+    }
+
+    rows = (await client.get("/cities/Jerusalem")).json()["items"]
+    assert [(row["date"], row["pm25"]) for row in rows] == [("2024-11-20", 150), ("2024-11-21", 2)]
+
+    expected = (calculate_aqi_data(pm25=150, no2=25, co2=410).aqi + calculate_aqi_data(pm25=2, no2=2, co2=2).aqi) / 2
+    resp = await client.get("/cities/Jerusalem/average")
+    assert resp.json()["average_aqi"] == pytest.approx(expected)
+
+
+@pytest.mark.asyncio
+async def test_repeated_rows_are_deduplicated_across_chunks(client, monkeypatch):
+    monkeypatch.setattr(settings, "csv_chunk_rows", 2)
+    csv = CSV_OK + b"2024-11-19,Tel Aviv,10,20,400\n2024-11-20,Jerusalem,15,25,410\n"
+
+    resp = await client.post("/upload", files={"file": ("air.csv", csv, "text/csv")})
+
+    assert resp.status_code == 200
+    assert {key: resp.json()[key] for key in ("rows_inserted", "rows_updated", "rows_skipped")} == {
+        "rows_inserted": 3, "rows_updated": 0, "rows_skipped": 2,
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chunk_rows", [2, 50_000])
+async def test_last_row_wins_for_a_repeated_key(client, monkeypatch, chunk_rows):
+    monkeypatch.setattr(settings, "csv_chunk_rows", chunk_rows)
+    csv = CSV_OK + b"2024-11-19,Tel Aviv,11,20,400\n"
+
+    resp = await client.post("/upload", files={"file": ("air.csv", csv, "text/csv")})
+
+    assert resp.status_code == 200
+    # In one chunk the earlier copy is dropped up front; in a later chunk the repeat updates the stored row.
+    expected = {"rows_inserted": 3, "rows_updated": 0, "rows_skipped": 1} if chunk_rows > 4 else {
+        "rows_inserted": 3, "rows_updated": 1, "rows_skipped": 0,
+    }
+    assert {key: resp.json()[key] for key in ("rows_inserted", "rows_updated", "rows_skipped")} == expected
+    rows = (await client.get("/cities/Tel Aviv")).json()["items"]
+    assert [(row["date"], row["pm25"]) for row in rows] == [("2024-11-19", 11), ("2024-11-20", 30)]
+
+
+@pytest.mark.asyncio
+async def test_bulk_reupload_conflicts(client, monkeypatch):
+    monkeypatch.setattr(settings, "ingest_mode", "bulk")
+    resp = await client.post("/upload", files={"file": ("air.csv", CSV_OK, "text/csv")})
+    assert resp.status_code == 200
+
+    resp = await client.post("/upload", files={"file": ("air.csv", CSV_OK, "text/csv")})
+    assert resp.status_code == 409
+    assert resp.json()["detail"] == DUPLICATE_MEASUREMENTS_ERROR
+
+
+def test_parse_returns_typed_columns():
+    columns = parse_air_quality_csv(CSV_OK)
+
+    assert len(columns) == 3
+    assert columns.date.dtype == np.dtype("datetime64[D]")
+    assert columns.city.tolist() == ["Tel Aviv", "Tel Aviv", "Jerusalem"]
+    assert columns.pm25.dtype == np.float64
+    assert columns.co2.tolist() == [400.0, 420.0, 410.0]
+
+
+@pytest.mark.asyncio
+async def test_columnar_upload_without_pyarrow_is_rejected(client, monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+
+    resp = await client.post("/upload", files={"file": ("air.parquet", b"PAR1\x00\x00\x00\x00", "application/octet-stream")})
+
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == COLUMNAR_UNSUPPORTED_ERROR
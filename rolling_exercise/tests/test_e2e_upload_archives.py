@@ -0,0 +1,212 @@
+import gzip
+import io
+import tempfile
+import zipfile
+
+import pytest
+from sqlalchemy import func, select
+
+from app.constants.archive_constants import INVALID_ARCHIVE_ERROR, MEMBER_TOO_LARGE_ERROR, ZSTD_UNSUPPORTED_ERROR
+from app.constants.config import settings
+from app.constants.csv_constants import INVALID_VALUES_ERROR
+from app.constants.ingest_constants import ASYNC_MULTIPLE_FILES_ERROR
+from app.db.models import AirQualityMeasurement
+from app.services import archive_service
+
+CSV_HAIFA = b"""date,city,PM2.5,NO2,CO2
+2024-11-19,Haifa,10,20,400
+2024-11-20,Haifa,30,40,420
+"""
+
+CSV_EILAT = b"""date,city,PM2.5,NO2,CO2
+2024-11-19,Eilat,15,25,410
+"""
+
+CSV_BAD = b"""date,city,PM2.5,NO2,CO2
+2024-11-19,Acre,oops,25,410
+"""
+
+
+def _zip(members: dict[str, bytes]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("stations/", b"")
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+async def _count(db_session) -> int:
+    return await db_session.scalar(select(func.count()).select_from(AirQualityMeasurement))
+
+
+@pytest.mark.asyncio
+async def test_multiple_files_in_one_request(client, db_session):
+    files = [("file", ("haifa.csv", CSV_HAIFA, "text/csv")), ("file", ("eilat.csv.gz", gzip.compress(CSV_EILAT), "application/gzip"))]
+
+    resp = await client.post("/upload", files=files)
+
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["transaction"] == "single"
+    assert body["rows_inserted"] == 3
+    assert [(file["filename"], file["status"], file["rows_inserted"]) for file in body["files"]] == [
+        ("haifa.csv", "succeeded", 2),
+        ("eilat.csv", "succeeded", 1),
+    ]
+    assert await _count(db_session) == 3
+
+
+@pytest.mark.asyncio
+async def test_single_gzip_file_is_streamed(client, db_session):
+    resp = await client.post("/upload", files={"file": ("haifa.csv.gz", gzip.compress(CSV_HAIFA), "application/gzip")})
+
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["rows_inserted"] == 2
+    assert [(file["filename"], file["status"], file["rows_inserted"]) for file in body["files"]] == [("haifa.csv", "succeeded", 2)]
+
+
+@pytest.mark.asyncio
+async def test_zip_members_are_ingested_in_order(client, db_session):
+    content = _zip({"stations/haifa.csv": CSV_HAIFA, "__MACOSX/._haifa.csv": b"junk", "eilat.csv.gz": gzip.compress(CSV_EILAT)})
+
+    resp = await client.post("/upload", files={"file": ("day.zip", content, "application/zip")})
+
+    assert resp.status_code == 200
+    assert [file["filename"] for file in resp.json()["files"]] == ["stations/haifa.csv", "eilat.csv"]
+    assert await _count(db_session) == 3
+
+
+@pytest.mark.asyncio
+async def test_single_transaction_rolls_back_every_file(client, db_session):
+    content = _zip({"haifa.csv": CSV_HAIFA, "acre.csv": CSV_BAD})
+
+    resp = await client.post("/upload", files={"file": ("day.zip", content, "application/zip")})
+
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == f"acre.csv: {INVALID_VALUES_ERROR}"
+    assert await _count(db_session) == 0
+
+
+@pytest.mark.asyncio
+async def test_per_file_transactions_keep_good_files(client, db_session):
+    files = [("file", ("haifa.csv", CSV_HAIFA, "text/csv")), ("file", ("acre.csv", CSV_BAD, "text/csv")), ("file", ("eilat.csv", CSV_EILAT, "text/csv"))]
+
+    resp = await client.post("/upload", params={"transaction": "per_file"}, files=files)
+
+    assert resp.status_code == 200
+    body = resp.json()
+    assert [(file["filename"], file["status"], file["error"]) for file in body["files"]] == [
+        ("haifa.csv", "succeeded", None),
+        ("acre.csv", "failed", INVALID_VALUES_ERROR),
+        ("eilat.csv", "succeeded", None),
+    ]
+    assert body["rows_inserted"] == 3
+    assert await _count(db_session) == 3
+
+
+@pytest.mark.asyncio
+async def test_single_file_reports_per_file_failure(client, db_session):
+    resp = await client.post("/upload", files={"file": ("acre.csv", CSV_BAD, "text/csv")})
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == INVALID_VALUES_ERROR
+
+    resp = await client.post("/upload", params={"transaction": "per_file"}, files={"file": ("acre.csv", CSV_BAD, "text/csv")})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["rows_inserted"] == 0
+    assert [(file["filename"], file["status"], file["error"]) for file in body["files"]] == [("acre.csv", "failed", INVALID_VALUES_ERROR)]
+    assert await _count(db_session) == 0
+
+
+@pytest.mark.asyncio
+async def test_per_file_transactions_report_conflicts(client, db_session, monkeypatch):
+    files = [("file", ("haifa.csv", CSV_HAIFA, "text/csv")), ("file", ("again.csv", CSV_HAIFA, "text/csv"))]
+
+    resp = await client.post("/upload", params={"transaction": "per_file"}, files=files)
+    assert [file["rows_skipped"] for file in resp.json()["files"]] == [0, 2]
+
+    monkeypatch.setattr(settings, "ingest_mode", "bulk")
+    resp = await client.post("/upload", params={"transaction": "per_file"}, files=files)
+    assert [file["status"] for file in resp.json()["files"]] == ["failed", "failed"]
+    assert await _count(db_session) == 2
+
+
+@pytest.mark.asyncio
+async def test_later_file_updates_a_repeated_key(client, db_session):
+    changed = CSV_HAIFA.replace(b"2024-11-19,Haifa,10,20,400", b"2024-11-19,Haifa,11,20,400")
+    files = [("file", ("haifa.csv", CSV_HAIFA, "text/csv")), ("file", ("changed.csv", changed, "text/csv"))]
+
+    resp = await client.post("/upload", params={"transaction": "per_file"}, files=files)
+
+    assert resp.status_code == 200
+    assert [(file["rows_inserted"], file["rows_updated"], file["rows_skipped"]) for file in resp.json()["files"]] == [
+        (2, 0, 0), (0, 1, 1),
+    ]
+    rows = (await client.get("/cities/Haifa")).json()["items"]
+    assert rows[0]["pm25"] == 11
+    assert await _count(db_session) == 2
+
+
+@pytest.mark.asyncio
+async def test_corrupted_gzip_is_rejected(client):
+    content = gzip.compress(CSV_HAIFA)[:-12]
+
+    resp = await client.post("/upload", files={"file": ("haifa.csv.gz", content, "application/gzip")})
+
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == INVALID_ARCHIVE_ERROR
+
+
+@pytest.mark.asyncio
+async def test_zip_member_over_decompressed_limit_is_rejected(client, db_session, monkeypatch, tmp_path):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    # Compresses to a few kilobytes, like a bomb would.
+    bomb = CSV_HAIFA + b"2024-11-21,Haifa,10,20,400\n" * 100_000
+    monkeypatch.setattr(settings, "max_member_bytes", len(bomb) - 1)
+
+    content = _zip({"haifa.csv": CSV_HAIFA, "bomb.csv": bomb, "eilat.csv": CSV_EILAT})
+
+    resp = await client.post("/upload", files={"file": ("day.zip", content, "application/zip")})
+
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == f"bomb.csv: {MEMBER_TOO_LARGE_ERROR}"
+    assert await _count(db_session) == 0
+    assert list(tmp_path.iterdir()) == []
+
+    resp = await client.post("/upload", params={"transaction": "per_file"}, files={"file": ("day.zip", content, "application/zip")})
+
+    assert resp.status_code == 200
+    assert [(file["filename"], file["status"], file["error"]) for file in resp.json()["files"]] == [
+        ("haifa.csv", "succeeded", None),
+        ("bomb.csv", "failed", MEMBER_TOO_LARGE_ERROR),
+        ("eilat.csv", "succeeded", None),
+    ]
+    assert await _count(db_session) == 3
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_zstd_upload(client, db_session, monkeypatch):
+    zstandard = pytest.importorskip("zstandard")
+    content = zstandard.ZstdCompressor().compress(CSV_HAIFA)
+
+    resp = await client.post("/upload", files={"file": ("haifa.csv.zst", content, "application/zstd")})
+    assert resp.status_code == 200
+    assert resp.json()["rows_inserted"] == 2
+
+    monkeypatch.setattr(archive_service, "zstandard", None)
+    resp = await client.post("/upload", files={"file": ("haifa.csv.zst", content, "application/zstd")})
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == ZSTD_UNSUPPORTED_ERROR
+
+
+@pytest.mark.asyncio
+async def test_async_upload_takes_one_file(client):
+    files = [("file", ("haifa.csv", CSV_HAIFA, "text/csv")), ("file", ("eilat.csv", CSV_EILAT, "text/csv"))]
+
+    resp = await client.post("/upload", params={"async": "true"}, files=files)
+
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == ASYNC_MULTIPLE_FILES_ERROR
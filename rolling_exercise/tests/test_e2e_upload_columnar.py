@@ -0,0 +1,149 @@
+import io
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from app.constants.csv_constants import CSV_MISSING_COLUMNS_ERROR, EMPTY_CITY_ERROR, INVALID_VALUES_ERROR
+from app.constants.upload_format_constants import (
+    INVALID_COLUMNAR_FILE_ERROR,
+    UPLOAD_FORMAT_ARROW_FILE,
+    UPLOAD_FORMAT_ARROW_STREAM,
+    UPLOAD_FORMAT_CSV,
+    UPLOAD_FORMAT_PARQUET,
+)
+from app.db.models import AirQualityMeasurement
+from app.services.columnar_service import detect_upload_format
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.ipc  # noqa: E402
+import pyarrow.parquet  # noqa: E402
+
+COLUMNS = {
+    "date": pa.array([date(2024, 11, 19), date(2024, 11, 20), date(2024, 11, 20)], pa.date32()),
+    "city": pa.array([" Tel Aviv", "Tel Aviv", "Jerusalem"]),
+    "PM2.5": pa.array([10.0, 30.0, 15.0]),
+    "NO2": pa.array([20, 40, 25], pa.int32()),
+    "CO2": pa.array([400.0, 420.0, 410.0]),
+}
+
+
+def _table(**overrides) -> "pa.Table":
+    return pa.table({**COLUMNS, **overrides})
+
+
+def _parquet(table) -> bytes:
+    sink = io.BytesIO()
+    pa.parquet.write_table(table, sink)
+    return sink.getvalue()
+
+
+def _arrow_file(table) -> bytes:
+    sink = io.BytesIO()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table, max_chunksize=2)
+    return sink.getvalue()
+
+
+def _arrow_stream(table) -> bytes:
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+@pytest.mark.parametrize(
+    ("content", "content_type", "expected"),
+    [
+        (b"date,city\n", "text/csv", UPLOAD_FORMAT_CSV),
+        (b"PAR1....", "application/octet-stream", UPLOAD_FORMAT_PARQUET),
+        (b"ARROW1\x00\x00", None, UPLOAD_FORMAT_ARROW_FILE),
+        (b"\xff\xff\xff\xff\x10\x00", None, UPLOAD_FORMAT_ARROW_STREAM),
+        (b"anything", "application/vnd.apache.parquet; charset=binary", UPLOAD_FORMAT_PARQUET),
+    ],
+)
+def test_detect_upload_format(content, content_type, expected):
+    source = io.BytesIO(content)
+    assert detect_upload_format(source, content_type) == expected
+    assert source.tell() == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("encode", "content_type"),
+    [
+        (_parquet, "application/octet-stream"),
+        (_parquet, "application/vnd.apache.parquet"),
+        (_arrow_file, "application/vnd.apache.arrow.file"),
+        (_arrow_stream, "application/octet-stream"),
+    ],
+)
+async def test_columnar_upload_matches_csv(client, db_session, monkeypatch, encode, content_type):
+    from app.constants.config import settings
+
+    monkeypatch.setattr(settings, "csv_chunk_rows", 2)
+    resp = await client.post("/upload", files={"file": ("air.bin", encode(_table()), content_type)})
+    assert resp.status_code == 200
+    assert resp.json()["rows_inserted"] == 3
+
+    rows = (await db_session.execute(
+        select(AirQualityMeasurement.date, AirQualityMeasurement.city, AirQualityMeasurement.no2)
+        .order_by(AirQualityMeasurement.date, AirQualityMeasurement.city)
+    )).all()
+    assert [tuple(row) for row in rows] == [
+        (date(2024, 11, 19), "Tel Aviv", 20.0),
+        (date(2024, 11, 20), "Jerusalem", 25.0),
+        (date(2024, 11, 20), "Tel Aviv", 40.0),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_columnar_upload_accepts_text_columns(client):
+    table = _table(date=pa.array(["2024-11-19", "2024-11-20", "2024-11-21"]), CO2=pa.array(["400", "420", "410"]))
+
+    resp = await client.post("/upload", files={"file": ("air.parquet", _parquet(table), "application/octet-stream")})
+
+    assert resp.status_code == 200
+    assert resp.json()["rows_inserted"] == 3
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("content", "detail"),
+    [
+        (_parquet(_table().drop_columns(["CO2"])), CSV_MISSING_COLUMNS_ERROR),
+        (_arrow_stream(_table().drop_columns(["city"])), CSV_MISSING_COLUMNS_ERROR),
+        (_parquet(_table(**{"PM2.5": pa.array([1.0, None, 3.0])})), INVALID_VALUES_ERROR),
+        (_parquet(_table(date=pa.array(["2024-11-19", "not a date", "2024-11-21"]))), INVALID_VALUES_ERROR),
+        (_arrow_file(_table(city=pa.array(["Haifa", None, "Eilat"]))), EMPTY_CITY_ERROR),
+        (b"PAR1 this is not really parquet", INVALID_COLUMNAR_FILE_ERROR),
+    ],
+)
+async def test_columnar_upload_errors(client, content, detail):
+    resp = await client.post("/upload", files={"file": ("air.bin", content, "application/octet-stream")})
+
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == detail
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("content", "content_type"),
+    [
+        (b"date,city,PM2.5,NO2,CO2\n2024-11-19,Haifa,10,20,400\n2024-11-20,Haifa,,40,420\n", "text/csv"),
+        (_parquet(pa.table({
+            "date": pa.array([date(2024, 11, 19), date(2024, 11, 20)], pa.date32()),
+            "city": pa.array(["Haifa", "Haifa"]),
+            "PM2.5": pa.array([10.0, None]),
+            "NO2": pa.array([20.0, 40.0]),
+            "CO2": pa.array([400.0, 420.0]),
+        })), "application/octet-stream"),
+        (_parquet(_table(**{"PM2.5": pa.array([1.0, float("nan"), 3.0])})), "application/octet-stream"),
+    ],
+)
+async def test_missing_numeric_values_are_rejected_in_every_format(client, db_session, content, content_type):
+    resp = await client.post("/upload", files={"file": ("air.bin", content, content_type)})
+
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == INVALID_VALUES_ERROR
+    assert (await db_session.execute(select(AirQualityMeasurement))).first() is None
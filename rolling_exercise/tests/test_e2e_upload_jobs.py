@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.constants.csv_constants import INVALID_VALUES_ERROR
+from app.routes import upload as upload_routes
+from app.services.ingest_jobs_service import IngestJobQueue
+
+CSV_OK = b"""date,city,PM2.5,NO2,CO2
+2024-11-19,Tel Aviv,10,20,400
+2024-11-20,Tel Aviv,30,40,420
+2024-11-20,Jerusalem,15,25,410
+"""
+
+
+@pytest_asyncio.fixture
+async def job_queue(test_engine, monkeypatch):
+    queue = IngestJobQueue(session_factory=async_sessionmaker(bind=test_engine, expire_on_commit=False), workers=1, queue_size=4)
+    monkeypatch.setattr(upload_routes, "ingest_jobs", queue)
+    await queue.start()
+    yield queue
+    await queue.stop()
+
+
+async def _wait_for_job(client, job_id: str) -> dict:
+    for _ in range(100):
+        resp = await client.get(f"/upload/jobs/{job_id}")
+        assert resp.status_code == 200
+        job = resp.json()
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        await asyncio.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+@pytest.mark.asyncio
+async def test_async_upload_returns_job_and_ingests_in_background(client, job_queue):
+    resp = await client.post("/upload", params={"async": "true"}, files={"file": ("air.csv", CSV_OK, "text/csv")})
+    assert resp.status_code == 202
+    job_id = resp.json()["job_id"]
+
+    job = await _wait_for_job(client, job_id)
+    assert job["status"] == "succeeded"
+    assert job["rows_processed"] == 3
+    assert job["error"] is None
+
+    resp = await client.get("/cities/Tel Aviv")
+    assert len(resp.json()["items"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_async_upload_reports_parse_failure(client, job_queue):
+    csv = CSV_OK + b"2024-11-21,Haifa,oops,20,400\n"
+    resp = await client.post("/upload", params={"async": "true"}, files={"file": ("air.csv", csv, "text/csv")})
+    assert resp.status_code == 202
+
+    job = await _wait_for_job(client, resp.json()["job_id"])
+    assert job["status"] == "failed"
+    assert job["error"] == INVALID_VALUES_ERROR
+
+
+@pytest.mark.asyncio
+async def test_async_upload_returns_429_when_queue_is_full(client, test_engine, monkeypatch):
+    queue = IngestJobQueue(session_factory=async_sessionmaker(bind=test_engine), workers=0, queue_size=1)
+    monkeypatch.setattr(upload_routes, "ingest_jobs", queue)
+    await queue.start()
+
+    files = {"file": ("air.csv", CSV_OK, "text/csv")}
+    resp = await client.post("/upload", params={"async": "true"}, files=files)
+    assert resp.status_code == 202
+    job_id = resp.json()["job_id"]
+
+    resp = await client.post("/upload", params={"async": "true"}, files=files)
+    assert resp.status_code == 429
+
+    await queue.stop()
+    resp = await client.get(f"/upload/jobs/{job_id}")
+    assert resp.json()["status"] == "failed"
+
+
+@pytest.mark.asyncio
+async def test_unknown_job_returns_404(client):
+    resp = await client.get("/upload/jobs/does-not-exist")
+    assert resp.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_async_upload_returns_503_when_queue_is_not_running(client, test_engine, monkeypatch):
+    queue = IngestJobQueue(session_factory=async_sessionmaker(bind=test_engine), workers=1, queue_size=1)
+    monkeypatch.setattr(upload_routes, "ingest_jobs", queue)
+    files = {"file": ("air.csv", CSV_OK, "text/csv")}
+
+    resp = await client.post("/upload", params={"async": "true"}, files=files)
+    assert resp.status_code == 503
+
+    await queue.start()
+    await queue.stop()
+    resp = await client.post("/upload", params={"async": "true"}, files=files)
+    assert resp.status_code == 503
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.constants.config import settings
+from app.services import upload_service
+
+CSV_CHUNKED = b"date,city,PM2.5,NO2,CO2\n" + b"".join(b"2024-11-%02d,Haifa,%d,20,4\n" % (day, day) for day in range(1, 29))
+
+
+@pytest.mark.asyncio
+async def test_parse_and_aqi_run_off_the_event_loop(client, monkeypatch):
+    monkeypatch.setattr(settings, "csv_chunk_rows", 5)
+    loop_thread = threading.get_ident()
+    parse_threads, aqi_threads = [], []
+
+    iter_upload = upload_service.iter_air_quality_upload
+    calculate_aqi_columns = upload_service.calculate_aqi_columns
+
+    def recording_iter_upload(*args, **kwargs):
+        # The generator body runs wherever next() is called, i.e. where each chunk is parsed.
+        for columns in iter_upload(*args, **kwargs):
+            parse_threads.append(threading.get_ident())
+            yield columns
+
+    def recording_calculate_aqi_columns(*args):
+        aqi_threads.append(threading.get_ident())
+        return calculate_aqi_columns(*args)
+
+    monkeypatch.setattr(upload_service, "iter_air_quality_upload", recording_iter_upload)
+    monkeypatch.setattr(upload_service, "calculate_aqi_columns", recording_calculate_aqi_columns)
+
+    resp = await client.post("/upload", files={"file": ("air.csv", CSV_CHUNKED, "text/csv")})
+
+    assert resp.status_code == 200
+    assert len(parse_threads) == len(aqi_threads) == 6
+    assert loop_thread not in parse_threads
+    assert loop_thread not in aqi_threads
+
+
+
+@pytest.mark.asyncio
+async def test_event_loop_stays_responsive_during_an_upload(client, monkeypatch):
+    # Each offloaded step is stretched with a sleep, which releases the GIL: run on the loop instead, any one of
+    # them would hold it for the whole stall, however fast the machine is.
+    stall = 0.5
+    iter_upload = upload_service.iter_air_quality_upload
+    calculate_aqi_columns = upload_service.calculate_aqi_columns
+    records = upload_service._records
+
+    def slow_iter_upload(*args, **kwargs):
+        for columns in iter_upload(*args, **kwargs):
+            time.sleep(stall)
+            yield columns
+
+    def slow(func):
+        def call(*args):
+            time.sleep(stall)
+            return func(*args)
+        return call
+
+    monkeypatch.setattr(upload_service, "iter_air_quality_upload", slow_iter_upload)
+    monkeypatch.setattr(upload_service, "calculate_aqi_columns", slow(calculate_aqi_columns))
+    monkeypatch.setattr(upload_service, "_records", slow(records))
+
+    tick = 0.01
+    lags = []
+
+    async def ticker() -> None:
+        # How late each short sleep wakes up is how long the loop was kept busy.
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(tick)
+            lags.append(time.perf_counter() - started - tick)
+
+    task = asyncio.create_task(ticker())
+    try:
+        resp = await client.post("/upload", files={"file": ("air.csv", CSV_CHUNKED, "text/csv")})
+    finally:
+        task.cancel()
+
+    assert resp.status_code == 200
+    assert max(lags) < stall / 2
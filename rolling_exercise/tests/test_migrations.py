@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.constants.config import settings
+from app.db.migrations import init_db, run_migrations
+from app.db.models import AirQualityMeasurement, CityAqiStats
+from app.services.upload_service import ingest_air_quality_csv
+
+
+@pytest.mark.asyncio
+async def test_unique_key_migration_drops_duplicates_and_rebuilds_stats(test_engine, db_session):
+    await ingest_air_quality_csv(file_content=b"date,city,PM2.5,NO2,CO2\n2024-11-19,Haifa,10,10,10\n", db=db_session)
+
+    async with test_engine.begin() as conn:
+        await conn.execute(text("ALTER TABLE air_quality_measurements DROP CONSTRAINT uq_air_quality_measurements_city_date"))
+        await conn.execute(text(
+            "INSERT INTO air_quality_measurements (date, city, pm25, no2, co2, aqi, aqi_level, is_alert) "
+            "VALUES ('2024-11-19', 'Haifa', 1, 1, 1, 1, 'Good', false)"
+        ))
+        await conn.execute(text("DELETE FROM schema_migrations WHERE version = 3"))
+
+    async with test_engine.begin() as conn:
+        await run_migrations(conn)
+
+    rows = (await db_session.execute(select(AirQualityMeasurement.pm25))).scalars().all()
+    assert rows == [1]
+    stats = await db_session.get(CityAqiStats, "Haifa")
+    assert (stats.measurement_count, stats.aqi_sum) == (1, 1)
+    assert await db_session.scalar(
+        select(func.count()).select_from(text("pg_constraint")).where(text("conname = 'uq_air_quality_measurements_city_date'"))
+    ) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_startups_create_a_fresh_schema_once(test_engine):
+    schema = "concurrent_init_test"
+    async with test_engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {schema}"))
+    engine = create_async_engine(settings.database_url, connect_args={"server_settings": {"search_path": schema}})
+
+    async def start_worker() -> None:
+        async with engine.begin() as conn:
+            await init_db(conn)
+
+    try:
+        # Without the lock around create_all, the workers race to create the same tables and all but one fail.
+        await asyncio.gather(*(start_worker() for _ in range(4)))
+        async with engine.connect() as conn:
+            assert await conn.scalar(text("SELECT count(*) FROM schema_migrations")) == 3
+    finally:
+        await engine.dispose()
+        async with test_engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
@@ -0,0 +1,116 @@
+from datetime import date
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, func, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.constants.config import settings
+from app.db.migrations import init_db
+from app.db.models import AirQualityMeasurement, CityAqiMonthlyRollup, CityAqiStats
+from app.db.partitions import ensure_partitioned_measurements, is_partitioned, list_partitions
+from app.services.history_service import fetch_history
+from app.services.retention_service import apply_retention
+from app.services.upload_service import ingest_air_quality_csv
+
+SCHEMA = "partition_test"
+
+CSV_MONTHS = b"""date,city,PM2.5,NO2,CO2
+2024-09-10,Haifa,10,10,10
+2024-10-10,Haifa,20,20,20
+2024-11-10,Haifa,30,30,30
+2024-11-11,Eilat,40,40,40
+"""
+
+
+def _scan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _scan_nodes(child)
+
+
+@pytest_asyncio.fixture
+async def schema_engine(test_engine):
+    # A schema of its own, so converting to a partitioned table leaves the shared test tables alone.
+    async with test_engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+
+    # A partition DDL waiting on an open upload fails fast instead of hanging the test.
+    server_settings = {"search_path": SCHEMA, "lock_timeout": "5s"}
+    engine = create_async_engine(settings.database_url, connect_args={"server_settings": server_settings})
+    yield engine
+    await engine.dispose()
+
+    async with test_engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+
+
+@pytest.mark.asyncio
+async def test_partitioning_converts_prunes_and_drops_old_months(schema_engine, monkeypatch):
+    SessionLocal = async_sessionmaker(bind=schema_engine, expire_on_commit=False)
+    async with schema_engine.begin() as conn:
+        await init_db(conn)
+    async with SessionLocal() as db:
+        await ingest_air_quality_csv(file_content=CSV_MONTHS, db=db)
+
+    monkeypatch.setattr(settings, "partition_measurements", True)
+    monkeypatch.setattr(settings, "partition_months_ahead", 1)
+    async with schema_engine.begin() as conn:
+        await init_db(conn)
+        # Startup leaves the conversion to the partition-measurements command.
+        assert not await is_partitioned(conn)
+        await ensure_partitioned_measurements(conn)
+        await init_db(conn)
+        assert await is_partitioned(conn)
+
+    async with SessionLocal() as db:
+        await ingest_air_quality_csv(file_content=b"date,city,PM2.5,NO2,CO2\n2024-12-01,Haifa,50,50,50\n", db=db)
+        partitions = await list_partitions(db)
+        assert {"air_quality_measurements_p202409", "air_quality_measurements_p202412"} <= partitions.keys()
+        assert len(partitions) >= 4 + 2  # the converted months, December, and this month plus one ahead
+        assert await db.scalar(select(func.count()).select_from(AirQualityMeasurement)) == 5
+
+        captured = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            captured.append((statement, parameters))
+
+        event.listen(schema_engine.sync_engine, "before_cursor_execute", capture)
+        try:
+            page = await fetch_history(db=db, start_date=date(2024, 11, 1), end_date=date(2024, 11, 30), limit=10)
+        finally:
+            event.remove(schema_engine.sync_engine, "before_cursor_execute", capture)
+        assert len(page.items) == 2
+
+        statement, parameters = captured[0]
+        plan = (await db.connection()).exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+        nodes = _scan_nodes((await plan).scalar()[0]["Plan"])
+        assert {node["Relation Name"] for node in nodes if "Relation Name" in node} == {"air_quality_measurements_p202411"}
+        await db.rollback()
+
+        dropped = await apply_retention(db, keep_months=2, today=date(2024, 12, 15))
+        assert dropped == ["air_quality_measurements_p202409", "air_quality_measurements_p202410"]
+
+        cities = {row.city: row for row in (await db.execute(select(CityAqiStats))).scalars()}
+        assert {city: row.measurement_count for city, row in cities.items()} == {"Haifa": 2, "Eilat": 1}
+        months = (await db.execute(select(CityAqiMonthlyRollup.period).distinct())).scalars().all()
+        assert sorted(months) == [date(2024, 11, 1), date(2024, 12, 1)]
+
+
+@pytest.mark.asyncio
+async def test_partitions_are_created_outside_the_upload_transaction(schema_engine, monkeypatch):
+    monkeypatch.setattr(settings, "partition_measurements", True)
+    monkeypatch.setattr(settings, "partition_months_ahead", 0)
+    monkeypatch.setattr(settings, "csv_chunk_rows", 1)
+    async with schema_engine.begin() as conn:
+        await init_db(conn)
+
+    SessionLocal = async_sessionmaker(bind=schema_engine, expire_on_commit=False)
+    async with SessionLocal() as db:
+        # One transaction over four chunks: the later months are created while it already holds the table.
+        result = await ingest_air_quality_csv(file_content=CSV_MONTHS, db=db)
+        assert result.rows_inserted == 4
+
+        partitions = await list_partitions(db)
+        assert {"air_quality_measurements_p202409", "air_quality_measurements_p202410", "air_quality_measurements_p202411"} <= partitions.keys()
@@ -0,0 +1,88 @@
+"""Every read query issued by app/services must be answerable by an index.
+
+Seq scans are disabled for the EXPLAIN, so the planner only falls back to one
+when no index can serve the query shape.
+"""
+import re
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from app.services.alerts_service import fetch_alerts, fetch_alerts_by_city
+from app.services.cities_service import fetch_average_city_aqi, fetch_best_cities, fetch_by_city
+from app.services.history_service import fetch_history, stream_history
+from app.services.pagination import encode_cursor
+from app.services.rollup_service import fetch_city_rollup
+from app.services.upload_service import ingest_air_quality_csv
+
+PLAN_ROWS = 20_000
+
+
+def _plans_csv() -> bytes:
+    # About two years of 30 cities (one row per city and day) with ~1% alert rows, so selectivities look like production data.
+    lines = [b"date,city,PM2.5,NO2,CO2"]
+    for i in range(PLAN_ROWS):
+        day = date.fromordinal(date(2023, 1, 1).toordinal() + i // 30)
+        pm25 = 400 if i % 97 == 0 else i % 50
+        lines.append(b"%s,City %d,%d,20,4" % (day.isoformat().encode(), i % 30, pm25))
+    lines.append(b"2024-11-20,Tel Aviv,10,20,4")
+    return b"\n".join(lines) + b"\n"
+
+CURSOR = encode_cursor(date(2024, 11, 19), 1)
+
+
+async def _run_read_services(session) -> None:
+    await fetch_alerts(session=session, limit=10)
+    await fetch_alerts(session=session, limit=10, cursor=CURSOR)
+    await fetch_alerts_by_city(session=session, city="Tel Aviv", limit=10)
+    await fetch_history(db=session, start_date=date(2024, 11, 1), end_date=date(2024, 11, 30), limit=10)
+    await fetch_history(db=session, start_date=date(2024, 11, 1), end_date=date(2024, 11, 30), limit=10, cursor=CURSOR)
+    await fetch_by_city(session=session, city="Tel Aviv", limit=10)
+    await fetch_by_city(session=session, city="Tel Aviv", limit=10, cursor=CURSOR)
+    await fetch_best_cities(session=session, limit=3)
+    await fetch_average_city_aqi(session=session, city="Tel Aviv")
+    for granularity in ("day", "month"):
+        await fetch_city_rollup(
+            session=session, city="Tel Aviv", granularity=granularity,
+            start_date=date(2024, 11, 1), end_date=date(2024, 11, 30),
+        )
+    async for _ in stream_history(db=session, start_date=date(2024, 11, 1), end_date=date(2024, 11, 30)):
+        pass
+
+
+def _scan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _scan_nodes(child)
+
+
+@pytest.mark.asyncio
+async def test_service_queries_use_indexes(test_engine, db_session):
+    await ingest_air_quality_csv(file_content=_plans_csv(), db=db_session)
+    async with test_engine.begin() as conn:
+        await conn.exec_driver_sql("ANALYZE")
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        # Table reads only; the cache's replica check selects no table.
+        if statement.lstrip().upper().startswith("SELECT") and re.search(r"\bFROM\b", statement, re.IGNORECASE):
+            captured.append((statement, parameters))
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        await _run_read_services(db_session)
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", capture)
+    await db_session.rollback()
+
+    assert len(captured) >= 12
+    async with test_engine.connect() as conn:
+        await conn.exec_driver_sql("SET enable_seqscan = off")
+        for statement, parameters in captured:
+            result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+            plan = result.scalar()[0]["Plan"]
+            node_types = [node["Node Type"] for node in _scan_nodes(plan)]
+            assert "Seq Scan" not in node_types, f"sequential scan for: {statement}\n{node_types}"
+            assert any("Index" in node_type for node_type in node_types), statement
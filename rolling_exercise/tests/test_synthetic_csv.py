@@ -0,0 +1,25 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.services.csv_service import parse_air_quality_csv
+from benchmarks.synthetic_csv import generate_air_quality_csv
+
+
+def test_synthetic_csv_parses_with_unique_keys_in_span():
+    content = generate_air_quality_csv(rows=500, cities=10, days=60, start_date=date(2024, 3, 1), seed=1)
+
+    columns = parse_air_quality_csv(content)
+
+    assert len(columns) == 500
+    assert len(set(zip(columns.city, columns.date))) == 500
+    assert len(set(columns.city)) == 10
+    assert columns.date.min() >= np.datetime64("2024-03-01")
+    assert columns.date.max() <= np.datetime64("2024-04-29")
+    assert content == generate_air_quality_csv(rows=500, cities=10, days=60, start_date=date(2024, 3, 1), seed=1)
+
+
+def test_synthetic_csv_rejects_more_rows_than_keys():
+    with pytest.raises(ValueError):
+        generate_air_quality_csv(rows=11, cities=2, days=5)